@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2023, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+"""
+Microbenchmark of xarm.core.utils.convert against the former implementations (per element bytes concatenation
+and slicing), for the array sizes of the motion commands (6~7), the report frames (up to 32) and bulk data
+
+Usage:
+    python3 bench_convert.py [--sizes 1,7,32,256,1024] [--number 20000] [--repeat 5]
+"""
+
+import os
+import sys
+import time
+import random
+import struct
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from xarm.core.utils import convert
+
+
+class OldConvert(object):
+    @staticmethod
+    def fp32s_to_bytes(data, n):
+        ret = bytes(struct.pack('<f', data[0]))
+        for i in range(1, n):
+            ret += bytes(struct.pack('<f', data[i]))
+        return ret
+
+    @staticmethod
+    def int32s_to_bytes(data, n):
+        ret = bytes(struct.pack('<i', data[0]))
+        for i in range(1, n):
+            ret += bytes(struct.pack('<i', data[i]))
+        return ret
+
+    @staticmethod
+    def u16s_to_bytes(data, num):
+        def u16_to_bytes(d):
+            bts = bytes([d // 256 % 256])
+            bts += bytes([d % 256])
+            return bts
+        bts = u16_to_bytes(data[0])
+        for i in range(1, num):
+            bts += u16_to_bytes(data[i])
+        return bts
+
+    @staticmethod
+    def bytes_to_fp32(data):
+        byte = bytes([data[0]])
+        byte += bytes([data[1]])
+        byte += bytes([data[2]])
+        byte += bytes([data[3]])
+        return struct.unpack('<f', byte)[0]
+
+    @staticmethod
+    def bytes_to_fp32s(data, n):
+        ret = [0] * n
+        for i in range(n):
+            ret[i] = OldConvert.bytes_to_fp32(data[i * 4:i * 4 + 4])
+        return ret
+
+    @staticmethod
+    def bytes_to_u16s(data, n):
+        ret = [0] * n
+        for i in range(n):
+            d = data[i * 2: i * 2 + 2]
+            ret[i] = d[0] << 8 | d[1]
+        return ret
+
+
+def timeit(func, number, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1e6 / number
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', default='1,7,32,256,1024')
+    parser.add_argument('--number', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rnd = random.Random(0)
+    print('numpy: {}, numpy path from {} elements'.format(
+        convert.np.__version__ if convert.np is not None else 'not installed', convert.NUMPY_MIN_SIZE))
+    print('{:>16} {:>6} {:>10} {:>10} {:>8}'.format('function', 'size', 'old(us)', 'new(us)', 'speedup'))
+    for size in [int(s) for s in args.sizes.split(',')]:
+        floats = [rnd.uniform(-1000, 1000) for _ in range(size)]
+        ints = [rnd.randint(-2 ** 31, 2 ** 31 - 1) for _ in range(size)]
+        u16s = [rnd.randint(0, 65535) for _ in range(size)]
+        fp32_data = convert.fp32s_to_bytes(floats, size)
+        # the report frames are decoded from a memoryview of the receive buffer
+        fp32_view = memoryview(bytearray(b'\x00' * 4 + fp32_data))[4:]
+        u16_data = convert.u16s_to_bytes(u16s, size)
+        number = max(args.number * 7 // max(size, 7), 100)
+        cases = [
+            ('fp32s_to_bytes', lambda: OldConvert.fp32s_to_bytes(floats, size), lambda: convert.fp32s_to_bytes(floats, size)),
+            ('int32s_to_bytes', lambda: OldConvert.int32s_to_bytes(ints, size), lambda: convert.int32s_to_bytes(ints, size)),
+            ('u16s_to_bytes', lambda: OldConvert.u16s_to_bytes(u16s, size), lambda: convert.u16s_to_bytes(u16s, size)),
+            ('bytes_to_fp32s', lambda: OldConvert.bytes_to_fp32s(fp32_view, size), lambda: convert.bytes_to_fp32s(fp32_view, size)),
+            ('bytes_to_u16s', lambda: OldConvert.bytes_to_u16s(u16_data, size), lambda: convert.bytes_to_u16s(u16_data, size)),
+        ]
+        if size == 1:
+            cases.append(('bytes_to_fp32', lambda: OldConvert.bytes_to_fp32(fp32_view), lambda: convert.bytes_to_fp32(fp32_view)))
+        for name, old, new in cases:
+            assert old() == new(), name
+            old_us = timeit(old, number, args.repeat)
+            new_us = timeit(new, number, args.repeat)
+            print('{:>16} {:>6d} {:>10.3f} {:>10.3f} {:>7.1f}x'.format(name, size, old_us, new_us, old_us / new_us))
+
+
+if __name__ == '__main__':
+    main()
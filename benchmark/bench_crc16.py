@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2023, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+"""
+Microbenchmark of CRC-16/Modbus on serial and RS485 pass-through sized frames:
+    old:    the former crc_modbus (index loop over the two 8 bit tables, bytes result)
+    new:    crc16.crc_modbus (16 bit table, bytes result)
+    update: crc16.update on a memoryview (int result, no allocation)
+    check:  crc16.check_modbus on a memoryview of the whole frame (crc included)
+
+Usage:
+    python3 bench_crc16.py [--frames 20000] [--repeat 5]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from xarm.core.utils import crc16
+
+
+def crc_modbus_old(data):
+    leng = len(data)
+    init_crch = 0xFF
+    init_crcl = 0xFF
+    i = 0
+
+    while leng > 0:
+        index = init_crch ^ data[i]
+        i += 1
+        init_crch = init_crcl ^ crc16.CRC_TABLE_H[index]
+        init_crcl = crc16.CRC_TABLE_L[index]
+        leng -= 1
+    s = init_crch << 8 | init_crcl
+    crc = bytes([s // 256 % 256])
+    crc += bytes([s % 256])
+    return crc
+
+
+def gen_frames(count, seed=0):
+    rnd = random.Random(seed)
+    frames = []
+    for _ in range(count):
+        # ux2 frames are at most 50 + 5 bytes, rs485 pass-through frames up to about 128 bytes
+        size = rnd.choice([8, 12, 20, 33, 55, 128])
+        data = bytes(rnd.randrange(256) for _ in range(size - 2))
+        frames.append(memoryview(data + crc16.crc_modbus(data)))
+    return frames
+
+
+def bench(name, func, frames, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for frame in frames:
+            func(frame)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print('{:>8}: {:10.0f} frames/s, {:6.2f} us/frame'.format(name, len(frames) / best, best * 1e6 / len(frames)))
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--frames', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    frames = gen_frames(args.frames)
+    for frame in frames[:100]:
+        assert crc_modbus_old(frame[:-2]) == crc16.crc_modbus(frame[:-2])
+        assert crc16.check_modbus(frame)
+    print('frames={}, avg size={:.1f} bytes'.format(len(frames), sum(len(f) for f in frames) / len(frames)))
+    old = bench('old', lambda f: crc_modbus_old(f[:-2]), frames, args.repeat)
+    new = bench('new', lambda f: crc16.crc_modbus(f[:-2]), frames, args.repeat)
+    bench('update', lambda f: crc16.update(crc16.CRC_MODBUS_INIT, f[:-2]), frames, args.repeat)
+    check = bench('check', crc16.check_modbus, frames, args.repeat)
+    print('speedup: new={:.2f}x, check={:.2f}x'.format(old / new, old / check))
+
+
+if __name__ == '__main__':
+    main()
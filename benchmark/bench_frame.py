@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2023, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+"""
+Microbenchmark of the request frame builders of UxbusCmdTcp/UxbusCmdSer against the former implementation
+(bytes concatenation one byte at a time), for a small motion frame, a trajectory name and modbus pass-through
+payloads, built from a list of ints and from bytes.
+With --send, each frame is also written to a local socket pair (old: send of bytes, new: sendall of the view).
+
+Usage:
+    python3 bench_frame.py [--sizes 40,81,256,1024] [--number 20000] [--repeat 5] [--send]
+"""
+
+import os
+import sys
+import time
+import socket
+import random
+import argparse
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from xarm.core.utils import convert, crc16
+from xarm.core.wrapper import UxbusCmdTcp
+from xarm.core.wrapper.uxbus_frame import FrameBuffer
+
+new_tcp_frame = UxbusCmdTcp._build_frame
+
+
+def old_tcp_frame(trans_id, prot_id, unit_id, pdu_data, pdu_len):
+    send_data = convert.u16_to_bytes(trans_id)
+    send_data += convert.u16_to_bytes(prot_id)
+    send_data += convert.u16_to_bytes(pdu_len + 1)
+    send_data += bytes([unit_id])
+    for i in range(pdu_len):
+        send_data += bytes([pdu_data[i]])
+    return send_data
+
+
+def old_ser_frame(reg, txdata, num):
+    send_data = bytes([0xAA, 0x55, num + 1, reg])
+    for i in range(num):
+        send_data += bytes([txdata[i]])
+    send_data += crc16.crc_modbus(send_data)
+    return send_data
+
+
+def new_ser_frame(frame, reg, txdata, num):
+    send_data = frame.pack((0xAA, 0x55, num + 1, reg), txdata, num)
+    crc = crc16.update(crc16.CRC_MODBUS_INIT, send_data[:-2])
+    send_data[-2] = crc & 0xFF
+    send_data[-1] = crc >> 8
+    return send_data
+
+
+def timeit(func, number, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1e6 / number
+
+
+def socket_pair():
+    tx, rx = socket.socketpair()
+
+    def drain():
+        try:
+            while rx.recv(65536):
+                pass
+        except OSError:
+            pass
+    threading.Thread(target=drain, daemon=True).start()
+    return tx, rx
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', default='40,81,256,1024')
+    parser.add_argument('--number', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--send', action='store_true')
+    args = parser.parse_args()
+
+    rnd = random.Random(0)
+    tcp_frame = FrameBuffer('>HHHB')
+    ser_frame = FrameBuffer('BBBB', trailer_size=2)
+    tx, rx = socket_pair() if args.send else (None, None)
+    print('{:>16} {:>6} {:>10} {:>10} {:>8}'.format('builder', 'size', 'old(us)', 'new(us)', 'speedup'))
+    for size in [int(s) for s in args.sizes.split(',')]:
+        pdu_list = [rnd.randint(0, 255) for _ in range(size)]
+        pdu_bytes = bytes(pdu_list)
+        number = max(args.number * 40 // max(size, 40), 100)
+        cases = [
+            ('tcp(list)', lambda: old_tcp_frame(1, 2, 24, pdu_list, size),
+             lambda: new_tcp_frame(tcp_frame, 1, 2, 24, pdu_list, size)),
+            ('tcp(bytes)', lambda: old_tcp_frame(1, 2, 24, pdu_bytes, size),
+             lambda: new_tcp_frame(tcp_frame, 1, 2, 24, pdu_bytes, size)),
+        ]
+        if size < 255:
+            cases.append(('ser(list)', lambda: old_ser_frame(24, pdu_list, size),
+                          lambda: new_ser_frame(ser_frame, 24, pdu_list, size)))
+        if tx is not None:
+            cases.append(('tcp+send', lambda: tx.send(old_tcp_frame(1, 2, 24, pdu_bytes, size)),
+                          lambda: tx.sendall(new_tcp_frame(tcp_frame, 1, 2, 24, pdu_bytes, size))))
+        for name, old, new in cases:
+            if not name.endswith('send'):
+                assert old() == bytes(new()), name
+            old_us = timeit(old, number, args.repeat)
+            new_us = timeit(new, number, args.repeat)
+            print('{:>16} {:>6d} {:>10.3f} {:>10.3f} {:>7.1f}x'.format(name, size, old_us, new_us, old_us / new_us))
+    if tx is not None:
+        tx.close()
+        rx.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2023, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+"""
+Microbenchmark of the main control socket (port 502) frame assembly:
+    old: bytes concatenation + slicing per frame
+    new: RxRingBuffer filled by recv_into, frames handed out as memoryview slices
+
+Usage:
+    python3 bench_frame_assembly.py [raw_502_stream.bin] [--chunk 1024] [--repeat 5]
+
+Without a raw stream file, a stream is synthesized from typical 502 responses
+(get_state, get_cmdnum, get_tcp_pose, get_joint_pos, set commands and motion feedback frames)
+"""
+
+import os
+import sys
+import time
+import random
+import struct
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from xarm.core.comm.base import RxRingBuffer
+from xarm.core.utils import convert
+
+
+class CountParse(object):
+    def __init__(self):
+        self.count = 0
+
+    def put(self, data, is_report=False):
+        # same copy the real RxParse does before queueing
+        bytes(data)
+        self.count += 1
+
+
+def synthesize_stream(frames=200000, seed=0):
+    rnd = random.Random(seed)
+    payloads = [
+        (13, bytes(2)),             # get_state
+        (14, bytes(3)),             # get_cmdnum
+        (41, bytes(25)),            # get_tcp_pose
+        (42, bytes(29)),            # get_joint_pos
+        (21, bytes(1)),             # move_line
+        (0xFF, bytes(17)),          # motion feedback
+    ]
+    stream = bytearray()
+    for i in range(frames):
+        reg, pdu = payloads[rnd.randrange(len(payloads))]
+        stream += struct.pack('>HHHB', i & 0xFFFF, 2, len(pdu) + 2, reg if reg != 0xFF else 0)
+        stream += bytes([reg]) + pdu
+    return bytes(stream)
+
+
+def split_chunks(stream, chunk, seed=0):
+    # emulate tcp segmentation, frames are split across recv() calls
+    rnd = random.Random(seed)
+    chunks = []
+    i = 0
+    while i < len(stream):
+        n = rnd.randint(1, chunk)
+        chunks.append(stream[i:i + n])
+        i += n
+    return chunks
+
+
+def run_old(chunks):
+    parse = CountParse()
+    buffer = b''
+    for rx_data in chunks:
+        buffer += rx_data
+        while True:
+            if len(buffer) < 6:
+                break
+            length = convert.bytes_to_u16(buffer[4:6]) + 6
+            if len(buffer) < length:
+                break
+            rx_data = buffer[:length]
+            buffer = buffer[length:]
+            parse.put(rx_data)
+    return parse.count
+
+
+def run_new(chunks, chunk):
+    parse = CountParse()
+    rx_ring = RxRingBuffer(max(chunk * 64, 65536))
+    for rx_data in chunks:
+        # stand-in for socket.recv_into
+        view = rx_ring.writable(chunk)
+        num = len(rx_data)
+        view[:num] = rx_data
+        rx_ring.commit(num)
+        rx_ring.put_modbus_frames(parse.put)
+    return parse.count
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('stream', nargs='?', help='raw byte stream recorded from port 502')
+    parser.add_argument('--chunk', type=int, default=1024, help='max bytes per recv')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    if args.stream:
+        with open(args.stream, 'rb') as f:
+            stream = f.read()
+    else:
+        stream = synthesize_stream()
+    chunks = split_chunks(stream, args.chunk)
+    print('stream: {} bytes, {} recv chunks'.format(len(stream), len(chunks)))
+
+    for name, func in [('old', lambda: run_old(chunks)), ('new', lambda: run_new(chunks, args.chunk))]:
+        best = None
+        count = 0
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            count = func()
+            spend = time.perf_counter() - start
+            best = spend if best is None else min(best, spend)
+        print('{}: {} frames, best {:.3f}s, {:.3f}us/frame'.format(name, count, best, best / max(count, 1) * 1000000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2023, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+"""
+Benchmark of the socket receive side for many arms:
+    threads: every SocketPort runs its own recv thread (+ heartbeat thread for the main socket)
+    reactor: all the SocketPorts are received by one SocketReactor thread
+
+Each simulated arm has a main socket (port 502, heartbeat enabled) and a report socket (port 30001)
+that streams report frames at --hz. A fake controller runs in a child process, so only the client side
+is measured: CPU time, wakeups (context switches) and thread count, per arm.
+
+Usage:
+    python3 bench_reactor.py [--arms 10] [--hz 100] [--duration 10]
+
+Note: the main socket must use port 502, the fake controller binds 127.0.0.2, 127.0.0.3, ... on it
+    (Linux loopback, needs the permission to bind a port < 1024). Without it only the report sockets are simulated.
+"""
+
+import os
+import sys
+import time
+import socket
+import struct
+import resource
+import argparse
+import selectors
+import threading
+import multiprocessing
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from xarm.core.comm import SocketPort, SocketReactor
+from xarm.core.config.x_config import XCONF
+
+REPORT_PORT = XCONF.SocketConf.TCP_REPORT_NORM_PORT
+REPORT_SIZE = 245
+
+
+def arm_ip(i):
+    return '127.0.0.{}'.format(i + 2)
+
+
+def fake_controller(arms, hz, with_main, ready):
+    sel = selectors.DefaultSelector()
+    listeners = []
+    for i in range(arms):
+        ports = [REPORT_PORT, XCONF.SocketConf.TCP_CONTROL_PORT] if with_main else [REPORT_PORT]
+        for port in ports:
+            server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            server.bind((arm_ip(i), port))
+            server.listen(4)
+            server.setblocking(False)
+            sel.register(server, selectors.EVENT_READ, ('listen', port))
+            listeners.append(server)
+    ready.set()
+    reports = []
+    frame = struct.pack('>I', REPORT_SIZE) + bytes(REPORT_SIZE - 4)
+    interval = 1.0 / hz
+    next_time = time.monotonic()
+    while True:
+        for key, _ in sel.select(max(next_time - time.monotonic(), 0)):
+            kind, port = key.data
+            if kind == 'listen':
+                conn, _ = key.fileobj.accept()
+                if port == REPORT_PORT:
+                    reports.append(conn)
+                else:
+                    conn.setblocking(False)
+                    sel.register(conn, selectors.EVENT_READ, ('main', port))
+            else:
+                try:
+                    data = key.fileobj.recv(1024)
+                except OSError:
+                    data = b''
+                if not data:
+                    sel.unregister(key.fileobj)
+                    key.fileobj.close()
+                    continue
+                # heartbeat reply
+                key.fileobj.send(data)
+        now = time.monotonic()
+        if now >= next_time:
+            next_time += interval
+            for conn in list(reports):
+                try:
+                    conn.sendall(frame)
+                except OSError:
+                    reports.remove(conn)
+                    conn.close()
+
+
+def can_bind_main():
+    try:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((arm_ip(0), XCONF.SocketConf.TCP_CONTROL_PORT))
+        sock.close()
+        return True
+    except OSError:
+        return False
+
+
+def run(mode, arms, with_main, duration):
+    reactor = SocketReactor() if mode == 'reactor' else None
+    ports = []
+    for i in range(arms):
+        if with_main:
+            ports.append(SocketPort(arm_ip(i), XCONF.SocketConf.TCP_CONTROL_PORT, heartbeat=True, reactor=reactor))
+        ports.append(SocketPort(arm_ip(i), REPORT_PORT, buffer_size=XCONF.SocketConf.TCP_REPORT_NORMAL_BUF_SIZE, reactor=reactor))
+    if not all(port.connected for port in ports):
+        print('connect failed')
+        return
+    time.sleep(1)
+    threads = threading.active_count()
+    seq = sum(port.report_slot.seq for port in ports)
+    reactor_wakeups = reactor.wakeups if reactor else 0
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    cpu = time.process_time()
+    time.sleep(duration)
+    cpu = time.process_time() - cpu
+    end_usage = resource.getrusage(resource.RUSAGE_SELF)
+    frames = sum(port.report_slot.seq for port in ports) - seq
+    switches = (end_usage.ru_nvcsw - usage.ru_nvcsw) + (end_usage.ru_nivcsw - usage.ru_nivcsw)
+    print('{:>8}: threads={:<4d} cpu/arm={:7.3f} ms/s  wakeups/arm={:8.1f} /s  frames/arm={:7.1f} /s{}'.format(
+        mode, threads, cpu * 1000 / duration / arms, switches / duration / arms, frames / duration / arms,
+        '  (reactor loops/arm={:.1f} /s)'.format((reactor.wakeups - reactor_wakeups) / duration / arms) if reactor else ''))
+    for port in ports:
+        port.close()
+    if reactor:
+        reactor.stop()
+    time.sleep(0.5)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--arms', type=int, default=10)
+    parser.add_argument('--hz', type=int, default=100, help='report frames per second of every arm')
+    parser.add_argument('--duration', type=float, default=10)
+    args = parser.parse_args()
+
+    with_main = can_bind_main()
+    if not with_main:
+        print('can not bind port {}, only the report sockets are simulated'.format(XCONF.SocketConf.TCP_CONTROL_PORT))
+    ready = multiprocessing.Event()
+    server = multiprocessing.Process(target=fake_controller, args=(args.arms, args.hz, with_main, ready), daemon=True)
+    server.start()
+    ready.wait(10)
+    print('arms={}, report {} Hz, duration={}s'.format(args.arms, args.hz, args.duration))
+    try:
+        for mode in ['threads', 'reactor']:
+            run(mode, args.arms, with_main, args.duration)
+    finally:
+        server.terminate()
+
+
+if __name__ == '__main__':
+    main()
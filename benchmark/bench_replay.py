@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2023, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+"""
+Replay a wire capture (XArmAPI(..., capture=path)) through the receive side of the sdk without a robot:
+    main:   the main socket rx bytes through RxRingBuffer framing and RxParse
+    report: the report socket rx bytes through ReportFrameReader, the report decoding and the report callbacks
+
+Both are driven as fast as possible from the calling thread, so the numbers are the cost of each layer.
+
+Usage:
+    python3 bench_replay.py [capture.xcap] [--repeat 5]
+
+Without a capture file, a capture is synthesized (rich report frames at 100 Hz and get_state replies)
+"""
+
+import os
+import sys
+import time
+import struct
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from xarm.wrapper import XArmAPI
+from xarm.core.comm import WireRecorder, ReplayPort
+from xarm.core.comm.base import RxRingBuffer, ReportFrameReader
+from xarm.core.comm.capture import CAPTURE_RX, CAPTURE_TX
+from xarm.core.wrapper import UxbusCmdTcp
+
+REPORT_SIZE = 508
+
+
+def synthesize(path, seconds=10):
+    recorder = WireRecorder(path, append=False)
+    stream = bytearray()
+    for i in range(seconds * 100):
+        frame = bytearray(REPORT_SIZE)
+        frame[0:4] = struct.pack('>I', REPORT_SIZE)
+        frame[4] = 2
+        frame[5:7] = struct.pack('>H', i % 65536)
+        frame[7:35] = struct.pack('<7f', *[0.01 * i] * 7)
+        stream += frame
+        # the report socket is read 1024 bytes at a time
+        while len(stream) >= 1024:
+            recorder.record('report-socket', CAPTURE_RX, stream[:1024])
+            del stream[:1024]
+        recorder.record('main-socket', CAPTURE_TX, struct.pack('>HHHBB', i % 65535 + 1, 2, 2, 13, 13))
+        recorder.record('main-socket', CAPTURE_RX, struct.pack('>HHHBBB', i % 65535 + 1, 2, 3, 13, 0, 2))
+    recorder.close()
+
+
+def drain(port, step):
+    try:
+        while True:
+            step()
+    except EOFError:
+        pass
+
+
+def bench_main(path):
+    port = ReplayPort(path, 'main-socket', speed=0, start=False)
+    ring = RxRingBuffer()
+    count = [0]
+
+    def put(data, is_report=False):
+        bytes(data)
+        count[0] += 1
+
+    def step():
+        num = port.com_read_into(ring.writable(port.buffer_size))
+        ring.commit(num)
+        ring.put_modbus_frames(put)
+    start = time.perf_counter()
+    drain(port, step)
+    return count[0], time.perf_counter() - start
+
+
+def bench_report(path, arm, decode=True):
+    port = ReplayPort(path, 'report-socket', speed=0, start=False)
+    reader = ReportFrameReader(port)
+    slot = port.report_slot
+    count = [0]
+
+    def step():
+        reader.read_once()
+        if slot.seq != slot.read_seq:
+            frame = slot.take(0)
+            count[0] += 1
+            if decode:
+                arm._arm._handle_report_data(frame)
+    start = time.perf_counter()
+    drain(port, step)
+    return count[0], time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('capture', nargs='?', default=None)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    path = args.capture
+    if path is None:
+        path = os.path.join(tempfile.gettempdir(), 'bench_replay.xcap')
+        synthesize(path)
+        print('synthesized capture: {}'.format(path))
+
+    arm = XArmAPI('127.0.0.1', do_not_open=True)
+    # the report decoding only needs the state of the command layer, give it a port that never receives
+    arm._arm.arm_cmd = UxbusCmdTcp(ReplayPort(path, 'main-socket', start=False))
+    arm._arm._is_old_protocol = False
+    callbacks = [0]
+
+    def on_report(data):
+        callbacks[0] += 1
+    arm.register_report_callback(on_report)
+
+    for name, func in [('main', lambda: bench_main(path)),
+                       ('framing', lambda: bench_report(path, arm, decode=False)),
+                       ('report', lambda: bench_report(path, arm))]:
+        best = None
+        count = 0
+        for _ in range(args.repeat):
+            count, elapsed = func()
+            best = elapsed if best is None else min(best, elapsed)
+        if count:
+            print('{:>8}: {:6d} frames, {:10.0f} frames/s, {:7.2f} us/frame'.format(
+                name, count, count / best, best * 1e6 / count))
+        else:
+            print('{:>8}: no frames'.format(name))
+    print('report callbacks: {}'.format(callbacks[0]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2023, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+"""
+Microbenchmark of the report decoding: the former field by field decoding (a convert slice per field,
+world_offset/tcp_load rounded through str.format) against the precompiled decoders of report_decoder
+(one struct.unpack_from per frame), for the normal/rich/real frames. The decoded values are compared first.
+With --handler, the whole Base._handle_report_data of a rich frame is timed as well, with the lazily decoded
+groups not read (lazy_report=True) and decoded on every frame (lazy_report=False).
+
+Usage:
+    python3 bench_report.py [--number 20000] [--repeat 5] [--handler]
+"""
+
+import os
+import sys
+import math
+import time
+import struct
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from xarm.core.utils import convert
+from xarm.x3.report_decoder import get_report_decoder
+
+
+def old_normal(rx_data):
+    fields = {
+        'state_mode': rx_data[4],
+        'cmd_num': convert.bytes_to_u16(rx_data[5:7]),
+        'angles': convert.bytes_to_fp32s(rx_data[7:7 * 4 + 7], 7),
+        'pose': convert.bytes_to_fp32s(rx_data[35:6 * 4 + 35], 6),
+        'torque': convert.bytes_to_fp32s(rx_data[59:7 * 4 + 59], 7),
+        'pose_offset': convert.bytes_to_fp32s(rx_data[91:6 * 4 + 91], 6),
+        'tcp_load': [float('{:.3f}'.format(i)) for i in convert.bytes_to_fp32s(rx_data[115:4 * 4 + 115], 4)],
+        'length': convert.bytes_to_u32(rx_data[0:4]),
+        'gravity_direction': convert.bytes_to_fp32s(rx_data[133:3 * 4 + 133], 3),
+    }
+    fields['mtbrake'], fields['mtable'], fields['error_code'], fields['warn_code'] = rx_data[87:91]
+    fields['collis_sens'], fields['teach_sens'] = rx_data[131:133]
+    return fields
+
+
+def old_rich(rx_data):
+    fields = old_normal(rx_data)
+    fields['arm_type'], fields['arm_axis'] = rx_data[145:147]
+    fields['trs_msg'] = convert.bytes_to_fp32s(rx_data[181:201], 5)
+    fields['p2p_msg'] = convert.bytes_to_fp32s(rx_data[201:221], 5)
+    fields['rot_msg'] = convert.bytes_to_fp32s(rx_data[221:229], 2)
+    fields['servo_codes'] = [val for val in rx_data[229:245]]
+    fields['temperatures'] = list(struct.unpack('>7b', struct.pack('>7B', *rx_data[245:252])))
+    fields['speeds'] = convert.bytes_to_fp32s(rx_data[252:8 * 4 + 252], 8)
+    fields['count'] = convert.bytes_to_u32(rx_data[284:288])
+    world_offset = convert.bytes_to_fp32s(rx_data[288:6 * 4 + 288], 6)
+    for i in range(len(world_offset)):
+        if i < 3:
+            world_offset[i] = float('{:.3f}'.format(world_offset[i]))
+        else:
+            world_offset[i] = float('{:.6f}'.format(world_offset[i]))
+    fields['world_offset'] = world_offset
+    fields['collision_tool_params'] = convert.bytes_to_fp32s(rx_data[317:341], 6)
+    fields['voltages'] = convert.bytes_to_u16s(rx_data[341:355], 7)
+    fields['currents'] = convert.bytes_to_fp32s(rx_data[355:383], 7)
+    fields['cgpio_analogs'] = convert.bytes_to_u16s(rx_data[385:401], 8)
+    fields['cgpio_input_conf'] = list(map(int, rx_data[401:409]))
+    fields['cgpio_output_conf'] = list(map(int, rx_data[409:417]))
+    fields['ft_ext_force'] = convert.bytes_to_fp32s(rx_data[433:457], 6)
+    fields['ft_raw_force'] = convert.bytes_to_fp32s(rx_data[457:481], 6)
+    fields['iden_progress'] = rx_data[481]
+    fields['pose_aa'] = convert.bytes_to_fp32s(rx_data[482:494], 3)
+    fields['reduced_tcp_boundary'] = convert.bytes_to_16s(rx_data[496:508], 6)
+    return fields
+
+
+def old_real(rx_data):
+    return {
+        'state_mode': rx_data[4],
+        'cmd_num': convert.bytes_to_u16(rx_data[5:7]),
+        'angles': convert.bytes_to_fp32s(rx_data[7:7 * 4 + 7], 7),
+        'pose': convert.bytes_to_fp32s(rx_data[35:6 * 4 + 35], 6),
+        'torque': convert.bytes_to_fp32s(rx_data[59:7 * 4 + 59], 7),
+        'ft_ext_force': convert.bytes_to_fp32s(rx_data[87:111], 6),
+        'ft_raw_force': convert.bytes_to_fp32s(rx_data[111:135], 6),
+    }
+
+
+def new_decode(decoder, rounded):
+    def decode(rx_data):
+        fields = decoder.decode(rx_data)
+        fields['tcp_load'] = [round(i, 3) for i in fields['tcp_load']]
+        if rounded:
+            fields['world_offset'] = [round(v, 3 if i < 3 else 6) for i, v in enumerate(fields['world_offset'])]
+        return fields
+    return decode
+
+
+def make_frame(rnd, length):
+    frame = bytearray(rnd.getrandbits(8) for _ in range(length))
+    struct.pack_into('>I', frame, 0, length)
+    for offset in range(7, length - 3, 4):
+        # floats everywhere the layouts have floats, the integers keep random bytes
+        if rnd.random() < 0.9:
+            struct.pack_into('<f', frame, offset, rnd.uniform(-1000, 1000))
+    return bytes(frame)
+
+
+def same(old, new):
+    for name, value in old.items():
+        other = new[name]
+        if isinstance(value, float) and math.isnan(value) and math.isnan(other):
+            continue
+        if value != other and not (isinstance(value, list) and
+                                   all(a == b or (a != a and b != b) for a, b in zip(value, other))):
+            return name
+    return None
+
+
+def timeit(func, arg, number, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func(arg)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1e6 / number
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--number', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--handler', action='store_true')
+    args = parser.parse_args()
+
+    rnd = random.Random(0)
+    cases = [
+        ('normal', 145, old_normal, new_decode(get_report_decoder('normal', False, 145), False)),
+        ('rich', 508, old_rich, new_decode(get_report_decoder('rich', False, 508), True)),
+        ('real', 135, old_real, lambda rx_data, d=get_report_decoder('real', False, 135): d.decode(rx_data)),
+    ]
+    print('{:>10} {:>6} {:>10} {:>10} {:>8}'.format('report', 'size', 'old(us)', 'new(us)', 'speedup'))
+    for name, length, old, new in cases:
+        for _ in range(200):
+            frame = make_frame(rnd, length)
+            diff = same(old(frame), new(frame))
+            assert diff is None, '{}: {} differs'.format(name, diff)
+        old_us = timeit(old, frame, args.number, args.repeat)
+        new_us = timeit(new, frame, args.number, args.repeat)
+        print('{:>10} {:>6d} {:>10.3f} {:>10.3f} {:>7.1f}x'.format(name, length, old_us, new_us, old_us / new_us))
+
+    if args.handler:
+        from xarm.wrapper import XArmAPI
+
+        class _Cmd(object):
+            has_err_warn = False
+
+        frame = bytearray(make_frame(rnd, 508))
+        frame[4] = 0x00
+        frame[87:91] = b'\xff\xff\x00\x00'
+        frame[131:133] = b'\x03\x03'
+        frame[229:245] = bytes(16)
+        for lazy_report in (False, True):
+            arm = XArmAPI(do_not_open=True, lazy_report=lazy_report)._arm
+            arm.arm_cmd = _Cmd()
+            arm._is_sync = True
+            arm._only_report_err_warn_changed = True
+            handler_us = timeit(arm._handle_report_data, bytes(frame), args.number // 4, args.repeat)
+            print('{:>10} {:>6d} {:>10} {:>10.3f}'.format('lazy' if lazy_report else 'handler', 508, '-', handler_us))
+
+
+if __name__ == '__main__':
+    main()
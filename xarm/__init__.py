@@ -1,2 +1,2 @@
-from .wrapper import XArmAPI
+from .wrapper import XArmAPI, AsyncXArmAPI
 from .version import __version__
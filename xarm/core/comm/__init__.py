@@ -3,3 +3,6 @@ try:
 except:
     SerialPort = None
 from .socket_port import SocketPort
+from .reactor import SocketReactor
+from .async_socket_port import AsyncSocketPort
+from .capture import WireRecorder, WireCapture, ReplayPort
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2023, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+import os
+import asyncio
+import platform
+from ..utils.log import logger
+from ..utils import convert
+from ..config.x_config import XCONF
+from .base import RxRingBuffer
+
+
+class AsyncSocketPort(object):
+    """
+    Socket port on asyncio streams, all the receive work runs as tasks on the event loop (no recv/heartbeat threads)
+    main-socket: responses are routed to the future registered for their transaction id,
+        feedback frames (funcode 0xFF) are handed to fb_callback
+    report-socket: every report frame is handed to report_callback and kept as the latest frame for read()
+    """
+    def __init__(self, server_ip, server_port, heartbeat=False, buffer_size=XCONF.SocketConf.TCP_CONTROL_BUF_SIZE,
+                 forbid_uds=False, fb_callback=None, report_callback=None):
+        is_main_tcp = server_port == XCONF.SocketConf.TCP_CONTROL_PORT or server_port == XCONF.SocketConf.TCP_CONTROL_PORT + 1
+        self.port_type = 'main-socket' if is_main_tcp else 'report-socket'
+        self.server_ip = server_ip
+        self.server_port = server_port
+        self.buffer_size = buffer_size
+        self.heartbeat = heartbeat
+        self.forbid_uds = forbid_uds
+        self.fb_callback = fb_callback
+        self.report_callback = report_callback
+        self._reader = None
+        self._writer = None
+        self._connected = False
+        self._tasks = []
+        self._pending = {}
+        self._report_frame = None
+        self._report_event = None
+        self.report_seq = 0
+
+    @property
+    def connected(self):
+        return self._connected
+
+    async def connect(self, timeout=1):
+        try:
+            if not self.forbid_uds and platform.system() == 'Linux':
+                uds_path = os.path.join('/tmp/xarmcontroller_uds_{}'.format(self.server_port))
+                if os.path.exists(uds_path):
+                    try:
+                        self._reader, self._writer = await asyncio.wait_for(asyncio.open_unix_connection(uds_path), timeout)
+                        logger.info('{} connect {} success, uds_{}'.format(self.port_type, self.server_ip, self.server_port))
+                    except Exception:
+                        self._reader, self._writer = None, None
+            if self._writer is None:
+                self._reader, self._writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.server_ip, self.server_port), timeout)
+                logger.info('{} connect {} success'.format(self.port_type, self.server_ip))
+            self._connected = True
+        except Exception as e:
+            logger.info('{} connect {} failed, {}'.format(self.port_type, self.server_ip, e))
+            self._connected = False
+            return -1
+        loop = asyncio.get_event_loop()
+        self._report_event = asyncio.Event()
+        if self.port_type == 'report-socket':
+            self._tasks.append(loop.create_task(self._recv_report_proc()))
+        else:
+            self._tasks.append(loop.create_task(self._recv_proc()))
+            if self.heartbeat:
+                self._tasks.append(loop.create_task(self._heartbeat_proc()))
+        return 0
+
+    def close(self):
+        self._connected = False
+        for task in self._tasks:
+            if not task.done():
+                task.cancel()
+        self._tasks = []
+        if self._writer is not None:
+            try:
+                self._writer.close()
+            except Exception:
+                pass
+        self._release_pending()
+        if self._report_event is not None:
+            self._report_event.set()
+
+    def flush(self, fromid=-1, toid=-1):
+        return 0 if self.connected else -1
+
+    def write(self, data):
+        if not self.connected:
+            return -1
+        try:
+            # the transport may keep a reference to data until it is sent, the frames of the command layer are
+            # packed in a reused buffer
+            data = bytes(data)
+            logger.verbose('[{}] send: {}'.format(self.port_type, data))
+            self._writer.write(data)
+            return 0
+        except Exception as e:
+            self._connected = False
+            logger.error('[{}] send error: {}'.format(self.port_type, e))
+            return -1
+
+    def register(self, trans_id):
+        future = asyncio.get_event_loop().create_future()
+        self._pending[trans_id] = future
+        return future
+
+    def unregister(self, trans_id):
+        return self._pending.pop(trans_id, None)
+
+    async def wait(self, trans_id, timeout=None):
+        future = self._pending.get(trans_id)
+        if future is None:
+            return -1
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return -1
+        finally:
+            self._pending.pop(trans_id, None)
+
+    async def read(self, timeout=None):
+        """
+        Wait for the next report frame (report-socket only)
+        """
+        if not self.connected:
+            return -1
+        seq = self.report_seq
+        while self.connected and self.report_seq == seq:
+            self._report_event.clear()
+            try:
+                await asyncio.wait_for(self._report_event.wait(), timeout)
+            except asyncio.TimeoutError:
+                return -1
+        return self._report_frame if self.report_seq != seq else -1
+
+    def _release_pending(self):
+        pending = self._pending
+        self._pending = {}
+        for future in pending.values():
+            if not future.done():
+                future.set_result(-1)
+
+    def _put_frame(self, data):
+        if data[6] == 0xFF:
+            if self.fb_callback:
+                self.fb_callback(bytes(data))
+            return
+        future = self._pending.get((data[0] << 8) | data[1])
+        if future is not None and not future.done():
+            future.set_result(bytes(data))
+
+    def _put_report(self, frame):
+        self._report_frame = frame
+        self.report_seq += 1
+        self._report_event.set()
+        if self.report_callback:
+            self.report_callback(frame)
+
+    async def _heartbeat_proc(self):
+        logger.debug('{} heartbeat task start'.format(self.port_type))
+        heat_data = bytes([0, 0, 0, 1, 0, 2, 0, 0])
+        while self.connected:
+            if self.write(heat_data) == -1:
+                break
+            await asyncio.sleep(1)
+        logger.debug('{} heartbeat task had stopped'.format(self.port_type))
+
+    async def _recv_proc(self):
+        logger.debug('[{}] recv task start'.format(self.port_type))
+        rx_ring = RxRingBuffer(max(self.buffer_size * 64, 65536))
+        try:
+            while self.connected:
+                data = await self._reader.read(65536)
+                if len(data) == 0:
+                    logger.error('[{}] socket read failed, len=0'.format(self.port_type))
+                    break
+                num = len(data)
+                rx_ring.writable(num)[:num] = data
+                rx_ring.commit(num)
+                rx_ring.put_modbus_frames(self._put_frame)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            if self.connected:
+                logger.error('[{}] recv error: {}'.format(self.port_type, e))
+        finally:
+            self.close()
+        logger.debug('[{}] recv task had stopped'.format(self.port_type))
+
+    async def _recv_report_proc(self):
+        logger.debug('[{}] recv task start'.format(self.port_type))
+        try:
+            head = await self._reader.readexactly(4)
+            size = convert.bytes_to_u32(head)
+            size_is_not_confirm = size == 233
+            logger.info('report_data_size: {}, size_is_not_confirm={}'.format(size, size_is_not_confirm))
+            frame = head + await self._reader.readexactly(size - 4)
+            if size_is_not_confirm:
+                # some firmware report 233 as the length of a 245 bytes frame
+                head = await self._reader.readexactly(4)
+                if convert.bytes_to_u32(head) == 233:
+                    size_is_not_confirm = False
+                    self._put_report(frame)
+                    frame = head + await self._reader.readexactly(size - 4)
+                else:
+                    size = 245
+                    frame += head + await self._reader.readexactly(size - 237)
+            while self.connected:
+                length = convert.bytes_to_u32(frame[0:4])
+                if length != size and not (size_is_not_confirm and length == 233):
+                    logger.error('report data error, close, length={}, size={}'.format(length, size))
+                    break
+                self._put_report(frame)
+                frame = await self._reader.readexactly(size)
+        except asyncio.CancelledError:
+            pass
+        except asyncio.IncompleteReadError:
+            logger.error('[{}] socket read failed, len=0'.format(self.port_type))
+        except Exception as e:
+            if self.connected:
+                logger.error('[{}] recv error: {}'.format(self.port_type, e))
+        finally:
+            self.close()
+        logger.debug('[{}] recv task had stopped'.format(self.port_type))
@@ -19,17 +19,267 @@ class RxParse(object):
     def __init__(self, rx_que, fb_que=None):
         self.rx_que = rx_que
         self.fb_que = fb_que
+        # trans_id => PendingResponse, replies of the priority lane never go through the queue
+        self.priority = {}
 
     def flush(self, fromid=-1, toid=-1):
         pass
 
+    def _put_priority(self, data):
+        pending = self.priority.get((data[0] << 8) | data[1])
+        if pending is None:
+            return False
+        pending.data = bytes(data)
+        pending.event.set()
+        return True
+
     def put(self, data, is_report=False):
+        if self.priority and not is_report and self._put_priority(data):
+            return
+        # data may be a memoryview on the receive buffer, copy it before queueing
         if not is_report and data[6] == 0xFF:
             if not self.fb_que:
                 return
-            self.fb_que.put(data)
+            self.fb_que.put(bytes(data))
         else:
-            self.rx_que.put(data)
+            self.rx_que.put(bytes(data))
+
+
+class PendingResponse(object):
+    __slots__ = ('event', 'data')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.data = None
+
+
+class TransIdRxParse(RxParse):
+    """
+    Route every response to the request waiting on its transaction id, so several requests can be in flight
+    Frames nobody waits for (late replies after a timeout, heartbeat replies) are dropped.
+    """
+    def __init__(self, rx_que, fb_que=None):
+        super(TransIdRxParse, self).__init__(rx_que, fb_que)
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def register(self, trans_id):
+        pending = PendingResponse()
+        with self._lock:
+            self._pending[trans_id] = pending
+        return pending
+
+    def unregister(self, trans_id):
+        with self._lock:
+            return self._pending.pop(trans_id, None)
+
+    def wait(self, trans_id, timeout=None):
+        with self._lock:
+            pending = self._pending.get(trans_id)
+        if pending is None:
+            return -1
+        try:
+            pending.event.wait(timeout)
+        finally:
+            self.unregister(trans_id)
+        return -1 if pending.data is None else pending.data
+
+    def put(self, data, is_report=False):
+        if not is_report and data[6] == 0xFF:
+            super(TransIdRxParse, self).put(data, is_report)
+            return
+        if self.priority and self._put_priority(data):
+            return
+        with self._lock:
+            pending = self._pending.get((data[0] << 8) | data[1])
+        if pending is not None and pending.data is None:
+            pending.data = bytes(data)
+            pending.event.set()
+
+
+class RxRingBuffer(object):
+    """
+    Preallocated receive buffer for stream sockets
+    The socket writes into the free tail through recv_into, complete frames are handed out as memoryview slices,
+    the read and write cursors rewind to the front when the buffer drains, only a partial frame is ever moved.
+    """
+    def __init__(self, size=65536):
+        self._buf = bytearray(size)
+        self._view = memoryview(self._buf)
+        self._head = 0
+        self._tail = 0
+
+    def __len__(self):
+        return self._tail - self._head
+
+    def clear(self):
+        self._head = 0
+        self._tail = 0
+
+    def writable(self, min_size=1):
+        if self._head == self._tail:
+            self._head = self._tail = 0
+        elif len(self._buf) - self._tail < min_size:
+            pending = self._tail - self._head
+            if pending + min_size > len(self._buf):
+                buf = bytearray(max(len(self._buf) * 2, pending + min_size))
+                buf[:pending] = self._view[self._head:self._tail]
+                self._buf = buf
+                self._view = memoryview(buf)
+            else:
+                self._view[:pending] = self._view[self._head:self._tail]
+            self._head = 0
+            self._tail = pending
+        return self._view[self._tail:]
+
+    def commit(self, num):
+        self._tail += num
+
+    def consume(self, num):
+        data = self._view[self._head:self._head + num]
+        self._head += num
+        return data
+
+    def put_modbus_frames(self, put):
+        """
+        Hand every complete modbus tcp frame to put(), return the number of frames
+        frame: trans_id(2) + prot_id(2) + length(2) + unit_id + pdu
+        """
+        buf = self._buf
+        view = self._view
+        head = self._head
+        tail = self._tail
+        count = 0
+        while tail - head >= 6:
+            end = head + ((buf[head + 4] << 8) | buf[head + 5]) + 6
+            if end > tail:
+                break
+            put(view[head:end])
+            head = end
+            count += 1
+        self._head = head
+        return count
+
+
+class LatestFrameSlot(object):
+    """
+    Single slot mailbox for report frames, only the newest frame is kept
+    The writer fills buffers from acquire() and publishes them, an unread frame is recycled when it is overwritten;
+    the reader owns the frame returned by take() until its next take(), so no buffer is ever written while read.
+    """
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._frame = None
+        self._reading = None
+        self._free = []
+        self.seq = 0        # sequence number of the newest published frame
+        self.read_seq = 0   # sequence number of the frame returned by the last take()
+        self.dropped = 0    # frames overwritten before they were taken
+
+    def acquire(self, size):
+        with self._cond:
+            buf = self._free.pop() if self._free else None
+        if buf is None or len(buf) != size:
+            buf = bytearray(size)
+        return buf
+
+    def release(self, buf):
+        with self._cond:
+            self._free.append(buf)
+
+    def publish(self, frame):
+        with self._cond:
+            if self._frame is not None:
+                self._free.append(self._frame)
+                self.dropped += 1
+            self._frame = frame
+            self.seq += 1
+            self._cond.notify()
+
+    def take(self, timeout=None):
+        with self._cond:
+            if self._frame is None:
+                self._cond.wait(timeout)
+                if self._frame is None:
+                    return None
+            if self._reading is not None:
+                self._free.append(self._reading)
+            self._reading = frame = self._frame
+            self._frame = None
+            self.read_seq = self.seq
+            return frame
+
+    def wakeup(self):
+        with self._cond:
+            self._cond.notify_all()
+
+
+class ReportFrameReader(object):
+    """
+    Incremental reader of the report socket, each read_once() does a single recv_into and publishes the complete
+    frames to the report slot of the port, so it can be driven by a blocking thread or by a selector
+    The size header is read alone only once, after that every read goes straight into a frame buffer.
+    """
+    def __init__(self, port):
+        self.port = port
+        self.slot = port.report_slot
+        self.size = 0
+        self.data_num = 0
+        self.size_is_not_confirm = False
+        self.buffer = bytearray(4)
+        self.view = memoryview(self.buffer)
+
+    def read_once(self):
+        """
+        :return: the number of bytes read, 0 if the socket returned nothing, -1 on a broken frame
+        """
+        num = self.port.com_read_into(self.view[self.data_num:])
+        if num == 0:
+            return 0
+        self.data_num += num
+        slot = self.slot
+        if self.size == 0:
+            if self.data_num != 4:
+                return num
+            size = convert.bytes_to_u32(self.buffer)
+            if size == 233:
+                self.size_is_not_confirm = True
+                size = 245
+            logger.info('report_data_size: {}, size_is_not_confirm={}'.format(size, self.size_is_not_confirm))
+            self.size = size
+            buffer = slot.acquire(size)
+            buffer[:4] = self.view
+            self.buffer = buffer
+            self.view = memoryview(buffer)
+            return num
+        if self.data_num < self.size:
+            return num
+        buffer = self.buffer
+        length = convert.bytes_to_u32(buffer)
+        if self.size_is_not_confirm and convert.bytes_to_u32(buffer[233:237]) == 233:
+            # the frame is really 233 bytes, the last 12 bytes belong to the next frame
+            self.size = size = 233
+            self.size_is_not_confirm = False
+            frame = slot.acquire(size)
+            frame[:] = self.view[:size]
+            next_buffer = slot.acquire(size)
+            self.data_num = 245 - size
+            next_buffer[:self.data_num] = self.view[size:245]
+            slot.release(buffer)
+            slot.publish(frame)
+            self.buffer = next_buffer
+            self.view = memoryview(next_buffer)
+            return num
+
+        if length != self.size and not (self.size_is_not_confirm and self.size == 245 and length == 233):
+            logger.error('report data error, close, length={}, size={}'.format(length, self.size))
+            return -1
+
+        slot.publish(buffer)
+        self.buffer = slot.acquire(self.size)
+        self.view = memoryview(self.buffer)
+        self.data_num = 0
+        return num
 
 
 class Port(threading.Thread):
@@ -42,11 +292,15 @@ class Port(threading.Thread):
         self._connected = False
         self.com = None
         self.rx_parse = RxParse(self.rx_que, self.fb_que)
+        self.report_slot = LatestFrameSlot()
         self.com_read = None
+        self.com_read_into = None
         self.com_write = None
         self.port_type = ''
         self.buffer_size = 1
         self.heartbeat_thread = None
+        self.reactor = None
+        self.recorder = None
         self.alive = True
 
     @property
@@ -67,6 +321,9 @@ class Port(threading.Thread):
                 self.com.shutdown(socket.SHUT_RDWR)
             except:
                 pass
+        if self.reactor is not None and self.reactor.unregister(self) == 0:
+            # the reactor may still select on the socket, it closes it once the unregister is processed
+            return
         try:
             self.com.close()
         except:
@@ -85,7 +342,8 @@ class Port(threading.Thread):
             return -1
         try:
             with self.write_lock:
-                logger.verbose('[{}] send: {}'.format(self.port_type, data))
+                if logger.isEnabledFor(logger.VERBOSE):
+                    logger.verbose('[{}] send: {}'.format(self.port_type, bytes(data)))
                 self.com_write(data)
             return 0
         except Exception as e:
@@ -96,6 +354,10 @@ class Port(threading.Thread):
     def read(self, timeout=None):
         if not self.connected:
             return -1
+        if self.port_type == 'report-socket':
+            # the returned frame stays valid until the next read
+            frame = self.report_slot.take(timeout)
+            return -1 if frame is None else frame
         try:
             buf = self.rx_que.get(timeout=timeout)
             logger.verbose('[{}] recv: {}'.format(self.port_type, buf))
@@ -140,27 +402,12 @@ class Port(threading.Thread):
         logger.debug('[{}] recv thread start'.format(self.port_type))
         failed_read_count = 0
         timeout_count = 0
-        size = 0
-        data_num = 0
-        buffer = b''
-        size_is_not_confirm = False
-
-        data_prev_us = 0
-        data_curr_us = 0
-        data_max_interval_us = 0
-        data_over_us = 205 * 1000  # over 205ms, cnts++
-        data_over_cnts = 0
-
-        recv_prev_us = 0
-        recv_curr_us = 0
-        recv_max_interval_us = 0
-        recv_over_us = 300 * 1000  # over 300ms, cnts++
-        recv_over_cnts = 0
+        reader = ReportFrameReader(self)
 
         try:
             while self.connected and self.alive:
                 try:
-                    data = self.com_read(4 - data_num if size == 0 else (size - data_num))
+                    num = reader.read_once()
                 except socket.timeout:
                     timeout_count += 1
                     if timeout_count > 3:
@@ -168,80 +415,18 @@ class Port(threading.Thread):
                         logger.error('[{}] socket read timeout'.format(self.port_type))
                         break
                     continue
-                else:
-                    if len(data) == 0:
-                        failed_read_count += 1
-                        if failed_read_count > 5:
-                            self._connected = False
-                            logger.error('[{}] socket read failed, len=0'.format(self.port_type))
-                            break
-                        time.sleep(0.1)
-                        continue
-                    data_num += len(data)
-                    buffer += data
-                    if size == 0:
-                        if data_num != 4:
-                            continue
-                        size = convert.bytes_to_u32(buffer[0:4])
-                        if size == 233:
-                            size_is_not_confirm = True
-                            size = 245
-                        logger.info('report_data_size: {}, size_is_not_confirm={}'.format(size, size_is_not_confirm))
-                    else:
-                        if data_num < size:
-                            continue
-                        if size_is_not_confirm:
-                            size_is_not_confirm = True
-                            if convert.bytes_to_u32(buffer[233:237]) == 233:
-                                size = 233
-                                buffer = buffer[233:]
-                                continue
-
-                        if convert.bytes_to_u32(buffer[0:4]) != size and not (size_is_not_confirm and size == 245 and convert.bytes_to_u32(buffer[0:4]) == 233):
-                            logger.error('report data error, close, length={}, size={}'.format(convert.bytes_to_u32(buffer[0:4]), size))
-                            break
-
-                        # # buffer[494:502]
-                        # data_curr_us = convert.bytes_to_u64(buffer[-8:])
-                        # recv_curr_us = time.monotonic() * 1000000
-                        #
-                        # if data_prev_us != 0 and recv_prev_us != 0:
-                        #     data_interval_us = data_curr_us - data_prev_us
-                        #     data_over_cnts += 1 if data_interval_us > data_over_us else 0
-                        #
-                        #     recv_interval_us = recv_curr_us - recv_prev_us
-                        #     recv_over_cnts += 1 if recv_interval_us > recv_over_us else 0
-                        #
-                        #     print_flag = False
-                        #
-                        #     if data_interval_us > data_max_interval_us:
-                        #         data_max_interval_us = data_interval_us
-                        #         print_flag = True
-                        #     elif data_interval_us > data_over_us:
-                        #         print_flag = True
-                        #
-                        #     if recv_interval_us > recv_max_interval_us:
-                        #         recv_max_interval_us = recv_interval_us
-                        #         print_flag = True
-                        #     elif recv_interval_us > recv_over_us:
-                        #         print_flag = True
-                        #
-                        #     if print_flag:
-                        #         print('[RECV] Di={}, Dmax={}, Dcnts={}, Ri={}, Rmax={}, Rcnts={}'.format(
-                        #             data_interval_us / 1000, data_max_interval_us / 1000, data_over_cnts,
-                        #             recv_interval_us / 1000, recv_max_interval_us / 1000, recv_over_cnts
-                        #         ))
-                        # data_prev_us = data_curr_us
-                        # recv_prev_us = recv_curr_us
-
-                        if self.rx_que.qsize() > 1:
-                            self.rx_que.get()
-                        self.rx_parse.put(buffer, True)
-                        buffer = b''
-                        data_num = 0
-
-                    timeout_count = 0
-                    failed_read_count = 0
+                if num == 0:
+                    failed_read_count += 1
+                    if failed_read_count > 5:
+                        self._connected = False
+                        logger.error('[{}] socket read failed, len=0'.format(self.port_type))
+                        break
+                    time.sleep(0.1)
+                    continue
+                if num < 0:
+                    break
+                timeout_count = 0
+                failed_read_count = 0
         except Exception as e:
             if self.alive:
                 logger.error('[{}] recv error: {}'.format(self.port_type, e))
@@ -249,6 +434,7 @@ class Port(threading.Thread):
             self.close()
         logger.debug('[{}] recv thread had stopped'.format(self.port_type))
         self._connected = False
+        self.report_slot.wakeup()
 
     def recv_proc(self):
         self.alive = True
@@ -257,14 +443,14 @@ class Port(threading.Thread):
         is_main_serial = self.port_type == 'main-serial'
         try:
             failed_read_count = 0
-            buffer = b''
+            rx_ring = RxRingBuffer(max(self.buffer_size * 64, 65536))
             while self.connected and self.alive:
                 if is_main_tcp:
                     try:
-                        rx_data = self.com_read(self.buffer_size)
+                        num = self.com_read_into(rx_ring.writable(self.buffer_size))
                     except socket.timeout:
                         continue
-                    if len(rx_data) == 0:
+                    if num == 0:
                         failed_read_count += 1
                         if failed_read_count > 5:
                             self._connected = False
@@ -272,16 +458,8 @@ class Port(threading.Thread):
                             break
                         time.sleep(0.1)
                         continue
-                    buffer += rx_data
-                    while True:
-                        if len(buffer) < 6:
-                            break
-                        length = convert.bytes_to_u16(buffer[4:6]) + 6
-                        if len(buffer) < length:
-                            break
-                        rx_data = buffer[:length]
-                        buffer = buffer[length:]
-                        self.rx_parse.put(rx_data)
+                    rx_ring.commit(num)
+                    rx_ring.put_modbus_frames(self.rx_parse.put)
                 elif is_main_serial:
                     rx_data = self.com_read(self.com.in_waiting or self.buffer_size)
                     self.rx_parse.put(rx_data)
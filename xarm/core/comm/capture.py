@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2023, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+import time
+import struct
+import threading
+from ..utils.log import logger
+from .base import Port
+from .uxbus_cmd_protocol import Ux2HexProtocol
+from ..config.x_config import XCONF
+
+# Wire capture file format (little endian):
+#     file header: magic(4, b'XCAP') + version(u16)
+#     record:      timestamp(f64, time.time()) + tag(u8) + length(u32) + data(length)
+#     tag:         bit7 is the direction (1: tx, sent by the sdk, 0: rx, received from the controller),
+#                  bit0~6 is the index of the port type in CAPTURE_PORT_TYPES
+# Records of all the ports of an arm are interleaved in one file, a reopened file is appended to.
+
+CAPTURE_MAGIC = b'XCAP'
+CAPTURE_VERSION = 1
+CAPTURE_PORT_TYPES = ('main-socket', 'report-socket', '503-socket', 'main-serial')
+CAPTURE_RX = 0
+CAPTURE_TX = 1
+
+_FILE_HEADER = struct.Struct('<4sH')
+_RECORD_HEADER = struct.Struct('<dBI')
+
+
+def capture_port_type(port):
+    if port.port_type == 'main-socket' and getattr(port, 'server_port', None) == XCONF.SocketConf.TCP_CONTROL_PORT + 1:
+        return '503-socket'
+    return port.port_type
+
+
+class WireRecorder(object):
+    """
+    Record the raw bytes of every write and every receive of the attached ports to a capture file
+    Usage:
+        arm = XArmAPI('192.168.1.185', capture='/tmp/xarm.xcap')
+        or
+        recorder = WireRecorder('/tmp/xarm.xcap')
+        arm = XArmAPI('192.168.1.185', capture=recorder)
+    """
+    def __init__(self, path, append=True):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, 'ab' if append else 'wb')
+        if self._file.tell() == 0:
+            self._file.write(_FILE_HEADER.pack(CAPTURE_MAGIC, CAPTURE_VERSION))
+        self.records = 0
+
+    @property
+    def closed(self):
+        return self._file is None
+
+    def record(self, port_type, direction, data):
+        tag = CAPTURE_PORT_TYPES.index(port_type) | (0x80 if direction == CAPTURE_TX else 0)
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(_RECORD_HEADER.pack(time.time(), tag, len(data)))
+            self._file.write(data)
+            self.records += 1
+
+    def attach(self, port):
+        """
+        Record the port, its com_read/com_read_into/com_write are wrapped, so the receive loops
+        (recv thread or reactor) and Port.write are recorded without any change
+        """
+        port_type = capture_port_type(port)
+        record = self.record
+        com_read, com_read_into, com_write = port.com_read, port.com_read_into, port.com_write
+        if com_read is not None:
+            def _com_read(size):
+                data = com_read(size)
+                if data:
+                    record(port_type, CAPTURE_RX, data)
+                return data
+            port.com_read = _com_read
+        if com_read_into is not None:
+            def _com_read_into(buf):
+                num = com_read_into(buf)
+                if num:
+                    record(port_type, CAPTURE_RX, buf[:num])
+                return num
+            port.com_read_into = _com_read_into
+        if com_write is not None:
+            def _com_write(data):
+                ret = com_write(data)
+                record(port_type, CAPTURE_TX, data)
+                return ret
+            port.com_write = _com_write
+        port.recorder = self
+
+    def flush(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class WireCapture(object):
+    """
+    Reader of a capture file, iterate it to get (timestamp, port_type, direction, data) records
+    """
+    def __init__(self, path):
+        self.path = path
+
+    def __iter__(self):
+        with open(self.path, 'rb') as f:
+            header = f.read(_FILE_HEADER.size)
+            if len(header) != _FILE_HEADER.size or _FILE_HEADER.unpack(header)[0] != CAPTURE_MAGIC:
+                raise ValueError('{} is not a wire capture file'.format(self.path))
+            while True:
+                header = f.read(_RECORD_HEADER.size)
+                if len(header) < _RECORD_HEADER.size:
+                    break
+                timestamp, tag, length = _RECORD_HEADER.unpack(header)
+                data = f.read(length)
+                if len(data) < length:
+                    logger.warning('capture {} is truncated'.format(self.path))
+                    break
+                yield timestamp, CAPTURE_PORT_TYPES[tag & 0x7F], CAPTURE_TX if tag & 0x80 else CAPTURE_RX, data
+
+    def records(self, port_type=None, direction=None):
+        for record in self:
+            if (port_type is None or record[1] == port_type) and (direction is None or record[2] == direction):
+                yield record
+
+
+class _ReplayStream(object):
+    """
+    Stand-in of the socket/serial object of a port, reads return the recorded rx chunks, writes are dropped
+    """
+    def __init__(self, records, speed, on_eof):
+        self._records = iter(records)
+        self._speed = speed
+        self._on_eof = on_eof
+        self._chunk = b''
+        self._offset = 0
+        self._first_time = None
+        self._start_time = 0
+        self.rx_bytes = 0
+        self.tx_bytes = 0
+
+    def _next_chunk(self):
+        while self._offset >= len(self._chunk):
+            try:
+                timestamp, _, _, data = next(self._records)
+            except StopIteration:
+                self._on_eof()
+                raise EOFError('end of capture')
+            if self._speed:
+                if self._first_time is None:
+                    self._first_time = timestamp
+                    self._start_time = time.monotonic()
+                delay = (timestamp - self._first_time) / self._speed - (time.monotonic() - self._start_time)
+                if delay > 0:
+                    time.sleep(delay)
+            self._chunk = data
+            self._offset = 0
+
+    @property
+    def in_waiting(self):
+        self._next_chunk()
+        return len(self._chunk) - self._offset
+
+    def recv_into(self, buf):
+        self._next_chunk()
+        num = min(len(buf), len(self._chunk) - self._offset)
+        buf[:num] = self._chunk[self._offset:self._offset + num]
+        self._offset += num
+        self.rx_bytes += num
+        return num
+
+    def recv(self, size):
+        self._next_chunk()
+        data = self._chunk[self._offset:self._offset + size]
+        self._offset += len(data)
+        self.rx_bytes += len(data)
+        return data
+
+    def send(self, data):
+        self.tx_bytes += len(data)
+        return len(data)
+
+    def sendall(self, data):
+        self.tx_bytes += len(data)
+
+    def shutdown(self, how):
+        pass
+
+    def close(self):
+        pass
+
+
+class ReplayPort(Port):
+    """
+    Port that receives the recorded rx bytes of one port type of a capture file instead of a robot
+    The bytes go through the same receive loop (and framing) as the real port, so rx_que/fb_que/report_slot and
+    everything above them (UxbusCmd, report decoding, callbacks) can be run and benchmarked offline.
+    :param capture: path of the capture file or a WireCapture
+    :param port_type: 'main-socket', 'report-socket', '503-socket' or 'main-serial'
+    :param speed: 1 replays with the recorded timing, 2 twice as fast, ..., 0 as fast as possible
+    :param start: start the recv thread, if False the receive loop (or a ReportFrameReader) can be driven by the caller
+    """
+    def __init__(self, capture, port_type='report-socket', speed=1, fb_que=None, start=True,
+                 rxque_max=XCONF.SocketConf.TCP_RX_QUE_MAX, buffer_size=None):
+        super(ReplayPort, self).__init__(rxque_max, fb_que)
+        if not isinstance(capture, WireCapture):
+            capture = WireCapture(capture)
+        self.capture = capture
+        self.port_type = 'main-socket' if port_type == '503-socket' else port_type
+        if buffer_size is None:
+            buffer_size = 1 if port_type == 'main-serial' else XCONF.SocketConf.TCP_CONTROL_BUF_SIZE if port_type != 'report-socket' else 1024
+        self.buffer_size = buffer_size
+        self.com = _ReplayStream(capture.records(port_type, CAPTURE_RX), speed, self._on_eof)
+        if port_type == 'main-serial':
+            self.rx_parse = Ux2HexProtocol(self.rx_que, XCONF.SerialConf.UXBUS_DEF_FROMID, XCONF.SerialConf.UXBUS_DEF_TOID)
+        self.com_read = self.com.recv
+        self.com_read_into = self.com.recv_into
+        self.com_write = self.com.sendall
+        self.eof = threading.Event()
+        self._connected = True
+        if start:
+            self.start()
+
+    def _on_eof(self):
+        # stop the receive loop quietly
+        self.alive = False
+        self.eof.set()
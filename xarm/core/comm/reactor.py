@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2023, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+import time
+import socket
+import selectors
+import threading
+from collections import deque
+from ..utils.log import logger
+from .base import RxRingBuffer, ReportFrameReader
+
+
+class SocketReactor(threading.Thread):
+    """
+    One selector thread that receives for many socket ports (main/503/report sockets of any number of arms)
+    Usage:
+        reactor = SocketReactor()
+        arm1 = XArmAPI('192.168.1.185', reactor=reactor)
+        arm2 = XArmAPI('192.168.1.186', reactor=reactor)
+
+    The received frames go to the same consumers as the per-port recv threads (rx_parse of the main socket and
+    report_slot of the report socket), the heartbeats are sent from the timer of the reactor.
+    """
+    HEARTBEAT_DATA = bytes([0, 0, 0, 1, 0, 2, 0, 0])
+
+    def __init__(self, heartbeat_interval=1, report_timeout=4):
+        super(SocketReactor, self).__init__()
+        self.daemon = True
+        self.heartbeat_interval = heartbeat_interval
+        self.report_timeout = report_timeout
+        self.wakeups = 0
+        self._selector = selectors.DefaultSelector()
+        self._lock = threading.Lock()
+        self._requests = deque()
+        self._ports = {}
+        self._alive = True
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+        self._selector.register(self._wake_r, selectors.EVENT_READ, None)
+
+    @property
+    def alive(self):
+        return self._alive
+
+    def register(self, port, heartbeat=False):
+        """
+        Receive for the port (the port must be connected and its own recv thread must not be started)
+        """
+        with self._lock:
+            if not self._alive:
+                return -1
+            self._requests.append((True, port, heartbeat))
+            if not self.is_alive():
+                self.start()
+        self._wakeup()
+        return 0
+
+    def unregister(self, port):
+        """
+        Stop receiving for the port, the reactor closes its socket once it stopped selecting on it
+        :return: 0, or -1 if the reactor is stopped (the socket is left to the caller)
+        """
+        with self._lock:
+            if not self._alive:
+                return -1
+            self._requests.append((False, port, False))
+        self._wakeup()
+        return 0
+
+    def stop(self):
+        self._alive = False
+        self._wakeup()
+
+    def _wakeup(self):
+        try:
+            self._wake_w.send(b'\x00')
+        except (BlockingIOError, OSError):
+            pass
+
+    def _handle_requests(self):
+        with self._lock:
+            requests = list(self._requests)
+            self._requests.clear()
+        for is_register, port, heartbeat in requests:
+            if is_register:
+                if not port.connected:
+                    port.report_slot.wakeup()
+                    continue
+                if port.port_type == 'report-socket':
+                    handler = ReportFrameReader(port)
+                else:
+                    handler = RxRingBuffer(max(port.buffer_size * 64, 65536))
+                self._ports[port] = [handler, time.monotonic(), time.monotonic() if heartbeat else 0]
+                self._selector.register(port.com, selectors.EVENT_READ, port)
+                logger.debug('[{}] recv by reactor'.format(port.port_type))
+            else:
+                if port in self._ports:
+                    self._drop(port)
+                self._close(port)
+
+    def _drop(self, port):
+        self._ports.pop(port, None)
+        try:
+            self._selector.unregister(port.com)
+        except (KeyError, ValueError):
+            pass
+        if port.connected:
+            port._connected = False
+            port.alive = False
+            try:
+                port.com.close()
+            except:
+                pass
+        port.report_slot.wakeup()
+        logger.debug('[{}] reactor had stopped receiving'.format(port.port_type))
+
+    @staticmethod
+    def _close(port):
+        # the port was closed by its owner (Port.close), not selected any more
+        try:
+            port.com.close()
+        except:
+            pass
+
+    def _recv(self, port):
+        handler, _, _ = state = self._ports[port]
+        if port.port_type == 'report-socket':
+            num = handler.read_once()
+            if num < 0:
+                return -1
+        else:
+            num = port.com_read_into(handler.writable(port.buffer_size))
+            if num > 0:
+                handler.commit(num)
+                handler.put_modbus_frames(port.rx_parse.put)
+        if num == 0:
+            if port.alive:
+                logger.error('[{}] socket read failed, len=0'.format(port.port_type))
+            return -1
+        state[1] = time.monotonic()
+        return num
+
+    def _on_timer(self, now):
+        for port, (_, last_recv_time, last_heartbeat_time) in list(self._ports.items()):
+            if port.port_type == 'report-socket':
+                if now - last_recv_time > self.report_timeout:
+                    logger.error('[{}] socket read timeout'.format(port.port_type))
+                    self._drop(port)
+            elif last_heartbeat_time and now - last_heartbeat_time >= self.heartbeat_interval:
+                self._ports[port][2] = now
+                if port.write(self.HEARTBEAT_DATA) == -1:
+                    self._drop(port)
+
+    def run(self):
+        logger.debug('reactor thread start')
+        next_timer = time.monotonic()
+        try:
+            while self._alive:
+                events = self._selector.select(max(next_timer - time.monotonic(), 0))
+                self.wakeups += 1
+                for key, _ in events:
+                    port = key.data
+                    if port is None:
+                        try:
+                            while self._wake_r.recv(1024):
+                                pass
+                        except (BlockingIOError, OSError):
+                            pass
+                        continue
+                    if port not in self._ports:
+                        continue
+                    try:
+                        if self._recv(port) < 0:
+                            self._drop(port)
+                    except socket.timeout:
+                        continue
+                    except Exception as e:
+                        if port.alive:
+                            logger.error('[{}] recv error: {}'.format(port.port_type, e))
+                        self._drop(port)
+                self._handle_requests()
+                now = time.monotonic()
+                if now >= next_timer:
+                    self._on_timer(now)
+                    next_timer = now + min(self.heartbeat_interval, 0.5)
+        finally:
+            # stopped, unregister/register return -1 from now on, the pending requests are handled here
+            with self._lock:
+                requests = list(self._requests)
+                self._requests.clear()
+            for port in list(self._ports.keys()):
+                self._drop(port)
+            for is_register, port, _ in requests:
+                self._drop(port)
+                if not is_register:
+                    self._close(port)
+            self._selector.close()
+            self._wake_r.close()
+            self._wake_w.close()
+        logger.debug('reactor thread had stopped')
@@ -17,7 +17,7 @@ from ..config.x_config import XCONF
 
 class SerialPort(Port):
     def __init__(self, port, baud=XCONF.SerialConf.SERIAL_BAUD,
-                 rxque_max=XCONF.SerialConf.UXBUS_RXQUE_MAX, protocol=XCONF.SerialConf.UX2_HEX_PROTOCOL):
+                 rxque_max=XCONF.SerialConf.UXBUS_RXQUE_MAX, protocol=XCONF.SerialConf.UX2_HEX_PROTOCOL, recorder=None):
         super(SerialPort, self).__init__(rxque_max)
         self.port_type = 'main-serial'
         try:
@@ -29,6 +29,7 @@ class SerialPort(Port):
 
             self._connected = True
 
+            # only the first byte of a burst is read alone, the rest is read in chunks of in_waiting
             self.buffer_size = 1
 
             if protocol == XCONF.SerialConf.UX2_HEX_PROTOCOL:
@@ -37,6 +38,8 @@ class SerialPort(Port):
                                                XCONF.SerialConf.UXBUS_DEF_TOID)
             self.com_read = self.com.read
             self.com_write = self.com.write
+            if recorder is not None:
+                recorder.attach(self)
             self.start()
         except Exception as e:
             logger.info('{} connect {}:{} failed, {}'.format(self.port_type, port, baud, e))
@@ -90,9 +90,10 @@ class HeartBeatThread(threading.Thread):
 
 class SocketPort(Port):
     def __init__(self, server_ip, server_port, rxque_max=XCONF.SocketConf.TCP_RX_QUE_MAX, heartbeat=False,
-                 buffer_size=XCONF.SocketConf.TCP_CONTROL_BUF_SIZE, forbid_uds=False, fb_que=None):
+                 buffer_size=XCONF.SocketConf.TCP_CONTROL_BUF_SIZE, forbid_uds=False, fb_que=None, reactor=None, recorder=None):
         is_main_tcp = server_port == XCONF.SocketConf.TCP_CONTROL_PORT or server_port == XCONF.SocketConf.TCP_CONTROL_PORT + 1
         super(SocketPort, self).__init__(rxque_max, fb_que)
+        self.server_port = server_port
         if is_main_tcp:
             self.port_type = 'main-socket'
             # self.com.setsockopt(socket.SOL_SOCKET, socket.SO_RCVTIMEO, 5)
@@ -137,12 +138,22 @@ class SocketPort(Port):
             # time.sleep(1)
 
             self.com_read = self.com.recv
-            self.com_write = self.com.send
+            self.com_read_into = self.com.recv_into
+            self.com_write = self.com.sendall
             self.write_lock = threading.Lock()
-            self.start()
-            if heartbeat:
-                self.heartbeat_thread = HeartBeatThread(self)
-                self.heartbeat_thread.start()
+            if recorder is not None:
+                recorder.attach(self)
+            if reactor is not None:
+                # no recv/heartbeat thread, the shared reactor receives for this port
+                if reactor.register(self, heartbeat=heartbeat) != 0:
+                    self.com.close()
+                    raise Exception('the reactor is stopped')
+                self.reactor = reactor
+            else:
+                self.start()
+                if heartbeat:
+                    self.heartbeat_thread = HeartBeatThread(self)
+                    self.heartbeat_thread.start()
         except Exception as e:
             logger.info('{} connect {} failed, {}'.format(self.port_type, server_ip, e))
             # logger.error('{} connect {}:{} failed, {}'.format(self.port_type, server_ip, server_port, e))
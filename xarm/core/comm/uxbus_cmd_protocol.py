@@ -12,89 +12,81 @@ from ..utils import crc16
 from ..utils.log import logger
 
 # ux2_hex_protocol define
-UX2HEX_RXSTART_FROMID = 0
-UX2HEX_RXSTART_TOID = 1
-UX2HEX_RXSTATE_LEN = 2
-UX2HEX_RXSTATE_DATA = 3
-UX2HEX_RXSTATE_CRC1 = 4
-UX2HEX_RXSTATE_CRC2 = 5
 UX2HEX_RXLEN_MAX = 50
 
 
 class Ux2HexProtocol(object):
     """
     fromid and toid: broadcast address is 0xFF
+    frame: toid(1) + fromid(1) + len(1) + data(len) + crc16(2)
+    Every put() appends the chunk to one receive buffer and scans it for complete frames, a header that does not
+    lead to a valid frame (bad length or crc) is skipped by one byte, so the parser resynchronizes on the next header.
     """
     def __init__(self, rx_que, fromid, toid):
         self.rx_que = rx_que
-        self.rxstate = UX2HEX_RXSTART_FROMID
-        self.data_idx = 0
-        self.len = 0
         self.fromid = fromid
         self.toid = toid
-        self.rxbuf = None
+        self.rxbuf = bytearray()
+        # crc of the first crc_num bytes of a partial frame at the front of rxbuf
+        self.crc = crc16.CRC_MODBUS_INIT
+        self.crc_num = 0
 
     # wipe cache , set from_id and to_id
     def flush(self, fromid=-1, toid=-1):
-        self.rxstate = UX2HEX_RXSTART_FROMID
-        self.data_idx = 0
-        self.len = 0
+        self.rxbuf.clear()
+        self.crc = crc16.CRC_MODBUS_INIT
+        self.crc_num = 0
         if fromid != -1:
             self.fromid = fromid
         if toid != -1:
             self.toid = toid
 
+    def _put_frame(self, frame):
+        if self.rx_que.full():
+            self.rx_que.get()
+        self.rx_que.put(frame)
+
     def put(self, rxstr, length=0):
         if length == 0:
             length = len(rxstr)
         if len(rxstr) < length:
             logger.error('len(rxstr) < length')
 
-        for i in range(length):
-            rxch = bytes([rxstr[i]])
-            # print_hex(self.DB_FLG, rxch, 1)
-            # print('state:%d' % (self.rxstate))
-            if UX2HEX_RXSTART_FROMID == self.rxstate:
-                if self.toid == rxch[0] or 255 == self.toid:
-                    self.rxbuf = rxch
-                    self.rxstate = UX2HEX_RXSTART_TOID
-
-            elif UX2HEX_RXSTART_TOID == self.rxstate:
-                if self.fromid == rxch[0] or self.fromid == 0xFF:
-                    self.rxbuf += rxch
-                    self.rxstate = UX2HEX_RXSTATE_LEN
-                else:
-                    self.rxstate = UX2HEX_RXSTART_FROMID
-
-            elif UX2HEX_RXSTATE_LEN == self.rxstate:
-                if rxch[0] < UX2HEX_RXLEN_MAX:
-                    self.rxbuf += rxch
-                    self.len = rxch[0]
-                    self.data_idx = 0
-                    self.rxstate = UX2HEX_RXSTATE_DATA
+        buf = self.rxbuf
+        buf += memoryview(rxstr)[:length]
+        size = len(buf)
+        pos = 0
+        toid = self.toid
+        fromid = self.fromid
+        with memoryview(buf) as view:
+            while size - pos >= 3:
+                if toid != 0xFF and buf[pos] != toid:
+                    # skip to the next possible header
+                    pos = buf.find(toid, pos + 1)
+                    if pos < 0:
+                        pos = size
+                        break
+                    continue
+                if (fromid != 0xFF and buf[pos + 1] != fromid) or buf[pos + 2] >= UX2HEX_RXLEN_MAX:
+                    pos += 1
+                    continue
+                end = pos + buf[pos + 2] + 5
+                if pos == 0 and self.crc_num:
+                    # continue the crc of the partial frame of the last put
+                    crc, crc_num = self.crc, self.crc_num
                 else:
-                    self.rxstate = UX2HEX_RXSTART_FROMID
-
-            elif UX2HEX_RXSTATE_DATA == self.rxstate:
-                if self.data_idx < self.len:
-                    self.rxbuf += rxch
-                    self.data_idx += 1
-                    if self.data_idx == self.len:
-                        self.rxstate = UX2HEX_RXSTATE_CRC1
+                    crc, crc_num = crc16.CRC_MODBUS_INIT, 0
+                if end > size:
+                    # crc the received part now, the rest is added when it arrives
+                    self.crc = crc16.update(crc, view[pos + crc_num:min(size, end - 2)])
+                    self.crc_num = min(size, end - 2) - pos
+                    break
+                self.crc_num = 0
+                crc = crc16.update(crc, view[pos + crc_num:end - 2])
+                if crc == buf[end - 2] | (buf[end - 1] << 8):
+                    self._put_frame(bytes(view[pos:end]))
+                    pos = end
                 else:
-                    self.rxstate = UX2HEX_RXSTART_FROMID
-
-            elif UX2HEX_RXSTATE_CRC1 == self.rxstate:
-                self.rxbuf += rxch
-                self.rxstate = UX2HEX_RXSTATE_CRC2
-
-            elif UX2HEX_RXSTATE_CRC2 == self.rxstate:
-                self.rxbuf += rxch
-                self.rxstate = UX2HEX_RXSTART_FROMID
-                crc = crc16.crc_modbus(self.rxbuf[:self.len + 3])
-                if crc[0] == self.rxbuf[self.len + 3] and crc[1] == self.rxbuf[self.len + 4]:
-                    if self.rx_que.full():
-                        self.rx_que.get()
-                    self.rx_que.put(self.rxbuf)
-                    # print(self.rxbuf)
-
+                    pos += 1
+        if pos:
+            del buf[:pos]
@@ -9,69 +9,108 @@
 #
 
 import struct
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# bytes_to_fp32s of at least this number of elements is decoded by numpy (if available),
+# packing python lists and decoding shorter arrays is faster with struct
+NUMPY_MIN_SIZE = 1024
+
+_FP32_LE = struct.Struct('<f')
+_FP32_BE = struct.Struct('>f')
+_INT32_LE = struct.Struct('<i')
+_INT32_BE = struct.Struct('>i')
+_U16_BE = struct.Struct('>H')
+
+
+class _StructCache(dict):
+    """struct.Struct of fmt.format(n), compiled on the first use of every n"""
+    def __init__(self, fmt):
+        super(_StructCache, self).__init__()
+        self.fmt = fmt
+
+    def __missing__(self, n):
+        codec = self[n] = struct.Struct(self.fmt.format(n))
+        return codec
+
+
+_FP32S_LE = _StructCache('<{}f')
+_INT32S_LE = _StructCache('<{}i')
+_U16S_BE = _StructCache('>{}H')
+_16S_BE = _StructCache('>{}h')
+_structs = _StructCache('{}')
+
+
+def _buffer(data, size):
+    """data as an object of the buffer protocol, the responses of uxbus are lists of ints"""
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        return data
+    return bytes(data[:size])
 
 
 def fp32_to_bytes(data, is_big_endian=False):
     """小端字节序"""
-    return bytes(struct.pack('>f' if is_big_endian else '<f', data))
+    return (_FP32_BE if is_big_endian else _FP32_LE).pack(data)
 
 
 def int32_to_bytes(data, is_big_endian=False):
     """小端字节序"""
-    return bytes(struct.pack('>i' if is_big_endian else '<i', data))
+    return (_INT32_BE if is_big_endian else _INT32_LE).pack(data)
 
 
 def int32s_to_bytes(data, n):
     """小端字节序"""
     assert n > 0
-    ret = int32_to_bytes(data[0])
-    for i in range(1, n):
-        ret += int32_to_bytes(data[i])
-    return ret
+    return _INT32S_LE[n].pack(*data[:n])
 
 
 def bytes_to_fp32(data):
     """小端字节序"""
-    byte = bytes([data[0]])
-    byte += bytes([data[1]])
-    byte += bytes([data[2]])
-    byte += bytes([data[3]])
-    ret = struct.unpack('<f', byte)
-    return ret[0]
+    return _FP32_LE.unpack_from(_buffer(data, 4))[0]
 
 
 def fp32s_to_bytes(data, n):
     """小端字节序"""
     assert n > 0
-    ret = fp32_to_bytes(data[0])
-    for i in range(1, n):
-        ret += fp32_to_bytes(data[i])
-    return ret
+    return _FP32S_LE[n].pack(*data[:n])
+
+
+def fp32s_pack_into(buffer, offset, data, n):
+    """小端字节序, 写入buffer的offset处"""
+    _FP32S_LE[n].pack_into(buffer, offset, *data[:n])
+
+
+def fp32s_unpack_from(buffer, offset, n):
+    """小端字节序, 从buffer的offset处读取"""
+    return list(_FP32S_LE[n].unpack_from(buffer, offset))
 
 
 def bytes_to_fp32s(data, n):
     """小端字节序"""
-    ret = [0] * n
-    for i in range(n):
-        ret[i] = bytes_to_fp32(data[i * 4:i * 4 + 4])
-    return ret
+    if n <= 0:
+        return []
+    data = _buffer(data, n * 4)
+    if np is not None and n >= NUMPY_MIN_SIZE:
+        return np.frombuffer(data, dtype='<f4', count=n).tolist()
+    return list(_FP32S_LE[n].unpack_from(data))
 
 
 def u16_to_bytes(data):
     """大端字节序"""
-    bts = bytes([data // 256 % 256])
-    bts += bytes([data % 256])
-    return bts
+    return _U16_BE.pack(data % 65536)
 
 
 def u16s_to_bytes(data, num):
     """大端字节序"""
-    bts = b''
-    if num != 0:
-        bts = u16_to_bytes(data[0])
-        for i in range(1, num):
-            bts += u16_to_bytes(data[i])
-    return bts
+    if num <= 0:
+        return b''
+    try:
+        return _U16S_BE[num].pack(*data[:num])
+    except struct.error:
+        # out of range values wrap around like u16_to_bytes
+        return _U16S_BE[num].pack(*[d % 65536 for d in data[:num]])
 
 
 def bytes_to_u16(data):
@@ -82,18 +121,26 @@ def bytes_to_u16(data):
 
 def bytes_to_u16s(data, n):
     """大端字节序"""
-    ret = [0] * n
-    for i in range(n):
-        ret[i] = bytes_to_u16(data[i * 2: i * 2 + 2])
-    return ret
+    if n <= 0:
+        return []
+    return list(_U16S_BE[n].unpack_from(_buffer(data, n * 2)))
+
+
+def u16s_unpack_from(buffer, offset, n):
+    """大端字节序, 从buffer的offset处读取"""
+    return list(_U16S_BE[n].unpack_from(buffer, offset))
+
+
+def i16s_unpack_from(buffer, offset, n):
+    """大端字节序, 从buffer的offset处读取"""
+    return list(_16S_BE[n].unpack_from(buffer, offset))
 
 
 def bytes_to_16s(data, n):
     """大端字节序"""
-    ret = [0] * n
-    for i in range(n):
-        ret[i] = struct.unpack('>h', bytes(data[i * 2: i * 2 + 2]))[0]
-    return ret
+    if n <= 0:
+        return []
+    return list(_16S_BE[n].unpack_from(_buffer(data, n * 2)))
 
 
 def bytes_to_u32(data):
@@ -108,15 +155,9 @@ def bytes_to_u64(data):
 
 
 def bytes_to_num32(data, fmt='>l'):
-    byte = bytes([data[0]])
-    byte += bytes([data[1]])
-    byte += bytes([data[2]])
-    byte += bytes([data[3]])
-    ret = struct.unpack(fmt, byte)
-    return ret[0]
+    return _structs[fmt].unpack_from(_buffer(data, 4))[0]
 
 
 def bytes_to_long_big(data):
     """大端字节序"""
     return bytes_to_num32(data, '>l')
-
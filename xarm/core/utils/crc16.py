@@ -57,20 +57,45 @@ CRC_TABLE_L = (
 0x80, 0x40)
 
 
-def crc_modbus(data):
-    leng = len(data)
-    init_crch = 0xFF
-    init_crcl = 0xFF
-    i = 0
-
-    while leng > 0:
-        index = init_crch ^ data[i]
-        i += 1
-        init_crch = init_crcl ^ CRC_TABLE_H[index]
-        init_crcl = CRC_TABLE_L[index]
-        leng -= 1
-    s = init_crch << 8 | init_crcl
-    crc = bytes([s // 256 % 256])
-    crc += bytes([s % 256])
+CRC_MODBUS_INIT = 0xFFFF
+
+
+def _gen_table(poly=0xA001):
+    table = []
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            crc = (crc >> 1) ^ poly if crc & 1 else crc >> 1
+        table.append(crc)
+    return tuple(table)
+
+
+# 16 bit table of the reflected modbus polynomial, same values as CRC_TABLE_H/CRC_TABLE_L
+CRC16_TABLE = _gen_table()
+
+
+def update(crc, data):
+    """
+    Continue a CRC-16/Modbus over data (bytes/bytearray/memoryview)
+    Usage:
+        crc = update(CRC_MODBUS_INIT, chunk1)
+        crc = update(crc, chunk2)
+
+    :return: the crc as an int, the low byte is transmitted first
+    """
+    table = CRC16_TABLE
+    for b in data:
+        crc = (crc >> 8) ^ table[(crc ^ b) & 0xFF]
     return crc
 
+
+def crc_modbus(data):
+    crc = update(CRC_MODBUS_INIT, data)
+    return bytes((crc & 0xFF, crc >> 8))
+
+
+def check_modbus(frame):
+    """
+    Verify a frame whose last 2 bytes are its CRC-16/Modbus, in one pass over the frame
+    """
+    return len(frame) >= 2 and update(CRC_MODBUS_INIT, frame) == 0
@@ -9,3 +9,7 @@
 
 from .uxbus_cmd_ser import UxbusCmdSer
 from .uxbus_cmd_tcp import UxbusCmdTcp
+from .async_uxbus_cmd_tcp import AsyncUxbusCmdTcp
+from .uxbus_rtt import RttEstimator
+from .uxbus_batch import BatchRecorded
+from .uxbus_stats import CommStats
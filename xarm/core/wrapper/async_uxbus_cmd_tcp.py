@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2023, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+import time
+import asyncio
+from ..utils import convert
+from ..config.x_config import XCONF
+from .uxbus_cmd_tcp import UxbusCmdTcp, PRIORITY_TRANSACTION_ID, debug_log_datas
+
+# commands that post-process the reply of another command or talk to the end-effector bus in several steps,
+# they are only available on the blocking UxbusCmdTcp (not attributes of AsyncUxbusCmdTcp)
+SYNC_ONLY_METHODS = (
+    'cali_user_orient', 'cgpio_delay_set_digital', 'cgpio_get_analog1', 'cgpio_get_analog2', 'cgpio_get_auxdigit',
+    'cgpio_get_state', 'cgpio_position_set_analog', 'cgpio_position_set_digital', 'config_force_control',
+    'ft_sensor_get_config', 'ft_sensor_get_error', 'get_common_info', 'get_common_param', 'get_pose_offset',
+    'get_reduced_states', 'get_tcp_rotation_radius', 'gripper_addr_r16', 'gripper_addr_r32', 'gripper_addr_w16',
+    'gripper_addr_w32', 'gripper_clean_err', 'gripper_get_errcode', 'gripper_get_pos', 'gripper_modbus_clean_err',
+    'gripper_modbus_get_errcode', 'gripper_modbus_get_pos', 'gripper_modbus_r16s', 'gripper_modbus_set_en',
+    'gripper_modbus_set_mode', 'gripper_modbus_set_pos', 'gripper_modbus_set_posspd', 'gripper_modbus_set_zero',
+    'gripper_modbus_w16s', 'gripper_set_en', 'gripper_set_mode', 'gripper_set_pos', 'gripper_set_posspd',
+    'gripper_set_zero', 'load_traj', 'save_traj', 'send_hex_cmd', 'servo_addr_r16', 'servo_addr_r32',
+    'servo_addr_w16', 'servo_addr_w32', 'servo_error_addr_r32', 'servo_get_dbmsg', 'servo_set_zero',
+    'set_force_control_pid', 'set_impedance', 'set_impedance_config', 'set_impedance_mbk', 'set_modbus_baudrate',
+    'tgpio_addr_r16', 'tgpio_addr_r32', 'tgpio_addr_w16', 'tgpio_addr_w32', 'tgpio_delay_set_digital',
+    'tgpio_get_analog1', 'tgpio_get_analog2', 'tgpio_get_digital', 'tgpio_position_set_digital',
+    'tgpio_set_digital', 'tgpio_set_modbus', 'track_modbus_r16s', 'track_modbus_w16s',
+    'read_coil_bits', 'read_input_bits', 'read_holding_registers', 'read_input_registers',
+    'write_single_coil_bit', 'write_single_holding_register', 'write_multiple_coil_bits',
+    'write_multiple_holding_registers', 'mask_write_holding_register', 'write_and_read_holding_registers',
+)
+
+
+class AsyncUxbusCmdTcp(UxbusCmdTcp):
+    """
+    UxbusCmdTcp over an AsyncSocketPort
+    Only the generic request helpers (set_nu8/get_nfp32/..., _run_command) are rewritten as coroutines, every command of UxbusCmd
+    that returns one of them directly (get_state, set_mode, move_line_common, get_tcp_pose, ...) is inherited as is
+    and becomes awaitable, so the frame layout of each command is shared with the blocking implementation.
+    The commands of SYNC_ONLY_METHODS (several requests, a reply post-processed by python code, the standard
+    Modbus TCP) are not available: accessing them raises AttributeError.
+    """
+    def __init__(self, arm_port, set_feedback_key_tranid=None, rtt=None, stats=None):
+        super(AsyncUxbusCmdTcp, self).__init__(arm_port, set_feedback_key_tranid=set_feedback_key_tranid, rtt=rtt,
+                                               stats=stats)
+        # the port routes replies by transaction id, several commands can be in flight
+        self._rx_router = arm_port
+        self._feedback_lock = asyncio.Lock()
+        self._priority_alock = asyncio.Lock()
+
+    async def recv_modbus_response(self, t_unit_id, t_trans_id, num, timeout, t_prot_id=-1, ret_raw=False):
+        resp = await self.recv_response(t_unit_id, t_trans_id, num, timeout, t_prot_id, ret_raw)
+        return resp.to_list(num)
+
+    async def recv_response(self, t_unit_id, t_trans_id, num, timeout, t_prot_id=-1, ret_raw=False):
+        prot_id = self._protocol_identifier if t_prot_id < 0 else t_prot_id
+        stats = self.stats
+        if stats is not None:
+            stats_start = time.perf_counter()
+        rtt = self._adaptive_rtt(t_unit_id, timeout, prot_id)
+        if rtt is None:
+            rx_data = await self.arm_port.wait(t_trans_id, timeout)
+            resp = self._handle_routed_response(rx_data, t_unit_id, t_trans_id, prot_id, ret_raw)
+        else:
+            start = time.monotonic()
+            rx_data = await self.arm_port.wait(t_trans_id, rtt.timeout(t_unit_id, timeout))
+            resp = self._handle_routed_response(rx_data, t_unit_id, t_trans_id, prot_id, ret_raw)
+            self._update_rtt(rtt, t_unit_id, resp, start)
+        if stats is not None:
+            self._stats_reply(stats, t_unit_id, prot_id, resp, time.perf_counter() - stats_start)
+        return resp
+
+    async def _request(self, funcode, datas, num, rx_num, timeout, err_num=1):
+        ret = self.send_modbus_request(funcode, datas, num)
+        if ret == -1:
+            return [XCONF.UxbusState.ERR_NOTTCP] * err_num
+        return await self.recv_modbus_response(funcode, ret, rx_num, timeout)
+
+    async def _request_with_feedback(self, funcode, datas, num, rx_num, timeout, feedback_key=None, feedback_type=XCONF.FeedbackType.MOTION_FINISH):
+        need_set_fb = feedback_type != 0 and (self._feedback_type & feedback_type) != feedback_type
+        if not feedback_key or not need_set_fb:
+            if feedback_key and self._set_feedback_key_tranid:
+                self._set_feedback_key_tranid(feedback_key, self._get_trans_id(), self._feedback_type)
+            return await self._request(funcode, datas, num, rx_num, timeout)
+        async with self._feedback_lock:
+            await self._set_feedback_type_no_lock(self._feedback_type | feedback_type)
+            if self._set_feedback_key_tranid:
+                self._set_feedback_key_tranid(feedback_key, self._get_trans_id(), self._feedback_type)
+            ret = await self._request(funcode, datas, num, rx_num, timeout)
+            await self._set_feedback_type_no_lock(self._feedback_type)
+        return ret
+
+    async def set_nu8(self, funcode, datas, num, timeout=None, feedback_key=None, feedback_type=XCONF.FeedbackType.MOTION_FINISH):
+        return await self._request_with_feedback(funcode, datas, num, 0, self._S_TOUT if timeout is None else timeout,
+                                                 feedback_key=feedback_key, feedback_type=feedback_type)
+
+    async def getset_nu8(self, funcode, datas, num_send, num_get):
+        return await self._request(funcode, datas, num_send, num_get, self._S_TOUT)
+
+    async def get_nu8(self, funcode, num):
+        return await self._request(funcode, 0, 0, num, self._G_TOUT, err_num=num + 1)
+
+    async def set_nu16(self, funcode, datas, num):
+        hexdata = convert.u16s_to_bytes(datas, num)
+        return await self._request(funcode, hexdata, num * 2, 0, self._S_TOUT)
+
+    async def get_nu16(self, funcode, num):
+        ret = await self._request(funcode, 0, 0, num * 2, self._G_TOUT, err_num=num * 2 + 1)
+        return self._decode_nu16(ret, num)
+
+    async def set_nfp32(self, funcode, datas, num, feedback_key=None, feedback_type=XCONF.FeedbackType.MOTION_FINISH):
+        hexdata = convert.fp32s_to_bytes(datas, num)
+        return await self._request_with_feedback(funcode, hexdata, num * 4, 0, self._S_TOUT,
+                                                 feedback_key=feedback_key, feedback_type=feedback_type)
+
+    async def set_nfp32_with_bytes(self, funcode, datas, num, additional_bytes, rx_len=0, timeout=None, feedback_key=None, feedback_type=XCONF.FeedbackType.MOTION_FINISH):
+        hexdata = convert.fp32s_to_bytes(datas, num)
+        hexdata += additional_bytes
+        return await self._request_with_feedback(funcode, hexdata, num * 4 + len(additional_bytes), rx_len,
+                                                 self._S_TOUT if timeout is None else timeout,
+                                                 feedback_key=feedback_key, feedback_type=feedback_type)
+
+    async def set_nint32(self, funcode, datas, num, feedback_key=None, feedback_type=XCONF.FeedbackType.MOTION_FINISH):
+        hexdata = convert.int32s_to_bytes(datas, num)
+        return await self._request_with_feedback(funcode, hexdata, num * 4, 0, self._S_TOUT,
+                                                 feedback_key=feedback_key, feedback_type=feedback_type)
+
+    async def get_nfp32(self, funcode, num, timeout=None):
+        ret = await self._request(funcode, 0, 0, num * 4, timeout if timeout is not None else self._G_TOUT, err_num=num * 4 + 1)
+        return self._decode_nfp32(ret, num)
+
+    async def get_nfp32_with_datas(self, funcode, datas, num_send, num_get, timeout=None):
+        ret = await self._request(funcode, datas, num_send, num_get * 4, timeout if timeout is not None else self._G_TOUT)
+        return self._decode_nfp32(ret, num_get)
+
+    async def swop_nfp32(self, funcode, datas, txn, rxn):
+        hexdata = convert.fp32s_to_bytes(datas, txn)
+        ret = await self._request(funcode, hexdata, txn * 4, rxn * 4, self._G_TOUT, err_num=rxn + 1)
+        return self._decode_nfp32(ret, rxn)
+
+    async def is_nfp32(self, funcode, datas, txn):
+        hexdata = convert.fp32s_to_bytes(datas, txn)
+        return await self._request(funcode, hexdata, txn * 4, 1, self._G_TOUT, err_num=2)
+
+    async def _run_command(self, cmd, payload):
+        ret = self.send_modbus_request(cmd.reg, payload, cmd.tx_len)
+        if ret == -1:
+            return [XCONF.UxbusState.ERR_NOTTCP] * cmd.err_num
+        resp = await self.recv_response(cmd.reg, ret, cmd.rx_len, self._G_TOUT if cmd.rx_len else self._S_TOUT)
+        return cmd.decode(resp)
+
+    async def priority_request(self, funcode, datas, num, rx_num, timeout):
+        """
+        The priority lane of UxbusCmdTcp (set_state_priority/get_state_priority) on the reserved transaction id
+        The requests do not wait for each other on this transport, the lane only gives the state/stop commands the
+        reserved transaction id as on UxbusCmdTcp.
+        """
+        stats = self.stats
+        start = time.perf_counter()
+        async with self._priority_alock:
+            lock_wait = time.perf_counter() - start
+            send_data = self._build_frame(self._priority_tx_frame, PRIORITY_TRANSACTION_ID,
+                                          self._protocol_identifier, funcode, datas, num)
+            if self._debug:
+                debug_log_datas(send_data, label='send({}, priority)'.format(funcode))
+            send_len = len(send_data)
+            self.arm_port.register(PRIORITY_TRANSACTION_ID)
+            start = time.perf_counter()
+            if self.arm_port.write(send_data) != 0:
+                self.arm_port.unregister(PRIORITY_TRANSACTION_ID)
+                return [XCONF.UxbusState.ERR_NOTTCP] * (rx_num + 1)
+            sent = time.perf_counter()
+            rx_data = await self.arm_port.wait(PRIORITY_TRANSACTION_ID, timeout)
+        resp = self._handle_routed_response(rx_data, funcode, PRIORITY_TRANSACTION_ID, self._protocol_identifier)
+        if stats is not None:
+            stats.on_send(funcode, send_len, lock_wait, sent - start)
+            stats.on_reply(funcode, resp.code, len(resp.frame) if resp.frame is not None else 0,
+                           time.perf_counter() - sent)
+        return resp.to_list(rx_num)
+
+    async def _set_feedback_type_no_lock(self, feedback_type):
+        return await self._request(XCONF.UxbusReg.SET_FEEDBACK_TYPE, [feedback_type], 1, 0, self._S_TOUT)
+
+    async def set_feedback_type(self, feedback_type):
+        async with self._feedback_lock:
+            ret = await self._set_feedback_type_no_lock(feedback_type)
+            if ret[0] != XCONF.UxbusState.ERR_NOTTCP:
+                self._feedback_type = feedback_type
+        return ret
+
+
+class _SyncOnly(object):
+    """Hides an inherited blocking command: not an attribute of the instances (hasattr is False)"""
+    def __init__(self, name):
+        self.name = name
+
+    def __get__(self, obj, objtype=None):
+        raise AttributeError("'{}' object has no attribute '{}' (only on UxbusCmdTcp)".format(
+            (objtype or type(obj)).__name__, self.name))
+
+
+for _name in SYNC_ONLY_METHODS:
+    setattr(AsyncUxbusCmdTcp, _name, _SyncOnly(_name))
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2023, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+from ..config.x_config import XCONF
+from ..utils.log import logger
+from .uxbus_response import UxbusResponse
+
+# registers of the getters, they do not act on the arm: the record pass sends them as usual (e.g. the get_version
+# of version_is_ge or the get_state of a sync made before a move) and batches the request carrying the command
+READ_ONLY_REGS = frozenset(getattr(XCONF.UxbusReg, name) for name in dir(XCONF.UxbusReg)
+                           if name.startswith(('GET_', 'IS_')) or '_GET_' in name)
+
+
+def is_read_only(unit_id, prot_id):
+    # the standard modbus requests (prot_id 0) are commands, their unit id is not a register
+    return prot_id != 0 and unit_id in READ_ONLY_REGS
+
+
+class BatchRecorded(BaseException):
+    """
+    Raised at the receive of the record pass once the request of a call is captured, it stops the call before
+    it looks at the response. A BaseException so the `except Exception` of the api layer does not swallow it.
+    """
+
+
+class BatchRequest(object):
+    """
+    The request carrying the command of one call of a batch
+    Captured by the record pass, sent with the others by UxbusCmdTcp.send_batch and handed back to the call by
+    the replay pass (send returns trans_id, the receive returns response).
+    """
+    __slots__ = ('unit_id', 'pdu', 'prot_id', 'num', 'timeout', 'ret_raw', 'trans_id', 'response', 'capture_read')
+
+    def __init__(self, unit_id, pdu, prot_id, capture_read=False):
+        self.unit_id = unit_id
+        self.pdu = pdu
+        self.prot_id = prot_id
+        self.num = None
+        self.timeout = 0
+        self.ret_raw = False
+        self.trans_id = -1
+        self.response = None
+        self.capture_read = capture_read
+
+
+class BatchRecorder(object):
+    """
+    Thread state of the record pass of one call
+    :param capture_read: the call is a getter, its first request is captured even if it is read-only (and the
+        call is stopped there, its result is only the one of the replay pass)
+    The read-only requests made before the command are sent as usual (send/recv return None). The receive of the
+    captured command returns a success (zeros) so the call goes on and updates the state as it would after the
+    reply (e.g. the last position and speed a next move of the batch starts from), but it is stopped
+    (BatchRecorded) at its next request. The receive of a captured getter stops the call at once.
+    """
+    done = False
+
+    def __init__(self, capture_read=False):
+        self.capture_read = capture_read
+        self.request = None
+        self._passing = False
+
+    def send(self, unit_id, pdu_data, pdu_len, prot_id):
+        if self.request is not None:
+            # the request following the command, or the call went on after BatchRecorded (bare except)
+            raise BatchRecorded()
+        if not self.capture_read and is_read_only(unit_id, prot_id):
+            self._passing = True
+            return None
+        self.request = BatchRequest(unit_id, bytes(pdu_data[:pdu_len]) if pdu_len > 0 else b'', prot_id,
+                                    self.capture_read)
+        return 0
+
+    def skip(self):
+        """the first request of the call can not be batched (priority lane), the call is run on its own"""
+        if self.request is None:
+            self.request = BatchRequest(None, b'', -1)
+        raise BatchRecorded()
+
+    def recv(self, num, timeout, ret_raw):
+        if self._passing:
+            self._passing = False
+            return None
+        request = self.request
+        request.num = num
+        request.timeout = timeout
+        request.ret_raw = ret_raw
+        if request.capture_read:
+            raise BatchRecorded()
+        return UxbusResponse(0)
+
+    def trans_id(self):
+        # not a transaction id in use, the replay pass registers the real one
+        return -1
+
+
+class BatchReplayer(object):
+    """
+    Thread state of the replay pass of one call, done once its request was consumed
+    The read-only requests made before the command are sent as usual, like in the record pass. The command
+    is given the reply of the recorded request, which went out: a request built differently (a state the record
+    pass did not reproduce) is logged, the call still gets the reply of what was sent.
+    """
+    def __init__(self, request):
+        self.request = request
+        self.done = False
+        self._passing = False
+
+    def send(self, unit_id, pdu_data, pdu_len, prot_id):
+        request = self.request
+        if not request.capture_read and is_read_only(unit_id, prot_id):
+            self._passing = True
+            return None
+        if request.response is None:
+            # the batch was not sent
+            self.done = True
+            return -1
+        if unit_id != request.unit_id or prot_id != request.prot_id \
+                or (bytes(pdu_data[:pdu_len]) if pdu_len > 0 else b'') != request.pdu:
+            logger.warning('batch replay: the request of register {} differs from the one sent, '
+                           'the call gets the reply of the one sent'.format(unit_id))
+        return request.trans_id
+
+    def recv(self, num, timeout, ret_raw):
+        if self._passing:
+            self._passing = False
+            return None
+        self.done = True
+        return self.request.response
+
+    def trans_id(self):
+        return self.request.trans_id
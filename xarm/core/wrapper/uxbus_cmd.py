@@ -12,21 +12,46 @@ import threading
 import functools
 from ..utils import convert
 from ..config.x_config import XCONF
+from . import uxbus_cmd_schema
+from .uxbus_response import UxbusResponse
 
 
-def lock_require(func):
+def _locked(func, release_on_wait):
     @functools.wraps(func)
     def decorator(*args, **kwargs):
-        with args[0].lock:
+        self = args[0]
+        if self.stats is None:
+            with self.lock:
+                self._release_on_wait = release_on_wait
+                return func(*args, **kwargs)
+        start = time.perf_counter()
+        with self.lock:
+            # taken by the first request sent under the lock (see CommStats)
+            self._lock_wait = time.perf_counter() - start
+            self._release_on_wait = release_on_wait
             return func(*args, **kwargs)
     return decorator
 
 
+def lock_require(func):
+    """the command lock is held for the whole call, its requests never interleave with those of other threads"""
+    return _locked(func, False)
+
+
+def single_request(func):
+    """
+    lock_require of a command sending one request: with the pipelined router (enable_pipeline) the lock is released
+    while its reply is awaited, so the requests of other threads go out meanwhile
+    A call that turns out to send more requests clears self._release_on_wait before its first one.
+    """
+    return _locked(func, True)
+
+
 class UxbusCmd(object):
     BAUDRATES = (4800, 9600, 19200, 38400, 57600, 115200, 230400, 460800, 921600,
                  1000000, 1500000, 2000000, 2500000)
 
-    def __init__(self, set_feedback_key_tranid=None):
+    def __init__(self, set_feedback_key_tranid=None, stats=None):
         self._has_error = False
         self._has_warn = False
         self._state_is_ready = False
@@ -41,6 +66,11 @@ class UxbusCmd(object):
         self._last_modbus_comm_time = time.monotonic()
         self._feedback_type = 0
         self._set_feedback_key_tranid = set_feedback_key_tranid
+        # stats: a CommStats, counters and latencies of the requests per function code
+        self.stats = stats
+        self._lock_wait = 0.0
+        # set by lock_require/single_request for the call holding the lock
+        self._release_on_wait = False
 
     @property
     def last_comm_time(self):
@@ -78,10 +108,33 @@ class UxbusCmd(object):
     def recv_modbus_response(self, t_unit_id, t_trans_id, num, timeout, t_prot_id=-1, ret_raw=False):
         raise NotImplementedError
 
-    @lock_require
+    def recv_response(self, t_unit_id, t_trans_id, num, timeout, t_prot_id=-1, ret_raw=False):
+        """
+        Same as recv_modbus_response but returns an UxbusResponse, the transports that can hand out the received frame
+        override it to avoid building the list
+        """
+        return UxbusResponse.from_list(self.recv_modbus_response(t_unit_id, t_trans_id, num, timeout, t_prot_id, ret_raw))
+
+    @staticmethod
+    def _decode_nu16(ret, num):
+        data = [0] * (1 + num)
+        data[0] = ret[0]
+        data[1:num] = convert.bytes_to_u16s(ret[1:num * 2 + 1], num)
+        return data
+
+    @staticmethod
+    def _decode_nfp32(ret, num):
+        data = [0] * (1 + num)
+        data[0] = ret[0]
+        data[1:num + 1] = convert.bytes_to_fp32s(ret[1:num * 4 + 1], num)
+        return data
+
+    @single_request
     def set_nu8(self, funcode, datas, num, timeout=None, feedback_key=None, feedback_type=XCONF.FeedbackType.MOTION_FINISH):
         need_set_fb = feedback_type != 0 and (self._feedback_type & feedback_type) != feedback_type
         if feedback_key and need_set_fb:
+            # the feedback type is set and restored around the request, the lock is kept
+            self._release_on_wait = False
             self._set_feedback_type_no_lock(self._feedback_type | feedback_type)
 
         trans_id = self._get_trans_id()
@@ -95,21 +148,21 @@ class UxbusCmd(object):
             self._set_feedback_type_no_lock(self._feedback_type)
         return ret
 
-    @lock_require
+    @single_request
     def getset_nu8(self, funcode, datas, num_send, num_get):
         ret = self.send_modbus_request(funcode, datas, num_send)
         if ret == -1:
             return [XCONF.UxbusState.ERR_NOTTCP]
         return self.recv_modbus_response(funcode, ret, num_get, self._S_TOUT)
 
-    @lock_require
+    @single_request
     def get_nu8(self, funcode, num):
         ret = self.send_modbus_request(funcode, 0, 0)
         if ret == -1:
             return [XCONF.UxbusState.ERR_NOTTCP] * (num + 1)
         return self.recv_modbus_response(funcode, ret, num, self._G_TOUT)
 
-    @lock_require
+    @single_request
     def set_nu16(self, funcode, datas, num):
         hexdata = convert.u16s_to_bytes(datas, num)
         ret = self.send_modbus_request(funcode, hexdata, num * 2)
@@ -118,21 +171,20 @@ class UxbusCmd(object):
         ret = self.recv_modbus_response(funcode, ret, 0, self._S_TOUT)
         return ret
 
-    @lock_require
+    @single_request
     def get_nu16(self, funcode, num):
         ret = self.send_modbus_request(funcode, 0, 0)
         if ret == -1:
             return [XCONF.UxbusState.ERR_NOTTCP] * (num * 2 + 1)
         ret = self.recv_modbus_response(funcode, ret, num * 2, self._G_TOUT)
-        data = [0] * (1 + num)
-        data[0] = ret[0]
-        data[1:num] = convert.bytes_to_u16s(ret[1:num * 2 + 1], num)
-        return data
+        return self._decode_nu16(ret, num)
 
-    @lock_require
+    @single_request
     def set_nfp32(self, funcode, datas, num, feedback_key=None, feedback_type=XCONF.FeedbackType.MOTION_FINISH):
         need_set_fb = feedback_type != 0 and (self._feedback_type & feedback_type) != feedback_type
         if feedback_key and need_set_fb:
+            # the feedback type is set and restored around the request, the lock is kept
+            self._release_on_wait = False
             self._set_feedback_type_no_lock(self._feedback_type | feedback_type)
 
         trans_id = self._get_trans_id()
@@ -147,10 +199,12 @@ class UxbusCmd(object):
             self._set_feedback_type_no_lock(self._feedback_type)
         return ret
 
-    @lock_require
+    @single_request
     def set_nfp32_with_bytes(self, funcode, datas, num, additional_bytes, rx_len=0, timeout=None, feedback_key=None, feedback_type=XCONF.FeedbackType.MOTION_FINISH):
         need_set_fb = feedback_type != 0 and (self._feedback_type & feedback_type) != feedback_type
         if feedback_key and need_set_fb:
+            # the feedback type is set and restored around the request, the lock is kept
+            self._release_on_wait = False
             self._set_feedback_type_no_lock(self._feedback_type | feedback_type)
 
         trans_id = self._get_trans_id()
@@ -166,10 +220,12 @@ class UxbusCmd(object):
             self._set_feedback_type_no_lock(self._feedback_type)
         return ret
 
-    @lock_require
+    @single_request
     def set_nint32(self, funcode, datas, num, feedback_key=None, feedback_type=XCONF.FeedbackType.MOTION_FINISH):
         need_set_fb = feedback_type != 0 and (self._feedback_type & feedback_type) != feedback_type
         if feedback_key and need_set_fb:
+            # the feedback type is set and restored around the request, the lock is kept
+            self._release_on_wait = False
             self._set_feedback_type_no_lock(self._feedback_type | feedback_type)
 
         trans_id = self._get_trans_id()
@@ -184,41 +240,32 @@ class UxbusCmd(object):
             self._set_feedback_type_no_lock(self._feedback_type)
         return ret
 
-    @lock_require
+    @single_request
     def get_nfp32(self, funcode, num, timeout=None):
         ret = self.send_modbus_request(funcode, 0, 0)
         if ret == -1:
             return [XCONF.UxbusState.ERR_NOTTCP] * (num * 4 + 1)
         ret = self.recv_modbus_response(funcode, ret, num * 4, timeout if timeout is not None else self._G_TOUT)
-        data = [0] * (1 + num)
-        data[0] = ret[0]
-        data[1:num+1] = convert.bytes_to_fp32s(ret[1:num * 4 + 1], num)
-        return data
+        return self._decode_nfp32(ret, num)
 
-    @lock_require
+    @single_request
     def get_nfp32_with_datas(self, funcode, datas, num_send, num_get, timeout=None):
         ret = self.send_modbus_request(funcode, datas, num_send)
         if ret == -1:
             return [XCONF.UxbusState.ERR_NOTTCP]
         ret = self.recv_modbus_response(funcode, ret, num_get * 4, timeout if timeout is not None else self._G_TOUT)
-        data = [0] * (1 + num_get)
-        data[0] = ret[0]
-        data[1:num_get + 1] = convert.bytes_to_fp32s(ret[1:num_get * 4 + 1], num_get)
-        return data
+        return self._decode_nfp32(ret, num_get)
 
-    @lock_require
+    @single_request
     def swop_nfp32(self, funcode, datas, txn, rxn):
         hexdata = convert.fp32s_to_bytes(datas, txn)
         ret = self.send_modbus_request(funcode, hexdata, txn * 4)
         if ret == -1:
             return [XCONF.UxbusState.ERR_NOTTCP] * (rxn + 1)
         ret = self.recv_modbus_response(funcode, ret, rxn * 4, self._G_TOUT)
-        data = [0] * (1 + rxn)
-        data[0] = ret[0]
-        data[1:rxn+1] = convert.bytes_to_fp32s(ret[1:rxn * 4 + 1], rxn)
-        return data
+        return self._decode_nfp32(ret, rxn)
 
-    @lock_require
+    @single_request
     def is_nfp32(self, funcode, datas, txn):
         hexdata = convert.fp32s_to_bytes(datas, txn)
         ret = self.send_modbus_request(funcode, hexdata, txn * 4)
@@ -226,23 +273,17 @@ class UxbusCmd(object):
             return [XCONF.UxbusState.ERR_NOTTCP] * 2
         return self.recv_modbus_response(funcode, ret, 1, self._G_TOUT)
 
-    def get_version(self):
-        return self.get_nu8(XCONF.UxbusReg.GET_VERSION, 40)
-
-    def get_robot_sn(self):
-        return self.get_nu8(XCONF.UxbusReg.GET_ROBOT_SN, 40)
-
-    def check_verification(self):
-        # txdata = signature, 175: signature length if use 14-character SN for plain text, do not miss '\n's
-        return self.get_nu8(XCONF.UxbusReg.CHECK_VERIFY, 1)
-
-    def system_control(self, value):
-        txdata = [value]
-        return self.set_nu8(XCONF.UxbusReg.SYSTEM_CONTROL, txdata, 1)
-
-    def set_record_traj(self, value):
-        txdata = [value]
-        return self.set_nu8(XCONF.UxbusReg.SET_TRAJ_RECORD, txdata, 1)
+    @single_request
+    def _run_command(self, cmd, payload):
+        """
+        Run a command of uxbus_cmd_schema.UXBUS_COMMANDS, payload is the request data built by its encoder
+        All the generated methods go through here.
+        """
+        ret = self.send_modbus_request(cmd.reg, payload, cmd.tx_len)
+        if ret == -1:
+            return [XCONF.UxbusState.ERR_NOTTCP] * cmd.err_num
+        resp = self.recv_response(cmd.reg, ret, cmd.rx_len, self._G_TOUT if cmd.rx_len else self._S_TOUT)
+        return cmd.decode(resp)
 
     def playback_traj(self, value, spdx=1, feedback_key=None):
         txdata = [value, spdx]
@@ -279,24 +320,6 @@ class UxbusCmd(object):
             time.sleep(wait_time)  # Must! or buffer would be flushed if set mode to pos_mode
         return ret
 
-    def get_traj_rw_status(self):
-        return self.get_nu8(XCONF.UxbusReg.GET_TRAJ_RW_STATUS, 1)
-
-    def set_reduced_mode(self, on_off):
-        txdata = [on_off]
-        return self.set_nu8(XCONF.UxbusReg.SET_REDUCED_MODE, txdata, 1)
-
-    def set_reduced_linespeed(self, lspd_mm):
-        txdata = [lspd_mm]
-        return self.set_nfp32(XCONF.UxbusReg.SET_REDUCED_TRSV, txdata, 1)
-
-    def set_reduced_jointspeed(self, jspd_rad):
-        txdata = [jspd_rad]
-        return self.set_nfp32(XCONF.UxbusReg.SET_REDUCED_P2PV, txdata, 1)
-
-    def get_reduced_mode(self):
-        return self.get_nu8(XCONF.UxbusReg.GET_REDUCED_MODE, 1)
-
     def get_reduced_states(self, length=21):
         ret = self.get_nu8(XCONF.UxbusReg.GET_REDUCED_STATE, length)
         msg = [0] * 8
@@ -309,69 +332,27 @@ class UxbusCmd(object):
             msg[6:8] = ret[78:80]  # fense_is_on, collision_rebound
         return msg
 
-    def set_xyz_limits(self, xyz_list):
-        return self.set_nint32(XCONF.UxbusReg.SET_LIMIT_XYZ, xyz_list, 6)
-
     def set_timer(self, sec_later, timer_id, fun_code, param1=0, param2=0):
         txdata = [sec_later, timer_id, fun_code, param1, param2]
         return self.set_nint32(XCONF.UxbusReg.SET_TIMER, txdata, 5)
 
-    def cancel_timer(self, timer_id):
-        txdata = [timer_id]
-        return self.set_nint32(XCONF.UxbusReg.CANCEL_TIMER, txdata, 1)
-
-    def set_world_offset(self, pose_offset):
-        return self.set_nfp32(XCONF.UxbusReg.SET_WORLD_OFFSET, pose_offset, 6)
-
-    def cnter_reset(self):
-        return self.set_nu8(XCONF.UxbusReg.CNTER_RESET, 0, 0)
-
-    def cnter_plus(self):
-        return self.set_nu8(XCONF.UxbusReg.CNTER_PLUS, 0, 0)
-
-    def set_reduced_jrange(self, jrange_rad):
-        return self.set_nfp32(XCONF.UxbusReg.SET_REDUCED_JRANGE, jrange_rad, 14)
-
-    def set_fense_on(self, on_off):
-        txdata = [on_off]
-        return self.set_nu8(XCONF.UxbusReg.SET_FENSE_ON, txdata, 1)
-
-    def set_collis_reb(self, on_off):
-        txdata = [on_off]
-        return self.set_nu8(XCONF.UxbusReg.SET_COLLIS_REB, txdata, 1)
-
     def motion_en(self, axis_id, enable):
         txdata = [axis_id, int(enable)]
         return self.set_nu8(XCONF.UxbusReg.MOTION_EN, txdata, 2, timeout=self._S_TOUT if self._S_TOUT >= 5 else 5)
 
-    def set_state(self, value):
-        txdata = [value]
-        return self.set_nu8(XCONF.UxbusReg.SET_STATE, txdata, 1)
-
-    def get_state(self):
-        return self.get_nu8(XCONF.UxbusReg.GET_STATE, 1)
-
-    def get_cmdnum(self):
-        return self.get_nu16(XCONF.UxbusReg.GET_CMDNUM, 1)
-
-    def get_err_code(self):
-        return self.get_nu8(XCONF.UxbusReg.GET_ERROR, 2)
-
-    def get_hd_types(self):
-        return self.get_nu8(XCONF.UxbusReg.GET_HD_TYPES, 2)
+    def priority_request(self, funcode, datas, num, rx_num, timeout):
+        # no separate lane on this transport, wait for the command lock like the other commands
+        with self.lock:
+            ret = self.send_modbus_request(funcode, datas, num)
+            if ret == -1:
+                return [XCONF.UxbusState.ERR_NOTTCP] * (rx_num + 1)
+            return self.recv_modbus_response(funcode, ret, rx_num, timeout)
 
-    def reload_dynamics(self):
-        return self.set_nu8(XCONF.UxbusReg.RELOAD_DYNAMICS, 0, 0)
+    def set_state_priority(self, value):
+        return self.priority_request(XCONF.UxbusReg.SET_STATE, [value], 1, 0, self._S_TOUT)
 
-    def clean_err(self):
-        return self.set_nu8(XCONF.UxbusReg.CLEAN_ERR, 0, 0)
-
-    def clean_war(self):
-        return self.set_nu8(XCONF.UxbusReg.CLEAN_WAR, 0, 0)
-
-    def set_brake(self, axis_id, enable):
-        txdata = [axis_id, int(enable)]
-        return self.set_nu8(XCONF.UxbusReg.SET_BRAKE, txdata, 2)
+    def get_state_priority(self):
+        return self.priority_request(XCONF.UxbusReg.GET_STATE, 0, 0, 1, self._G_TOUT)
 
     def set_mode(self, mode, detection_param=-1):
         if detection_param >= 0:
@@ -381,24 +362,6 @@ class UxbusCmd(object):
             txdata = [mode]
             return self.set_nu8(XCONF.UxbusReg.SET_MODE, txdata, 1)
 
-    def set_report_tau_or_i(self, tau_or_i):  # 0 for tau(default), 1 for i
-        txdata = [tau_or_i]
-        return self.set_nu8(XCONF.UxbusReg.REPORT_TAU_OR_I, txdata, 1)
-
-    def get_report_tau_or_i(self):
-        return self.get_nu8(XCONF.UxbusReg.GET_REPORT_TAU_OR_I, 1)
-
-    def set_cartesian_velo_continuous(self, on_off):  # False for not continuous, True for continuous
-        txdata = [int(on_off)]
-        return self.set_nu8(XCONF.UxbusReg.SET_CARTV_CONTINUE, txdata, 1)
-
-    def set_allow_approx_motion(self, on_off):
-        txdata = [int(on_off)]
-        return self.set_nu8(XCONF.UxbusReg.SET_ALLOW_APPROX_MOTION, txdata, 1)
-
-    def get_allow_approx_motion(self):
-        return self.get_nu8(XCONF.UxbusReg.GET_ALLOW_APPROX_MOTION, 1)
-
     def move_line(self, mvpose, mvvelo, mvacc, mvtime, only_check_type=0, motion_type=0):
         txdata = [mvpose[i] for i in range(6)]
         txdata += [mvvelo, mvacc, mvtime]
@@ -449,9 +412,6 @@ class UxbusCmd(object):
             byte_data += bytes([only_check_type]) if motion_type == 0 else bytes([only_check_type, int(motion_type)])
             return self.set_nfp32_with_bytes(XCONF.UxbusReg.MOVE_RELATIVE, float_data, 11, byte_data, 3, timeout=10, feedback_key=feedback_key)
 
-    def get_position_aa(self):
-        return self.get_nfp32(XCONF.UxbusReg.GET_TCP_POSE_AA, 6)
-
     @lock_require
     def get_pose_offset(self, pose1, pose2, orient_type_in=0, orient_type_out=0):
         float_data = [pose1[i] for i in range(6)]
@@ -516,35 +476,11 @@ class UxbusCmd(object):
             byte_data = bytes([only_check_type])
             return self.set_nfp32_with_bytes(XCONF.UxbusReg.MOVE_HOME, txdata, 3, byte_data, 3, timeout=10, feedback_key=feedback_key)
 
-    def move_servoj(self, mvjoint, mvvelo, mvacc, mvtime):
-        txdata = [mvjoint[i] for i in range(7)]
-        txdata += [mvvelo, mvacc, mvtime]
-        return self.set_nfp32(XCONF.UxbusReg.MOVE_SERVOJ, txdata, 10)
-
-    def move_servo_cartesian(self, mvpose, mvvelo, mvacc, mvtime):
-        txdata = [mvpose[i] for i in range(6)]
-        txdata += [mvvelo, mvacc, mvtime]
-        return self.set_nfp32(XCONF.UxbusReg.MOVE_SERVO_CART, txdata, 9)
-
     # # This interface is no longer supported
     # def set_servot(self, jnt_taus):
     #     txdata = [jnt_taus[i] for i in range(7)]
     #     return self.set_nfp32(XCONF.UxbusReg.SET_SERVOT, txdata, 7)
 
-    def get_joint_tau(self):
-        return self.get_nfp32(XCONF.UxbusReg.GET_JOINT_TAU, 7)
-
-    def set_safe_level(self, level):
-        txdata = [level]
-        return self.set_nu8(XCONF.UxbusReg.SET_SAFE_LEVEL, txdata, 1)
-
-    def get_safe_level(self):
-        return self.get_nu8(XCONF.UxbusReg.GET_SAFE_LEVEL, 1)
-
-    def sleep_instruction(self, sltime):
-        txdata = [sltime]
-        return self.set_nfp32(XCONF.UxbusReg.SLEEP_INSTT, txdata, 1)
-
     def move_circle(self, pose1, pose2, mvvelo, mvacc, mvtime, percent, only_check_type=0):
         txdata = [0] * 16
         for i in range(6):
@@ -575,68 +511,14 @@ class UxbusCmd(object):
         byte_data = bytes([coord, int(is_axis_angle), only_check_type])
         return self.set_nfp32_with_bytes(XCONF.UxbusReg.MOVE_CIRCLE, txdata, 16, byte_data, 3, timeout=10, feedback_key=feedback_key)
 
-    def set_tcp_jerk(self, jerk):
-        txdata = [jerk]
-        return self.set_nfp32(XCONF.UxbusReg.SET_TCP_JERK, txdata, 1)
-
-    def set_tcp_maxacc(self, acc):
-        txdata = [acc]
-        return self.set_nfp32(XCONF.UxbusReg.SET_TCP_MAXACC, txdata, 1)
-
-    def set_joint_jerk(self, jerk):
-        txdata = [jerk]
-        return self.set_nfp32(XCONF.UxbusReg.SET_JOINT_JERK, txdata, 1)
-
-    def set_joint_maxacc(self, acc):
-        txdata = [acc]
-        return self.set_nfp32(XCONF.UxbusReg.SET_JOINT_MAXACC, txdata, 1)
-
-    def set_tcp_offset(self, pose_offset):
-        return self.set_nfp32(XCONF.UxbusReg.SET_TCP_OFFSET, pose_offset, 6)
-
     def set_tcp_load(self, load_mass, load_com, feedback_key=None):
         param_list = [load_mass]
         param_list.extend(load_com)
         return self.set_nfp32(XCONF.UxbusReg.SET_LOAD_PARAM, param_list, 4, feedback_key=feedback_key, feedback_type=XCONF.FeedbackType.TRIGGER)
 
-    def set_collis_sens(self, value):
-        txdata = [value]
-        return self.set_nu8(XCONF.UxbusReg.SET_COLLIS_SENS, txdata, 1)
-
-    def set_teach_sens(self, value):
-        txdata = [value]
-        return self.set_nu8(XCONF.UxbusReg.SET_TEACH_SENS, txdata, 1)
-
-    def set_gravity_dir(self, gravity_dir):
-        return self.set_nfp32(XCONF.UxbusReg.SET_GRAVITY_DIR, gravity_dir, 3)
-
-    def clean_conf(self):
-        return self.set_nu8(XCONF.UxbusReg.CLEAN_CONF, 0, 0)
-
-    def save_conf(self):
-        return self.set_nu8(XCONF.UxbusReg.SAVE_CONF, 0, 0)
-
-    def get_joint_pos(self):
-        return self.get_nfp32(XCONF.UxbusReg.GET_JOINT_POS, 7)
-
     def get_joint_states(self, num=3):
         return self.get_nfp32_with_datas(XCONF.UxbusReg.GET_JOINT_POS, [num], 1, 7 * num)
 
-    def get_tcp_pose(self):
-        return self.get_nfp32(XCONF.UxbusReg.GET_TCP_POSE, 6)
-
-    def get_ik(self, pose):
-        return self.swop_nfp32(XCONF.UxbusReg.GET_IK, pose, 6, 7)
-
-    def get_fk(self, angles):
-        return self.swop_nfp32(XCONF.UxbusReg.GET_FK, angles, 7, 6)
-
-    def is_joint_limit(self, joint):
-        return self.is_nfp32(XCONF.UxbusReg.IS_JOINT_LIMIT, joint, 7)
-
-    def is_tcp_limit(self, pose):
-        return self.is_nfp32(XCONF.UxbusReg.IS_TCP_LIMIT, pose, 6)
-
     @lock_require
     def gripper_addr_w16(self, addr, value):
         return self.tgpio_addr_w16(addr, value, bid=XCONF.GRIPPER_ID)
@@ -858,10 +740,6 @@ class UxbusCmd(object):
         return self.recv_modbus_response(XCONF.UxbusReg.POSITION_CGPIO_SET_ANALOG, ret, 0, self._S_TOUT)
 
     # io_type: 0 for CGPIO, 1 for TGPIO
-    def config_io_stop_reset(self, io_type, on_off):
-        txdata = [io_type, on_off]
-        return self.set_nu8(XCONF.UxbusReg.SET_IO_STOP_RESET, txdata, 2)
-
     def gripper_modbus_w16s(self, addr, value, length):
         txdata = bytes([XCONF.GRIPPER_ID])
         txdata += bytes([0x10])
@@ -1039,14 +917,6 @@ class UxbusCmd(object):
         txdata = [int(value / 10.0 * 4095.0)]
         return self.set_nu16(XCONF.UxbusReg.CGPIO_SET_ANALOG2, txdata, 1)
 
-    def cgpio_set_infun(self, num, fun):
-        txdata = [int(num), int(fun)]
-        return self.set_nu8(XCONF.UxbusReg.CGPIO_SET_IN_FUN, txdata, 2)
-
-    def cgpio_set_outfun(self, num, fun):
-        txdata = [int(num), int(fun)]
-        return self.set_nu8(XCONF.UxbusReg.CGPIO_SET_OUT_FUN, txdata, 2)
-
     def cgpio_get_state(self):
         # ret = self.get_nu8(XCONF.UxbusReg.CGPIO_GET_STATE, 34)
         # ret = self.get_nu8(XCONF.UxbusReg.CGPIO_GET_STATE, 50)
@@ -1068,10 +938,6 @@ class UxbusCmd(object):
             msg[12] = ret[27:35] + ret[43:51]
         return msg
 
-    def set_self_collision_detection(self, on_off):
-        txdata = [on_off]
-        return self.set_nu8(XCONF.UxbusReg.SET_SELF_COLLIS_CHECK, txdata, 1)
-
     def set_collision_tool_model(self, tool_type, params):
         if len(params) > 0:
             byte_data = bytes([tool_type])
@@ -1080,16 +946,6 @@ class UxbusCmd(object):
             txdata = [tool_type]
             return self.set_nu8(XCONF.UxbusReg.SET_COLLIS_TOOL, txdata, 1)
 
-    def set_simulation_robot(self, on_off):
-        txdata = [int(on_off)]
-        return self.set_nu8(XCONF.UxbusReg.SET_SIMULATION_ROBOT, txdata, 1)
-
-    def get_power_board_version(self):
-        return self.get_nu8(XCONF.UxbusReg.GET_PWR_VERSION, 6)
-    
-    def get_movement(self):
-        return self.get_nu8(XCONF.UxbusReg.GET_MOVEMENT, 1)
-    
     def vc_set_jointv(self, jnt_v, jnt_sync, duration=-1):
         additional_bytes = bytes([jnt_sync])
         if duration >= 0:
@@ -1165,27 +1021,11 @@ class UxbusCmd(object):
             return [XCONF.UxbusState.ERR_NOTTCP]
         return self.recv_modbus_response(XCONF.UxbusReg.FORCE_CTRL_PID, ret, 0, self._S_TOUT)
 
-    def ft_sensor_set_zero(self):
-        return self.set_nu8(XCONF.UxbusReg.FTSENSOR_SET_ZERO, 0, 0)
         # return self.getset_nu8(XCONF.UxbusReg.FTSENSOR_SET_ZERO, [], 0, 1)
 
     def ft_sensor_iden_load(self):
         return self.iden_load(0, 10)
 
-    def ft_sensor_cali_load(self, iden_result_list):
-        return self.set_nfp32(XCONF.UxbusReg.FTSENSOR_CALI_LOAD_OFFSET, iden_result_list, 10)
-
-    def ft_sensor_enable(self, on_off):
-        txdata = [on_off]
-        return self.set_nu8(XCONF.UxbusReg.FTSENSOR_ENABLE, txdata, 1)
-
-    def ft_sensor_app_set(self, app_code):
-        txdata = [app_code]
-        return self.set_nu8(XCONF.UxbusReg.FTSENSOR_SET_APP, txdata, 1)
-
-    def ft_sensor_app_get(self):
-        return self.get_nu8(XCONF.UxbusReg.FTSENSOR_GET_APP, 1)
-
     def ft_sensor_get_data(self, is_new=True):
         return self.get_nfp32(XCONF.UxbusReg.FTSENSOR_GET_DATA if is_new else XCONF.UxbusReg.FTSENSOR_GET_DATA_OLD, 6)
 
@@ -1261,16 +1101,6 @@ class UxbusCmd(object):
         data[1:rxn+1] = convert.bytes_to_fp32s(ret[1:rxn * 4 + 1], rxn)
         return data
 
-    def cali_tcp_orient(self, rpy_be, rpy_bt):
-        txdata = [rpy_be[i] for i in range(3)]
-        txdata += [rpy_bt[i] for i in range(3)]
-        return self.swop_nfp32(XCONF.UxbusReg.CALI_TCP_ORIENT, txdata, 6, 3)
-
-    def cali_user_pos(self, rpy_ub, pos_b_uorg):
-        txdata = [rpy_ub[i] for i in range(3)]
-        txdata += [pos_b_uorg[i] for i in range(3)]
-        return self.swop_nfp32(XCONF.UxbusReg.CALI_WRLD_POSE, txdata, 6, 3)
-
     def get_tcp_rotation_radius(self, value):
         txdata = [value]
         data = [0] * 2
@@ -1279,11 +1109,6 @@ class UxbusCmd(object):
         data[1] = convert.bytes_to_fp32s(ret[1:], 1)
         return data
 
-    def get_max_joint_velocity(self, eveloc, joint_pos):
-        txdata = [eveloc]
-        txdata += [joint_pos[i] for i in range(7)]
-        return self.swop_nfp32(XCONF.UxbusReg.GET_MAX_JOINT_VELOCITY, txdata, 8, 1)
-
     def track_modbus_w16s(self, addr, value, length):
         txdata = bytes([XCONF.TRACK_ID])
         txdata += bytes([0x10])
@@ -1316,9 +1141,6 @@ class UxbusCmd(object):
         ret = self.recv_modbus_response(XCONF.UxbusReg.SERVO_ERROR, ret, 4, self._G_TOUT)
         return [ret[0], convert.bytes_to_long_big(ret[1:5])]
 
-    def get_dh_params(self):
-        return self.get_nfp32(XCONF.UxbusReg.GET_DH, 28)
-    
     def set_dh_params(self, dh_params, flag=0):
         if len(dh_params) < 28:
             dh_params.extend([0] * 28 - len(dh_params))
@@ -1412,3 +1234,7 @@ class UxbusCmd(object):
             else:
                 data[0] = XCONF.UxbusState.ERR_PARAM
         return data
+
+
+# the plain commands (get_state, set_tcp_offset, move_servoj, ...) are generated from the command table
+uxbus_cmd_schema.install(UxbusCmd)
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2023, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+import struct
+from ..config.x_config import XCONF
+
+R = XCONF.UxbusReg
+
+# element type => (size, struct format of n elements)
+# the arguments of the integer types are converted with int() by the generated methods (see _make_method)
+TX_TYPES = {
+    'u8': (1, '<{}B'),
+    'int32': (4, '<{}i'),
+    'fp32': (4, '<{}f'),
+}
+# element type => (size, typed accessor of UxbusResponse, zeros appended to the values)
+# the zero after the u16 values is the one the former UxbusCmd.get_nu16 left, get_cmdnum returns [code, num, 0]
+RX_TYPES = {
+    'u8': (1, None, 0),  # returned as is, one int per byte
+    'u16': (2, 'u16s', 1),
+    'fp32': (4, 'fp32s', 0),
+}
+
+
+class UxbusCommand(object):
+    """
+    One command of the table: register, request layout and response layout
+    :param args: argument names of the generated method, 'name:n' is a sequence of n elements
+    :param tx: element type of all the arguments ('u8', 'int32', 'fp32'), None if the request has no data
+    :param rx: element type of the response ('u8', 'u16', 'fp32'), None if the response has no data
+    :param rx_num: number of elements of the response
+    The encoder (struct.Struct.pack of the whole request) and the decoder (UxbusResponse => list) are built once, here.
+    """
+    __slots__ = ('reg', 'name', 'args', 'tx', 'rx', 'rx_num', 'tx_len', 'rx_len', 'err_num', 'encode', 'decode')
+
+    def __init__(self, reg, name, args=(), tx=None, rx=None, rx_num=0):
+        self.reg = reg
+        self.name = name
+        self.args = tuple(args)
+        self.tx = tx
+        self.rx = rx
+        self.rx_num = rx_num if rx else 0
+        tx_num = sum(int(arg.split(':')[1]) if ':' in arg else 1 for arg in self.args)
+        if tx_num:
+            size, fmt = TX_TYPES[tx]
+            self.tx_len = size * tx_num
+            self.encode = struct.Struct(fmt.format(tx_num)).pack
+        else:
+            self.tx_len = 0
+            self.encode = None
+        if self.rx_num:
+            size, accessor, pad = RX_TYPES[rx]
+            self.rx_len = size * self.rx_num
+            self.decode = _make_decoder(accessor, self.rx_num, self.rx_len, pad)
+        else:
+            self.rx_len = 0
+            self.decode = _make_decoder(None, 0, 0, 0)
+        # the error result (request not sent) keeps the shape of the former UxbusCmd helpers: one element per
+        # response byte for the getters (get_nu8/get_nu16/get_nfp32), per response element with a request
+        # (swop_nfp32/is_nfp32)
+        self.err_num = (self.rx_num if tx_num else self.rx_len) + 1
+
+    def __repr__(self):
+        return 'UxbusCommand({}={}, args={}, tx={}, rx={}x{})'.format(
+            self.name, self.reg, self.args, self.tx, self.rx_num, self.rx)
+
+
+def _make_decoder(accessor, rx_num, rx_len, pad):
+    if accessor is None:
+        def decode(resp):
+            return resp.to_list(rx_len)
+    elif pad:
+        zeros = [0] * pad
+
+        def decode(resp):
+            data = [resp.code]
+            data.extend(getattr(resp, accessor)(rx_num))
+            data.extend(zeros)
+            return data
+    else:
+        def decode(resp):
+            data = [resp.code]
+            data.extend(getattr(resp, accessor)(rx_num))
+            return data
+    return decode
+
+
+def _make_method(cmd):
+    """
+    Generate the method of the command, e.g.
+        def move_servoj(self, mvjoint, mvvelo, mvacc, mvtime):
+            return self._run_command(cmd, encode(*mvjoint[:7], mvvelo, mvacc, mvtime))
+        def set_brake(self, axis_id, enable):
+            return self._run_command(cmd, encode(int(axis_id), int(enable)))
+    """
+    params = ''.join(', ' + arg.split(':')[0] for arg in cmd.args)
+    if cmd.encode is None:
+        payload = "b''"
+    else:
+        # struct rejects the floats (1.0, numpy.float64) for the integer types
+        if cmd.tx == 'fp32':
+            seq_fmt, one_fmt = '*{}[:{}]', '{}'
+        else:
+            seq_fmt, one_fmt = '*map(int, {}[:{}])', 'int({})'
+        values = ', '.join(seq_fmt.format(*arg.split(':')) if ':' in arg else one_fmt.format(arg) for arg in cmd.args)
+        payload = 'encode({})'.format(values)
+    src = 'def {}(self{}):\n    return self._run_command(cmd, {})\n'.format(cmd.name, params, payload)
+    namespace = {'cmd': cmd, 'encode': cmd.encode}
+    exec(src, namespace)
+    method = namespace[cmd.name]
+    method.__doc__ = 'register {}, request: {}, response: {}'.format(
+        cmd.reg, '{} bytes of {}'.format(cmd.tx_len, cmd.tx) if cmd.tx_len else 'none',
+        '{} x {}'.format(cmd.rx_num, cmd.rx) if cmd.rx_num else 'state only')
+    return method
+
+
+def install(cls):
+    """
+    Add the methods of UXBUS_COMMANDS to cls, the methods written by hand in cls are kept
+    """
+    for cmd in UXBUS_COMMANDS:
+        if cmd.name not in cls.__dict__:
+            method = _make_method(cmd)
+            method.__qualname__ = '{}.{}'.format(cls.__name__, cmd.name)
+            method.__module__ = cls.__module__
+            setattr(cls, cmd.name, method)
+
+
+C = UxbusCommand
+
+# the commands whose request is the plain concatenation of their arguments and whose response is a plain array,
+# the other commands are written by hand in UxbusCmd (extra bytes, conversions, several steps, ...)
+UXBUS_COMMANDS = (
+    C(R.GET_VERSION, 'get_version', rx='u8', rx_num=40),
+    C(R.GET_ROBOT_SN, 'get_robot_sn', rx='u8', rx_num=40),
+    # txdata = signature, 175: signature length if use 14-character SN for plain text, do not miss '\n's
+    C(R.CHECK_VERIFY, 'check_verification', rx='u8', rx_num=1),
+    C(R.RELOAD_DYNAMICS, 'reload_dynamics'),
+    C(R.GET_REPORT_TAU_OR_I, 'get_report_tau_or_i', rx='u8', rx_num=1),
+    C(R.SYSTEM_CONTROL, 'system_control', ('value',), tx='u8'),
+    C(R.SET_TRAJ_RECORD, 'set_record_traj', ('value',), tx='u8'),
+    C(R.GET_TRAJ_RW_STATUS, 'get_traj_rw_status', rx='u8', rx_num=1),
+    C(R.SET_REDUCED_MODE, 'set_reduced_mode', ('on_off',), tx='u8'),
+    C(R.SET_REDUCED_TRSV, 'set_reduced_linespeed', ('lspd_mm',), tx='fp32'),
+    C(R.SET_REDUCED_P2PV, 'set_reduced_jointspeed', ('jspd_rad',), tx='fp32'),
+    C(R.GET_REDUCED_MODE, 'get_reduced_mode', rx='u8', rx_num=1),
+    C(R.SET_LIMIT_XYZ, 'set_xyz_limits', ('xyz_list:6',), tx='int32'),
+    C(R.CANCEL_TIMER, 'cancel_timer', ('timer_id',), tx='int32'),
+    C(R.SET_WORLD_OFFSET, 'set_world_offset', ('pose_offset:6',), tx='fp32'),
+    C(R.CNTER_RESET, 'cnter_reset'),
+    C(R.CNTER_PLUS, 'cnter_plus'),
+    C(R.SET_REDUCED_JRANGE, 'set_reduced_jrange', ('jrange_rad:14',), tx='fp32'),
+    C(R.SET_FENSE_ON, 'set_fense_on', ('on_off',), tx='u8'),
+    C(R.SET_COLLIS_REB, 'set_collis_reb', ('on_off',), tx='u8'),
+    C(R.SET_STATE, 'set_state', ('value',), tx='u8'),
+    C(R.GET_STATE, 'get_state', rx='u8', rx_num=1),
+    C(R.GET_CMDNUM, 'get_cmdnum', rx='u16', rx_num=1),
+    C(R.GET_ERROR, 'get_err_code', rx='u8', rx_num=2),
+    C(R.GET_HD_TYPES, 'get_hd_types', rx='u8', rx_num=2),
+    C(R.CLEAN_ERR, 'clean_err'),
+    C(R.CLEAN_WAR, 'clean_war'),
+    C(R.SET_BRAKE, 'set_brake', ('axis_id', 'enable'), tx='u8'),
+    C(R.REPORT_TAU_OR_I, 'set_report_tau_or_i', ('tau_or_i',), tx='u8'),  # 0 for tau(default), 1 for i
+    C(R.SET_CARTV_CONTINUE, 'set_cartesian_velo_continuous', ('on_off',), tx='u8'),
+    C(R.SET_ALLOW_APPROX_MOTION, 'set_allow_approx_motion', ('on_off',), tx='u8'),
+    C(R.GET_ALLOW_APPROX_MOTION, 'get_allow_approx_motion', rx='u8', rx_num=1),
+    C(R.MOVE_SERVOJ, 'move_servoj', ('mvjoint:7', 'mvvelo', 'mvacc', 'mvtime'), tx='fp32'),
+    C(R.MOVE_SERVO_CART, 'move_servo_cartesian', ('mvpose:6', 'mvvelo', 'mvacc', 'mvtime'), tx='fp32'),
+    C(R.GET_JOINT_TAU, 'get_joint_tau', rx='fp32', rx_num=7),
+    C(R.SET_SAFE_LEVEL, 'set_safe_level', ('level',), tx='u8'),
+    C(R.GET_SAFE_LEVEL, 'get_safe_level', rx='u8', rx_num=1),
+    C(R.SLEEP_INSTT, 'sleep_instruction', ('sltime',), tx='fp32'),
+    C(R.SET_TCP_JERK, 'set_tcp_jerk', ('jerk',), tx='fp32'),
+    C(R.SET_TCP_MAXACC, 'set_tcp_maxacc', ('acc',), tx='fp32'),
+    C(R.SET_JOINT_JERK, 'set_joint_jerk', ('jerk',), tx='fp32'),
+    C(R.SET_JOINT_MAXACC, 'set_joint_maxacc', ('acc',), tx='fp32'),
+    C(R.SET_TCP_OFFSET, 'set_tcp_offset', ('pose_offset:6',), tx='fp32'),
+    C(R.SET_COLLIS_SENS, 'set_collis_sens', ('value',), tx='u8'),
+    C(R.SET_TEACH_SENS, 'set_teach_sens', ('value',), tx='u8'),
+    C(R.CLEAN_CONF, 'clean_conf'),
+    C(R.SAVE_CONF, 'save_conf'),
+    C(R.GET_TCP_POSE, 'get_tcp_pose', rx='fp32', rx_num=6),
+    C(R.GET_JOINT_POS, 'get_joint_pos', rx='fp32', rx_num=7),
+    C(R.GET_IK, 'get_ik', ('pose:6',), tx='fp32', rx='fp32', rx_num=7),
+    C(R.GET_FK, 'get_fk', ('angles:7',), tx='fp32', rx='fp32', rx_num=6),
+    C(R.IS_JOINT_LIMIT, 'is_joint_limit', ('joint:7',), tx='fp32', rx='u8', rx_num=1),
+    C(R.IS_TCP_LIMIT, 'is_tcp_limit', ('pose:6',), tx='fp32', rx='u8', rx_num=1),
+    C(R.SET_GRAVITY_DIR, 'set_gravity_dir', ('gravity_dir:3',), tx='fp32'),
+    C(R.GET_TCP_POSE_AA, 'get_position_aa', rx='fp32', rx_num=6),
+    C(R.SET_IO_STOP_RESET, 'config_io_stop_reset', ('io_type', 'on_off'), tx='u8'),
+    C(R.CGPIO_SET_IN_FUN, 'cgpio_set_infun', ('num', 'fun'), tx='u8'),
+    C(R.CGPIO_SET_OUT_FUN, 'cgpio_set_outfun', ('num', 'fun'), tx='u8'),
+    C(R.SET_SELF_COLLIS_CHECK, 'set_self_collision_detection', ('on_off',), tx='u8'),
+    C(R.SET_SIMULATION_ROBOT, 'set_simulation_robot', ('on_off',), tx='u8'),
+    C(R.GET_PWR_VERSION, 'get_power_board_version', rx='u8', rx_num=6),
+    C(R.GET_MOVEMENT, 'get_movement', rx='u8', rx_num=1),
+    C(R.FTSENSOR_SET_ZERO, 'ft_sensor_set_zero'),
+    C(R.FTSENSOR_CALI_LOAD_OFFSET, 'ft_sensor_cali_load', ('iden_result_list:10',), tx='fp32'),
+    C(R.FTSENSOR_ENABLE, 'ft_sensor_enable', ('on_off',), tx='u8'),
+    C(R.FTSENSOR_SET_APP, 'ft_sensor_app_set', ('app_code',), tx='u8'),
+    C(R.FTSENSOR_GET_APP, 'ft_sensor_app_get', rx='u8', rx_num=1),
+    C(R.CALI_TCP_ORIENT, 'cali_tcp_orient', ('rpy_be:3', 'rpy_bt:3'), tx='fp32', rx='fp32', rx_num=3),
+    C(R.CALI_WRLD_POSE, 'cali_user_pos', ('rpy_ub:3', 'pos_b_uorg:3'), tx='fp32', rx='fp32', rx_num=3),
+    C(R.GET_MAX_JOINT_VELOCITY, 'get_max_joint_velocity', ('eveloc', 'joint_pos:7'), tx='fp32', rx='fp32', rx_num=1),
+    C(R.GET_DH, 'get_dh_params', rx='fp32', rx_num=28),
+)
+
+# register => command
+UXBUS_SCHEMA = {cmd.reg: cmd for cmd in UXBUS_COMMANDS}
+assert len(UXBUS_SCHEMA) == len(UXBUS_COMMANDS), 'a register is listed twice in UXBUS_COMMANDS'
@@ -11,6 +11,7 @@
 import time
 from ..utils import crc16
 from .uxbus_cmd import UxbusCmd
+from .uxbus_frame import FrameBuffer
 from ..config.x_config import XCONF
 
 
@@ -23,13 +24,16 @@ def debug_log_datas(datas, label=''):
 
 
 class UxbusCmdSer(UxbusCmd):
-    def __init__(self, arm_port, fromid=XCONF.SerialConf.UXBUS_DEF_FROMID, toid=XCONF.SerialConf.UXBUS_DEF_TOID):
-        super(UxbusCmdSer, self).__init__()
+    def __init__(self, arm_port, fromid=XCONF.SerialConf.UXBUS_DEF_FROMID, toid=XCONF.SerialConf.UXBUS_DEF_TOID,
+                 stats=None):
+        super(UxbusCmdSer, self).__init__(stats=stats)
         self.arm_port = arm_port
         self.fromid = fromid
         self.toid = toid
         arm_port.flush(fromid, toid)
         self._has_err_warn = False
+        # fromid, toid, length, reg + pdu + crc, packed in place under the command lock
+        self._tx_frame = FrameBuffer('BBBB', trailer_size=2)
 
     @property
     def has_err_warn(self):
@@ -63,16 +67,31 @@ class UxbusCmdSer(UxbusCmd):
             return 0
     
     def send_modbus_request(self, reg, txdata, num, prot_id=-1, t_id=None):
-        send_data = bytes([self.fromid, self.toid, num + 1, reg])
-        for i in range(num):
-            send_data += bytes([txdata[i]])
-        send_data += crc16.crc_modbus(send_data)
+        send_data = self._tx_frame.pack((self.fromid, self.toid, num + 1, reg), txdata, num)
+        crc = crc16.update(crc16.CRC_MODBUS_INIT, send_data[:-2])
+        send_data[-2] = crc & 0xFF
+        send_data[-1] = crc >> 8
         self.arm_port.flush()
         if self._debug:
             debug_log_datas(send_data, label='send')
-        return self.arm_port.write(send_data)
+        if self.stats is None:
+            return self.arm_port.write(send_data)
+        start = time.perf_counter()
+        ret = self.arm_port.write(send_data)
+        self.stats.on_send(reg, len(send_data), self._lock_wait, time.perf_counter() - start)
+        self._lock_wait = 0.0
+        return ret
     
     def recv_modbus_response(self, t_funcode, t_trans_id, num, timeout, t_prot_id=-1, ret_raw=False):
+        if self.stats is None:
+            return self._recv_modbus_response(num, timeout)[0]
+        start = time.perf_counter()
+        ret, nbytes = self._recv_modbus_response(num, timeout)
+        self.stats.on_reply(t_funcode, ret[0], nbytes, time.perf_counter() - start)
+        return ret
+
+    def _recv_modbus_response(self, num, timeout):
+        """:return: (ret, bytes received)"""
         ret = [0] * 254 if num == -1 else [0] * (num + 1)
         expired = time.monotonic() + timeout
         ret[0] = XCONF.UxbusState.ERR_TOUT
@@ -89,6 +108,6 @@ class UxbusCmdSer(UxbusCmd):
                     if i >= length:
                         break
                     ret[i + 1] = rx_data[i + 4]
-                return ret
+                return ret, len(rx_data)
             time.sleep(0.001)
-        return ret
+        return ret, 0
@@ -10,13 +10,21 @@
 
 import time
 import struct
+import threading
+import contextlib
 from ..utils import convert
-from .uxbus_cmd import UxbusCmd, lock_require
+from ..comm.base import TransIdRxParse, PendingResponse
+from .uxbus_cmd import UxbusCmd, lock_require, single_request
+from .uxbus_response import UxbusResponse
+from .uxbus_frame import FrameBuffer
+from .uxbus_rtt import SLOW_FUNCODES
+from .uxbus_batch import BatchRecorder, BatchReplayer
 from ..config.x_config import XCONF
 
 STANDARD_MODBUS_TCP_PROTOCOL = 0x00
 PRIVATE_MODBUS_TCP_PROTOCOL = 0x02
 TRANSACTION_ID_MAX = 65535    # cmd序号 最大值
+PRIORITY_TRANSACTION_ID = TRANSACTION_ID_MAX    # reserved for the priority lane, never used by the normal commands
 
 
 def debug_log_datas(datas, label=''):
@@ -29,13 +37,33 @@ def debug_log_datas(datas, label=''):
 
 
 class UxbusCmdTcp(UxbusCmd):
-    def __init__(self, arm_port, set_feedback_key_tranid=None):
-        super(UxbusCmdTcp, self).__init__(set_feedback_key_tranid=set_feedback_key_tranid)
+    def __init__(self, arm_port, set_feedback_key_tranid=None, pipeline=False, rtt=None, stats=None):
+        super(UxbusCmdTcp, self).__init__(set_feedback_key_tranid=set_feedback_key_tranid, stats=stats)
         self.arm_port = arm_port
         self._has_err_warn = False
         self._last_comm_time = time.monotonic()
         self._transaction_id = 1
         self._protocol_identifier = PRIVATE_MODBUS_TCP_PROTOCOL
+        # pipeline: responses are routed by transaction id and the command lock is released while waiting,
+        #   so other threads can put their requests on the wire before the previous reply arrives
+        self._rx_router = None
+        if pipeline:
+            self._rx_router = TransIdRxParse(arm_port.rx_que, arm_port.fb_que)
+            arm_port.rx_parse = self._rx_router
+        self._priority_lock = threading.Lock()
+        # request frames are packed in place, the command lock and the priority lane each own a buffer
+        self._tx_frame = FrameBuffer('>HHHB')
+        self._priority_tx_frame = FrameBuffer('>HHHB', size=64)
+        # rtt: a RttEstimator, the default timeouts of the short commands are derived from the measured round trips
+        self.rtt = rtt
+        # batch state of the calling thread (BatchRecorder/BatchReplayer), see send_batch
+        self._batch_local = threading.local()
+        # function code of the standard modbus request in flight (under the command lock), for the stats
+        self._modbus_funcode = 0
+
+    @property
+    def pipeline(self):
+        return self._rx_router is not None
 
     @property
     def has_err_warn(self):
@@ -56,6 +84,9 @@ class UxbusCmdTcp(UxbusCmd):
         return self._protocol_identifier
     
     def _get_trans_id(self):
+        batch = getattr(self._batch_local, 'batch', None)
+        if batch is not None and not batch.done:
+            return batch.trans_id()
         return self._transaction_id
 
     def check_protocol_header(self, data, t_trans_id, t_prot_id, t_unit_id):
@@ -87,29 +118,238 @@ class UxbusCmdTcp(UxbusCmd):
         self._has_err_warn = False
         return 0
     
+    @staticmethod
+    def _build_frame(frame, trans_id, prot_id, unit_id, pdu_data, pdu_len):
+        return frame.pack((trans_id, prot_id, pdu_len + 1, unit_id), pdu_data, pdu_len)
+
     def send_modbus_request(self, unit_id, pdu_data, pdu_len, prot_id=-1, t_id=None):
+        batch = getattr(self._batch_local, 'batch', None)
+        if batch is not None and not batch.done:
+            ret = batch.send(unit_id, pdu_data, pdu_len, prot_id)
+            if ret is not None:
+                return ret
+            # a read-only request before the command of the call, sent as usual
         trans_id = self._transaction_id if t_id is None else t_id
         prot_id = self._protocol_identifier if prot_id < 0 else prot_id
-        send_data = convert.u16_to_bytes(trans_id)
-        send_data += convert.u16_to_bytes(prot_id)
-        send_data += convert.u16_to_bytes(pdu_len + 1)
-        send_data += bytes([unit_id])
-        for i in range(pdu_len):
-            send_data += bytes([pdu_data[i]])
-        self.arm_port.flush()
+        send_data = self._build_frame(self._tx_frame, trans_id, prot_id, unit_id, pdu_data, pdu_len)
+        if self._rx_router is not None:
+            # register before writing, the reply may arrive before write returns
+            self._rx_router.register(trans_id)
+        else:
+            self.arm_port.flush()
         if self._debug:
             debug_log_datas(send_data, label='send({})'.format(unit_id))
-        ret = self.arm_port.write(send_data)
+        if self.stats is None:
+            ret = self.arm_port.write(send_data)
+        else:
+            start = time.perf_counter()
+            ret = self.arm_port.write(send_data)
+            self.stats.on_send(self._stats_key(unit_id, prot_id, pdu_data), len(send_data), self._lock_wait,
+                               time.perf_counter() - start)
+            self._lock_wait = 0.0
         if ret != 0:
+            if self._rx_router is not None:
+                self._rx_router.unregister(trans_id)
             return -1
         if t_id is None:
-            self._transaction_id = self._transaction_id % TRANSACTION_ID_MAX + 1
+            self._transaction_id = self._transaction_id % (TRANSACTION_ID_MAX - 1) + 1
         return trans_id
+
+    def priority_request(self, funcode, datas, num, rx_num, timeout):
+        """
+        Send a request on the priority lane, used by the state/stop commands
+        It does not take the command lock and does not touch the response queue, the reply is picked out of the
+        receive path by its reserved transaction id, so the latency is one round trip even while another thread
+        is blocked in a long command.
+        """
+        batch = getattr(self._batch_local, 'batch', None)
+        if isinstance(batch, BatchRecorder):
+            batch.skip()
+        rx_parse = self.arm_port.rx_parse
+        stats = self.stats
+        start = time.perf_counter()
+        with self._priority_lock:
+            lock_wait = time.perf_counter() - start
+            pending = PendingResponse()
+            rx_parse.priority[PRIORITY_TRANSACTION_ID] = pending
+            try:
+                send_data = self._build_frame(self._priority_tx_frame, PRIORITY_TRANSACTION_ID,
+                                              self._protocol_identifier, funcode, datas, num)
+                if self._debug:
+                    debug_log_datas(send_data, label='send({}, priority)'.format(funcode))
+                start = time.perf_counter()
+                if self.arm_port.write(send_data) != 0:
+                    return [XCONF.UxbusState.ERR_NOTTCP] * (rx_num + 1)
+                sent = time.perf_counter()
+                pending.event.wait(timeout)
+            finally:
+                rx_parse.priority.pop(PRIORITY_TRANSACTION_ID, None)
+        if pending.data is None:
+            resp = UxbusResponse(XCONF.UxbusState.ERR_TOUT)
+        else:
+            resp = self._handle_routed_response(pending.data, funcode, PRIORITY_TRANSACTION_ID,
+                                                self._protocol_identifier)
+        if stats is not None:
+            stats.on_send(funcode, len(send_data), lock_wait, sent - start)
+            stats.on_reply(funcode, resp.code, len(resp.frame) if resp.frame is not None else 0,
+                           time.perf_counter() - sent)
+        return resp.to_list(rx_num)
     
     def recv_modbus_response(self, t_unit_id, t_trans_id, num, timeout, t_prot_id=-1, ret_raw=False):
+        return self.recv_response(t_unit_id, t_trans_id, num, timeout, t_prot_id, ret_raw).to_list(num)
+
+    def recv_response(self, t_unit_id, t_trans_id, num, timeout, t_prot_id=-1, ret_raw=False):
+        batch = getattr(self._batch_local, 'batch', None)
+        if batch is not None and not batch.done:
+            resp = batch.recv(num, timeout, ret_raw)
+            if resp is not None:
+                return resp
         prot_id = self._protocol_identifier if t_prot_id < 0 else t_prot_id
-        ret = [0] * 320 if num == -1 else [0] * (num + 1)
-        ret[0] = XCONF.UxbusState.ERR_TOUT
+        stats = self.stats
+        if stats is not None:
+            stats_start = time.perf_counter()
+        rtt = self._adaptive_rtt(t_unit_id, timeout, prot_id)
+        if rtt is None:
+            resp = self._recv_response(t_unit_id, t_trans_id, timeout, prot_id, ret_raw)
+        else:
+            start = time.monotonic()
+            resp = self._recv_response(t_unit_id, t_trans_id, rtt.timeout(t_unit_id, timeout), prot_id, ret_raw)
+            self._update_rtt(rtt, t_unit_id, resp, start)
+        if stats is not None:
+            self._stats_reply(stats, t_unit_id, prot_id, resp, time.perf_counter() - stats_start)
+        return resp
+
+    def _stats_key(self, unit_id, prot_id, pdu_data):
+        if prot_id != STANDARD_MODBUS_TCP_PROTOCOL:
+            return unit_id
+        self._modbus_funcode = pdu_data[0]
+        return 'modbus', self._modbus_funcode
+
+    def _stats_reply(self, stats, unit_id, prot_id, resp, elapsed):
+        key = unit_id if prot_id != STANDARD_MODBUS_TCP_PROTOCOL else ('modbus', self._modbus_funcode)
+        stats.on_reply(key, resp.code, len(resp.frame) if resp.frame is not None else 0, elapsed)
+
+    @contextlib.contextmanager
+    def batch_record(self, capture_read=False):
+        """
+        Record pass of a batch in the calling thread: the request carrying the command of a call is captured
+        instead of sent (see BatchRecorder), the recorder holds the request
+        """
+        recorder = BatchRecorder(capture_read)
+        self._batch_local.batch = recorder
+        try:
+            yield recorder
+        finally:
+            self._batch_local.batch = None
+
+    @contextlib.contextmanager
+    def batch_replay(self, request):
+        """
+        Replay pass of a batch in the calling thread: the command request of the call gets the trans id and
+        the response of request (sent by send_batch), the other ones go over the wire as usual
+        """
+        self._batch_local.batch = BatchReplayer(request)
+        try:
+            yield
+        finally:
+            self._batch_local.batch = None
+
+    @lock_require
+    def send_batch(self, requests):
+        """
+        Send the recorded requests (BatchRequest) in a single write with consecutive transaction ids,
+        then collect all the responses into request.response
+        :return: 0 or -1 (not sent, the responses stay None)
+        """
+        if not requests:
+            return 0
+        frames = bytearray()
+        for request in requests:
+            request.trans_id = self._transaction_id
+            self._transaction_id = self._transaction_id % (TRANSACTION_ID_MAX - 1) + 1
+            prot_id = self._protocol_identifier if request.prot_id < 0 else request.prot_id
+            frames += self._build_frame(self._tx_frame, request.trans_id, prot_id, request.unit_id,
+                                        request.pdu, len(request.pdu))
+        if self._rx_router is not None:
+            for request in requests:
+                self._rx_router.register(request.trans_id)
+        else:
+            self.arm_port.flush()
+        if self._debug:
+            debug_log_datas(frames, label='send(batch x{})'.format(len(requests)))
+        start = time.perf_counter()
+        if self.arm_port.write(frames) != 0:
+            if self._rx_router is not None:
+                for request in requests:
+                    self._rx_router.unregister(request.trans_id)
+            return -1
+        sent = time.perf_counter()
+        stats = self.stats
+        if stats is not None:
+            # the write is shared, each request gets its part of it
+            elapsed = (sent - start) / len(requests)
+            for request in requests:
+                prot_id = self._protocol_identifier if request.prot_id < 0 else request.prot_id
+                stats.on_send(self._stats_key(request.unit_id, prot_id, request.pdu), len(request.pdu) + 7,
+                              self._lock_wait, elapsed)
+                self._lock_wait = 0.0
+        if self._rx_router is not None:
+            for request in requests:
+                request.response = self.recv_response(request.unit_id, request.trans_id, request.num,
+                                                      request.timeout, request.prot_id, request.ret_raw)
+            return 0
+        # without the router the replies are matched here, in whatever order they come
+        pending = {request.trans_id: request for request in requests}
+        expired = time.monotonic() + max(request.timeout for request in requests)
+        while pending and time.monotonic() < expired:
+            rx_data = self.arm_port.read(expired - time.monotonic())
+            if rx_data == -1:
+                time.sleep(0.001)
+                continue
+            request = pending.pop(convert.bytes_to_u16(rx_data[0:2]), None)
+            if request is None:
+                continue
+            prot_id = self._protocol_identifier if request.prot_id < 0 else request.prot_id
+            request.response = self._handle_routed_response(rx_data, request.unit_id, request.trans_id, prot_id,
+                                                            request.ret_raw)
+            if stats is not None:
+                self._stats_reply(stats, request.unit_id, prot_id, request.response, time.perf_counter() - sent)
+        for request in pending.values():
+            request.response = UxbusResponse(XCONF.UxbusState.ERR_TOUT)
+            if stats is not None:
+                prot_id = self._protocol_identifier if request.prot_id < 0 else request.prot_id
+                self._stats_reply(stats, request.unit_id, prot_id, request.response, time.perf_counter() - sent)
+        return 0
+
+    def _adaptive_rtt(self, funcode, timeout, prot_id):
+        # only the requests with the default timeouts, an explicit timeout is kept as is
+        rtt = self.rtt
+        if rtt is None or prot_id == STANDARD_MODBUS_TCP_PROTOCOL or funcode in SLOW_FUNCODES \
+                or (timeout != self._G_TOUT and timeout != self._S_TOUT):
+            return None
+        return rtt
+
+    def _update_rtt(self, rtt, funcode, resp, start):
+        if resp.code == XCONF.UxbusState.ERR_TOUT:
+            rtt.on_timeout(funcode)
+        elif resp.frame is not None:
+            rtt.sample(funcode, self._last_comm_time - start)
+
+    def _recv_response(self, t_unit_id, t_trans_id, timeout, prot_id, ret_raw=False):
+        if self._rx_router is not None:
+            if not self._release_on_wait:
+                # several requests under the lock (lock_require), none of another thread goes in between
+                rx_data = self._rx_router.wait(t_trans_id, timeout)
+                return self._handle_routed_response(rx_data, t_unit_id, t_trans_id, prot_id, ret_raw)
+            # a single request (single_request), the lock is not needed any more to get its reply, the other
+            # requests go out while this one waits (the reply is routed by transaction id)
+            self._release_on_wait = False
+            self.lock.release()
+            try:
+                rx_data = self._rx_router.wait(t_trans_id, timeout)
+            finally:
+                self.lock.acquire()
+            return self._handle_routed_response(rx_data, t_unit_id, t_trans_id, prot_id, ret_raw)
         expired = time.monotonic() + timeout
         while time.monotonic() < expired:
             remaining = expired - time.monotonic()
@@ -123,32 +363,34 @@ class UxbusCmdTcp(UxbusCmd):
             code = self.check_protocol_header(rx_data, t_trans_id, prot_id, t_unit_id)
             if code != 0:
                 if code != XCONF.UxbusState.ERR_NUM:
-                    ret[0] = code
-                    return ret
+                    return UxbusResponse(code)
                 else:
                     continue
-            if prot_id != STANDARD_MODBUS_TCP_PROTOCOL and not ret_raw:
-                # Private Modbus TCP Protocol
-                ret[0] = self.check_private_protocol(rx_data)
-                num = convert.bytes_to_u16(rx_data[4:6]) - 2
-                ret = ret[:num + 1] if len(ret) >= num + 1 else [ret[0]] * (num + 1)
-                length = len(rx_data) - 8
-                for i in range(num):
-                    if i >= length:
-                        break
-                    ret[i + 1] = rx_data[i + 8]       
-            else:
-                # Standard Modbus TCP Protocol
-                ret[0] = 0
-                num = convert.bytes_to_u16(rx_data[4:6]) + 6
-                ret = ret[:num + 1] if len(ret) >= num + 1 else [ret[0]] * (num + 1)
-                length = len(rx_data)
-                for i in range(num):
-                    if i >= length:
-                        break
-                    ret[i + 1] = rx_data[i]
-            return ret
-        return ret
+            return self._parse_response(rx_data, prot_id, ret_raw)
+        return UxbusResponse(XCONF.UxbusState.ERR_TOUT)
+
+    def _handle_routed_response(self, rx_data, t_unit_id, t_trans_id, prot_id, ret_raw=False):
+        if rx_data == -1:
+            return UxbusResponse(XCONF.UxbusState.ERR_TOUT)
+        self._last_comm_time = time.monotonic()
+        if self._debug:
+            debug_log_datas(rx_data, label='recv({})'.format(t_unit_id))
+        code = self.check_protocol_header(rx_data, t_trans_id, prot_id, t_unit_id)
+        if code != 0:
+            return UxbusResponse(code)
+        return self._parse_response(rx_data, prot_id, ret_raw)
+
+    def _parse_response(self, rx_data, prot_id, ret_raw=False):
+        """
+        The response is backed by rx_data (the bytes of the frame handed out by the port), nothing is copied
+        """
+        if prot_id != STANDARD_MODBUS_TCP_PROTOCOL and not ret_raw:
+            # Private Modbus TCP Protocol
+            code = self.check_private_protocol(rx_data)
+            return UxbusResponse(code, rx_data, 8, convert.bytes_to_u16(rx_data[4:6]) - 2)
+        else:
+            # Standard Modbus TCP Protocol
+            return UxbusResponse(0, rx_data, 0, convert.bytes_to_u16(rx_data[4:6]) + 6)
 
     # def send_hex_request(self, send_data):
     #     trans_id = int('0x' + str(send_data[0]) + str(send_data[1]), 16)
@@ -192,13 +434,14 @@ class UxbusCmdTcp(UxbusCmd):
     #         return rx_data if rx_data else 3
 
     ####################### Standard Modbus TCP API ########################
-    @lock_require
+    @single_request
     def __standard_modbus_tcp_request(self, pdu, unit_id=0x01):
         ret = self.send_modbus_request(unit_id, pdu, len(pdu), prot_id=STANDARD_MODBUS_TCP_PROTOCOL)
         if ret == -1:
             return XCONF.UxbusState.ERR_NOTTCP, b''
-        ret = self.recv_modbus_response(unit_id, ret, -1, 10000, t_prot_id=STANDARD_MODBUS_TCP_PROTOCOL)
-        code, recv_data = ret[0], bytes(ret[1:])
+        # bounded by the timeout of the set commands (see set_timeout), a lost reply fails with ERR_TOUT
+        ret = self.recv_response(unit_id, ret, -1, self._S_TOUT, t_prot_id=STANDARD_MODBUS_TCP_PROTOCOL)
+        code, recv_data = ret.code, ret.tobytes()
         if code == 0 and recv_data[7] == pdu[0] + 0x80:  # len(recv_data) == 9
             # print('request exception, exp={}, res={}'.format(recv_data[8], recv_data))
             return recv_data[8] + 0x80, recv_data
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2023, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+import struct
+from ..utils.convert import _StructCache
+
+
+class FrameBuffer(object):
+    """
+    Reusable buffer the request frames of a connection are packed into
+    The header and the pdu are written with a single pack_into (pdu given as a list of ints or bytes),
+    a bytearray/memoryview pdu is copied in with one slice assignment.
+    Not thread safe, each sender (command lock, priority lane) owns its FrameBuffer.
+
+    :param header_fmt: struct format of the header, e.g. '>HHHB'
+    :param trailer_size: bytes reserved after the pdu (crc), written by the caller
+    """
+    def __init__(self, header_fmt, trailer_size=0, size=256):
+        self.header = struct.Struct(header_fmt)
+        self.header_size = self.header.size
+        self.trailer_size = trailer_size
+        self._u8s_codecs = _StructCache(header_fmt + '{}B')
+        self._bytes_codecs = _StructCache(header_fmt + '{}s')
+        self.buffer = bytearray(size)
+
+    def pack(self, header, pdu_data, pdu_len):
+        """
+        :param header: values of the header fields
+        :return: memoryview of the frame (trailer included), valid until the next pack
+        """
+        start = self.header_size
+        size = start + pdu_len + self.trailer_size
+        if len(self.buffer) < size:
+            # a new buffer instead of resizing, a view of the former frame may still be alive
+            self.buffer = bytearray(max(size, len(self.buffer) * 2))
+        buffer = self.buffer
+        if pdu_len <= 0:
+            self.header.pack_into(buffer, 0, *header)
+        elif isinstance(pdu_data, bytes):
+            self._bytes_codecs[pdu_len].pack_into(buffer, 0, *header, pdu_data[:pdu_len])
+        elif isinstance(pdu_data, (bytearray, memoryview)):
+            self.header.pack_into(buffer, 0, *header)
+            memoryview(buffer)[start:start + pdu_len] = pdu_data[:pdu_len]
+        else:
+            self._u8s_codecs[pdu_len].pack_into(buffer, 0, *header, *pdu_data[:pdu_len])
+        return memoryview(buffer)[:size]
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2023, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+import struct
+from ..utils import convert
+
+_U16_BE = struct.Struct('>H')
+_U32_BE = struct.Struct('>I')
+_FP32_LE = struct.Struct('<f')
+
+
+class UxbusResponse(object):
+    """
+    Response of a uxbus command backed by the received frame, the payload is only read by the typed accessors
+    code: the state code of the response (0, XCONF.UxbusState.ERR_TOUT, ...)
+    frame: the received frame (None if nothing was received), the payload is frame[offset:offset + length]
+    The accessors take byte offsets into the payload, a payload shorter than asked for reads as zeros
+    (like the zero filled lists of recv_modbus_response).
+    """
+    __slots__ = ('code', 'frame', 'offset', 'length')
+
+    def __init__(self, code, frame=None, offset=0, length=0):
+        self.code = code
+        self.frame = frame
+        self.offset = offset
+        self.length = length
+
+    @classmethod
+    def from_list(cls, ret):
+        """wrap a response list [code, byte, byte, ...]"""
+        return cls(ret[0], bytes(ret[1:]), 0, len(ret) - 1)
+
+    def __len__(self):
+        return self.length
+
+    def __repr__(self):
+        return 'UxbusResponse(code={}, data={})'.format(self.code, self.tobytes())
+
+    @property
+    def data(self):
+        """memoryview of the payload"""
+        if self.frame is None:
+            return memoryview(b'')
+        return memoryview(self.frame)[self.offset:self.offset + self.length]
+
+    def _buffer(self, offset, size):
+        # (buffer, offset in the buffer) to unpack size bytes of the payload from
+        start = self.offset + offset
+        if self.frame is not None and offset + size <= self.length and start + size <= len(self.frame):
+            return self.frame, start
+        data = bytes(self.data[offset:offset + size])
+        return data + bytes(size - len(data)), 0
+
+    def u8(self, i):
+        if self.frame is None or i >= self.length or self.offset + i >= len(self.frame):
+            return 0
+        return self.frame[self.offset + i]
+
+    def u16(self, offset=0):
+        """big endian"""
+        return _U16_BE.unpack_from(*self._buffer(offset, 2))[0]
+
+    def u32(self, offset=0):
+        """big endian"""
+        return _U32_BE.unpack_from(*self._buffer(offset, 4))[0]
+
+    def fp32(self, offset=0):
+        """little endian"""
+        return _FP32_LE.unpack_from(*self._buffer(offset, 4))[0]
+
+    def fp32s(self, n, offset=0):
+        """little endian"""
+        return convert.fp32s_unpack_from(*self._buffer(offset, n * 4), n)
+
+    def u16s(self, n, offset=0):
+        """big endian"""
+        return convert.u16s_unpack_from(*self._buffer(offset, n * 2), n)
+
+    def i16s(self, n, offset=0):
+        """big endian"""
+        return convert.i16s_unpack_from(*self._buffer(offset, n * 2), n)
+
+    def tobytes(self):
+        frame = self.frame
+        if frame is None:
+            return b''
+        if self.offset == 0 and self.length == len(frame) and isinstance(frame, bytes):
+            return frame
+        return bytes(self.data)
+
+    def to_list(self, num):
+        """
+        The former list result of recv_modbus_response: [code, byte, byte, ...]
+        num: the expected number of bytes (-1: unknown), only used if nothing was received
+        """
+        if self.frame is None:
+            return [self.code] + [0] * (319 if num == -1 else num)
+        ret = [self.code]
+        ret.extend(self.data)
+        if len(ret) <= self.length:
+            # the frame is shorter than its length field
+            ret.extend([0] * (self.length + 1 - len(ret)))
+        return ret
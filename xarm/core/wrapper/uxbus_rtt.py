@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2023, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+from ..config.x_config import XCONF
+
+R = XCONF.UxbusReg
+
+# commands whose reply waits for a computation, the joints/end-effector bus or the flash of the controller,
+# they always use the fixed timeouts (or their own explicit timeout)
+SLOW_FUNCODES = frozenset([
+    R.SYSTEM_CONTROL, R.MOTION_EN, R.RELOAD_DYNAMICS, R.SAVE_CONF,
+    R.GET_IK, R.GET_FK, R.IS_JOINT_LIMIT, R.IS_TCP_LIMIT,
+    R.SET_TRAJ_RECORD, R.SAVE_TRAJ, R.LOAD_TRAJ, R.PLAY_TRAJ, R.GET_TRAJ_RW_STATUS,
+    R.GET_DH, R.SET_DH,
+    R.CALI_TCP_POSE, R.CALI_TCP_ORIENT, R.CALI_WRLD_ORIENT, R.CALI_WRLD_POSE,
+    R.IDEN_FRIC, R.IDEN_LOAD,
+    R.SERVO_W16B, R.SERVO_R16B, R.SERVO_W32B, R.SERVO_R32B, R.SERVO_ZERO, R.SERVO_DBMSG, R.SERVO_ERROR,
+    R.TGPIO_MB_TIOUT, R.TGPIO_MODBUS, R.TGPIO_ERR, R.TGPIO_W16B, R.TGPIO_R16B, R.TGPIO_W32B, R.TGPIO_R32B,
+    R.TGPIO_COM_TIOUT, R.TGPIO_COM_DATA,
+    R.FTSENSOR_ENABLE, R.FTSENSOR_CALI_LOAD_OFFSET, R.FTSENSOR_SET_ZERO,
+])
+
+
+class RttEstimator(object):
+    """
+    Round trip time of each function code: smoothed mean and mean deviation (Jacobson/Karels, like the TCP RTO)
+        srtt += (rtt - srtt) / 8
+        rttvar += (|rtt - srtt| - rttvar) / 4
+        timeout = srtt + 4 * rttvar, doubled after every timeout of the function code until the next reply,
+                  clamped to [min_timeout, the fixed timeout of the command (or max_timeout if smaller)]
+    A function code without any reply yet uses the fixed timeout.
+
+    :param min_timeout: floor of the timeouts (seconds)
+    :param max_timeout: ceiling of the timeouts (seconds), default is None (the fixed timeouts)
+    """
+    ALPHA = 0.125
+    BETA = 0.25
+    K = 4
+    MAX_BACKOFF = 64
+
+    def __init__(self, min_timeout=0.05, max_timeout=None):
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self._srtt = {}
+        self._rttvar = {}
+        self._backoff = {}
+
+    def sample(self, funcode, rtt):
+        srtt = self._srtt.get(funcode)
+        if srtt is None:
+            self._srtt[funcode] = rtt
+            self._rttvar[funcode] = rtt / 2
+        else:
+            self._rttvar[funcode] += (abs(rtt - srtt) - self._rttvar[funcode]) * self.BETA
+            self._srtt[funcode] = srtt + (rtt - srtt) * self.ALPHA
+        self._backoff.pop(funcode, None)
+
+    def on_timeout(self, funcode):
+        if funcode in self._srtt:
+            self._backoff[funcode] = min(self._backoff.get(funcode, 1) * 2, self.MAX_BACKOFF)
+
+    def timeout(self, funcode, default):
+        srtt = self._srtt.get(funcode)
+        if srtt is None:
+            return default
+        ceiling = default if self.max_timeout is None else min(default, self.max_timeout)
+        timeout = (srtt + self.K * self._rttvar[funcode]) * self._backoff.get(funcode, 1)
+        return min(max(timeout, self.min_timeout), ceiling)
+
+    def stats(self):
+        """{funcode: (srtt, rttvar, backoff)}, seconds"""
+        return {funcode: (srtt, self._rttvar[funcode], self._backoff.get(funcode, 1))
+                for funcode, srtt in list(self._srtt.items())}
+
+    def reset(self):
+        self._srtt.clear()
+        self._rttvar.clear()
+        self._backoff.clear()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2023, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+import threading
+from bisect import bisect_left
+from ..config.x_config import XCONF
+
+# upper bounds (seconds) of the latency buckets, the last bucket counts the larger values
+LATENCY_BOUNDS = (0.0001, 0.0002, 0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0)
+
+
+class LatencyHistogram(object):
+    __slots__ = ('counts', 'total', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BOUNDS) + 1)
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        self.counts[bisect_left(LATENCY_BOUNDS, value)] += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def to_dict(self):
+        count = sum(self.counts)
+        return {
+            'count': count,
+            'mean': self.total / count if count else 0.0,
+            'max': self.max,
+            'buckets': list(zip(LATENCY_BOUNDS + (None,), self.counts)),
+        }
+
+
+class FuncodeStats(object):
+    __slots__ = ('calls', 'tx_bytes', 'rx_bytes', 'timeouts', 'errors', 'warns', 'failures',
+                 'lock_wait', 'send', 'reply')
+
+    def __init__(self):
+        self.calls = 0
+        self.tx_bytes = 0
+        self.rx_bytes = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.warns = 0
+        self.failures = 0
+        self.lock_wait = LatencyHistogram()
+        self.send = LatencyHistogram()
+        self.reply = LatencyHistogram()
+
+    def to_dict(self):
+        return {
+            'calls': self.calls,
+            'tx_bytes': self.tx_bytes,
+            'rx_bytes': self.rx_bytes,
+            'timeouts': self.timeouts,
+            'errors': self.errors,
+            'warns': self.warns,
+            'failures': self.failures,
+            'lock_wait': self.lock_wait.to_dict(),
+            'send': self.send.to_dict(),
+            'reply': self.reply.to_dict(),
+        }
+
+
+class CommStats(object):
+    """
+    Counters of the command layer per function code (the register of the private protocol,
+    ('modbus', function code) for the standard Modbus TCP requests)
+        calls/tx_bytes: requests written and their frame bytes
+        rx_bytes: bytes of the replies
+        timeouts/errors/warns/failures: replies with ERR_TOUT/ERR_CODE/WAR_CODE/any other non-zero state
+        lock_wait/send/reply: latency histograms of waiting for the command lock, writing the frame and
+            waiting for the reply (seconds, see LATENCY_BOUNDS)
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._funcodes = {}
+
+    def _get(self, funcode):
+        stats = self._funcodes.get(funcode)
+        if stats is None:
+            stats = self._funcodes[funcode] = FuncodeStats()
+        return stats
+
+    def on_send(self, funcode, nbytes, lock_wait, elapsed):
+        with self._lock:
+            stats = self._get(funcode)
+            stats.calls += 1
+            stats.tx_bytes += nbytes
+            stats.lock_wait.add(lock_wait)
+            stats.send.add(elapsed)
+
+    def on_reply(self, funcode, code, nbytes, elapsed):
+        with self._lock:
+            stats = self._get(funcode)
+            stats.rx_bytes += nbytes
+            stats.reply.add(elapsed)
+            if code == 0:
+                return
+            if code == XCONF.UxbusState.ERR_TOUT:
+                stats.timeouts += 1
+            elif code == XCONF.UxbusState.ERR_CODE:
+                stats.errors += 1
+            elif code == XCONF.UxbusState.WAR_CODE:
+                stats.warns += 1
+            else:
+                stats.failures += 1
+
+    def snapshot(self):
+        """{funcode: {'calls': .., 'tx_bytes': .., ..., 'reply': {'count', 'mean', 'max', 'buckets'}}}"""
+        with self._lock:
+            return {funcode: stats.to_dict() for funcode, stats in self._funcodes.items()}
+
+    def reset(self):
+        with self._lock:
+            self._funcodes.clear()
@@ -7,9 +7,28 @@
 # Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
 
 import math
+import contextlib
 from ..x3 import XArm, Studio
 
 
+class _BatchCalls(object):
+    """Calls queued by XArmAPI.batch, results is filled when the batch exits"""
+    def __init__(self, api):
+        self._api = api
+        self.calls = []
+        self.results = None
+
+    def __getattr__(self, name):
+        method = getattr(self._api, name)
+        if not callable(method):
+            raise AttributeError(name)
+
+        def queue(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+            return len(self.calls) - 1
+        return queue
+
+
 class XArmAPI(object):
     def __init__(self, port=None, is_radian=False, do_not_open=False, **kwargs):
         """
@@ -80,6 +99,57 @@ class XArmAPI(object):
                 Note: only available in the param `check_cmdnum_limit` is True
             check_is_ready: check if the arm is ready to move or not, default is True
                 Note: only available if firmware_version < 1.5.20
+            enable_pipeline: allow several commands in flight on the control socket, default is False
+                Note: replies are matched by transaction id, commands called from different threads
+                    no longer wait for each other's reply (e.g. get_position + get_servo_angle + get_state in about one round trip)
+            reactor: a shared xarm.core.comm.SocketReactor, default is None
+                Note: if set, the main/report sockets of this instance are received by the reactor thread instead of
+                    their own recv and heartbeat threads, one reactor can serve many instances
+            auto_reconnect: reconnect automatically when the control connection drops, default is False
+                Note: only available for the socket connection with enable_report is True
+                Note: the registered callbacks are kept, wait_move keeps waiting during the reconnection,
+                    the other interfaces return the not connected code until the connection is back
+            reconnect_interval: the first retry interval (seconds) of auto_reconnect, doubled after every failure, default is 0.1
+            reconnect_max_interval: the max retry interval (seconds) of auto_reconnect, default is 5
+            reconnect_timeout: give up and disconnect if not reconnected in this time (seconds), default is None (retry until disconnect)
+            capture: record the raw bytes sent and received on every port to a capture file, default is None
+                Note: the path of the capture file (appended to) or a xarm.core.comm.WireRecorder
+                Note: replay a capture offline with xarm.core.comm.ReplayPort
+            adaptive_timeout: derive the timeouts of the short commands from their measured round trip times, default is False
+                Note: per command, smoothed round trip + 4 * its mean deviation, so a dead link is noticed in tens of
+                    milliseconds instead of the fixed timeout (set_timeout), which stays the upper limit
+                Note: the slow commands (inverse kinematics, identification, trajectory file, servo/end-effector
+                    register access, ...) and the commands with their own timeout keep the fixed timeouts
+            adaptive_timeout_min: the lower limit (seconds) of the adaptive timeouts, default is 0.05
+            adaptive_timeout_max: the upper limit (seconds) of the adaptive timeouts, default is None (the fixed timeouts)
+            report_getters: get_position/get_servo_angle/get_state/get_cmdnum/get_err_warn_code return the values
+                of the report instead of a request when the report is fresh, default is False
+                Note: only available with enable_report is True, get_err_warn_code needs the normal/rich report
+                Note: fresh means younger than report_max_age and received after the last reply of the
+                    control connection, otherwise the request is sent as usual
+            report_max_age: the staleness bound (seconds) of report_getters, default is 0.2
+            getter_cache: cache the results of the static getters, default is False
+                Note: get_version/get_robot_sn/get_hd_types/get_servo_version/get_harmonic_type until reconnected,
+                    get_dh_params for 60s (or until set_dh_params), get_tgpio_version/get_gripper_version for 10s
+                    (failures for 1s, or until an end effector communication error)
+            comm_stats: count the requests, bytes, failed replies and the lock/send/reply latencies per function code,
+                see get_comm_stats, default is False
+            lazy_report: decode the motion limits, realtime speeds, collision params, voltages/currents, cgpio states,
+                ft sensor forces and reduced tcp boundary of the rich report only when they are read (once per report),
+                default is True
+                Note: the state/error/cmdnum/temperature/count changes are still detected on every report
+            report_history: number of reports kept in the telemetry history (see the property report_history),
+                default is 0 (disabled)
+                Note: needs numpy, uses 880 bytes per report (every row is stored twice)
+            telemetry: record the angles/position/joints_torque of every report to telemetry files, default is None
+                Note: the directory of the files or a xarm.x3.telemetry.TelemetryRecorder (other fields, rotation)
+                Note: written by a background thread, rotated every 64MB or hour by default
+                Note: read them with xarm.x3.telemetry.TelemetryReader (needs numpy)
+            report_share: publish the state of every report to a shared memory block for the other processes of the host,
+                default is None
+                Note: the name of the block (removed on disconnect) or a xarm.x3.report_share.ReportPublisher
+                Note: read it with xarm.x3.report_share.ReportSubscriber(name).latest()/history(count), no connection
+                    to the controller and no lock (seqlock), needs python 3.8+
         """
         self._is_radian = is_radian
         self._arm = XArm(port=port,
@@ -670,6 +740,20 @@ class XArmAPI(object):
         """
         return self._arm.ft_raw_force
 
+    @property
+    def report_history(self):
+        """
+        The telemetry history of the last reports (ReportHistory), None if the param report_history of XArmAPI is 0
+        Fields (radians, mm, host time.monotonic): time, angles, position, joints_torque, realtime_joint_speeds,
+            realtime_tcp_speed, currents, temperatures, ft_ext_force, ft_raw_force
+        Usage:
+            history.window('angles', last=2.0)  # numpy view (rows, 7) of the reports of the last 2 seconds
+            history.windows(['time', 'currents'], count=100)  # {name: view} of the last 100 reports
+        Note: the views are not copied, a view of n rows is overwritten once report_history + 1 - n newer reports
+            arrived (the next report for a view of all the rows), copy it to keep it
+        """
+        return self._arm.report_history
+
     def connect(self, port=None, baudrate=None, timeout=None, axis=None, **kwargs):
         """
         Connect to xArm
@@ -1792,6 +1876,8 @@ class XArmAPI(object):
         Emergency stop (set_state(4) -> motion_enable(True) -> set_state(0))
         Note:
             1. This interface does not automatically clear the error. If there is an error, you need to handle it according to the error code.
+            2. The stop is sent on a priority lane (socket connection only), it is not blocked by a command
+                that another thread is waiting on (such as iden_load)
         """
         return self._arm.emergency_stop()
 
@@ -2112,6 +2198,7 @@ class XArmAPI(object):
             {
                 "connected": connected,
                 "reported": reported,
+                "reconnect_duration": seconds, only present in the callback after an automatic reconnect
             }
         :return: True/False
         """
@@ -2605,7 +2692,94 @@ class XArmAPI(object):
         :param timeout: seconds
         """
         return self._arm.set_timeout(timeout)
-    
+
+    def get_cache_stats(self):
+        """
+        Get the hit/miss counters of the getter cache (see the param getter_cache of XArmAPI)
+
+        :return: {'hits': int, 'misses': int, 'entries': int}
+        """
+        return self._arm.get_cache_stats()
+
+    def clear_cache(self):
+        """
+        Drop the cached getter results and reset the counters of the getter cache
+
+        :return: code
+            code: See the [API Code Documentation](./xarm_api_code.md#api-code) for details.
+        """
+        return self._arm.clear_cache()
+
+    def get_comm_stats(self):
+        """
+        Get the communication counters of the command layer per function code (see the param comm_stats of XArmAPI)
+        Note: the keys are the register of the private protocol, ('modbus', function code) for the standard Modbus TCP
+
+        :return: {funcode: stats}, empty if comm_stats is False
+            stats: {
+                'calls': requests sent, 'tx_bytes': int, 'rx_bytes': int,
+                'timeouts': int, 'errors': replies with error, 'warns': replies with warning, 'failures': other failures,
+                'lock_wait'/'send'/'reply': {'count': int, 'mean': seconds, 'max': seconds,
+                    'buckets': [(upper bound in seconds or None, count), ...]}
+            }
+        """
+        return self._arm.get_comm_stats()
+
+    def reset_comm_stats(self):
+        """
+        Reset the communication counters of the command layer
+
+        :return: code
+            code: See the [API Code Documentation](./xarm_api_code.md#api-code) for details.
+        """
+        return self._arm.reset_comm_stats()
+
+    def submit_many(self, calls):
+        """
+        Run several interfaces with their requests sent in a single write (consecutive transaction ids)
+        and their replies collected together, each result is checked like the interface was called alone
+        Note: only the command request of each interface is batched (the first one of the get_* interfaces), the
+            getters it makes before (e.g. a version check) are sent as usual, the rest of it (following requests,
+            wait=True) runs as usual after the replies are collected
+        Note: the interfaces are run twice (the first run stops after their command request), the parameters left
+            to the previous move (position, speed, ...) are taken from the earlier moves of the batch assuming
+            they succeed, the interfaces must not depend on the other results of each other
+        Note: without the TCP connection the interfaces are called one after the other
+
+        :param calls: list of calls, each is (name, args, kwargs), (name, args), (name,) or a callable
+            such as [('set_cgpio_digital', (0, 1)), ('set_position', (), {'x': 300, 'radius': 10})]
+        :return: the results of the calls, in order
+        """
+        funcs = []
+        getters = []
+        for call in calls:
+            if callable(call):
+                funcs.append(call)
+                getters.append(False)
+                continue
+            method = getattr(self, call[0])
+            args = call[1] if len(call) > 1 else ()
+            kwargs = call[2] if len(call) > 2 else {}
+            funcs.append(lambda method=method, args=args, kwargs=kwargs: method(*args, **kwargs))
+            getters.append(call[0].startswith('get_'))
+        return self._arm.run_batch(funcs, getters)
+
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        Queue interface calls and submit them with submit_many when the block exits
+        Example:
+            with arm.batch() as b:
+                for i in range(8):
+                    b.set_cgpio_digital(i, 1)
+            print(b.results)
+
+        :return: the queue, its calls return their index in results
+        """
+        calls = _BatchCalls(self)
+        yield calls
+        calls.results = self.submit_many(calls.calls)
+
     def set_baud_checkset_enable(self, enable):
         """
         Enable auto checkset the baudrate of the end IO board or not
@@ -3956,6 +4130,25 @@ class XArmAPI(object):
         """
         return self._arm.write_and_read_holding_registers(r_addr, r_quantity, w_addr, w_regs, is_signed)
 
+    def create_modbus_poller(self, max_gap=8):
+        """
+        ([Standard Modbus TCP](../UF_ModbusTCP_Manual.md)) Create a poller of register groups
+        The groups due at the same time are read with the fewest requests (adjacent or overlapping ranges of the same
+        function code are merged), the values are kept in a snapshot and the change callbacks are called from the
+        thread of the poller.
+        Example:
+            poller = arm.create_modbus_poller()
+            poller.add_group('inputs', 0x02, 0, 16, interval=0.02, callback=lambda name, values: print(name, values))
+            poller.add_group('regs', 0x03, 0x10, 4, interval=0.1, is_signed=True)
+            poller.start()
+            print(poller.snapshot())  # {'inputs': (0, 1, ...), 'regs': (...)}
+            poller.stop()
+
+        :param max_gap: the largest number of unused addresses read to merge two ranges, default is 8
+        :return: ModbusPoller (add_group/remove_group/start/stop/poll/snapshot/get/register_change_callback)
+        """
+        return self._arm.create_modbus_poller(max_gap=max_gap)
+
     def send_hex_cmd(self, datas, **kwargs):
         """
         Hexadecimal communication protocol instruction
@@ -0,0 +1,493 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2023, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+import re
+import time
+import asyncio
+from collections.abc import Iterable
+from ..core.config.x_config import XCONF
+from ..core.comm import AsyncSocketPort
+from ..core.wrapper import AsyncUxbusCmdTcp
+from ..core.utils.log import logger
+from ..x3 import XArm
+from ..x3.code import APIState
+from ..x3.motion import MoveWaiter
+
+
+class AsyncXArmAPI(object):
+    def __init__(self, port=None, is_radian=False, **kwargs):
+        """
+        The asyncio API wrapper of xArm, all the communication runs on the event loop of the caller (no threads)
+        Usage:
+            arm = AsyncXArmAPI('192.168.1.185')
+            await arm.connect()
+            code, pos = await arm.get_position()
+            await arm.set_position(x=300, wait=True)
+
+        Note: only the socket connection is supported
+        Note: the state (position/angles/mode/error_code/...), the parameter handling and the request/result
+            handling of the motions are shared with XArmAPI, the read-only properties of XArmAPI and the
+            register_xxx_callback/release_xxx_callback methods are available on this object as well
+        Note: only the interfaces defined in this class are awaitable, use XArmAPI for the others:
+            connect/disconnect, get_version, get_state/set_state, set_mode, get_cmdnum, get_err_warn_code,
+            clean_error/clean_warn, motion_enable, get_position/get_servo_angle, is_tcp_limit/is_joint_limit,
+            set_position/set_servo_angle, emergency_stop, wait_move
+            the other methods of XArmAPI are not attributes of this object (AttributeError)
+
+        :param port: ip-address(such as '192.168.1.185')
+        :param is_radian: set the default unit is radians or not, default is False
+        :param kwargs: keyword parameters, see XArmAPI
+        """
+        self._arm = XArm(port=port, is_radian=is_radian, do_not_open=True, instance=self, **kwargs)
+
+    def __getattr__(self, item):
+        if item.startswith('register_') or item.startswith('release_'):
+            return getattr(self._arm, item)
+        if isinstance(getattr(XArm, item, None), property):
+            return getattr(self._arm, item)
+        raise AttributeError("'{}' object has no attribute '{}'".format(self.__class__.__name__, item))
+
+    @property
+    def arm(self):
+        return self._arm
+
+    async def connect(self, port=None):
+        """
+        Connect to xArm
+
+        :param port: the ip address, default is the value when initializing an instance
+        """
+        arm = self._arm
+        if arm.connected:
+            return
+        arm._is_ready = True
+        arm._port = port if port is not None else arm._port
+        if not arm._port or not isinstance(arm._port, str) or (arm._port != 'localhost' and not re.match(
+                r"^(?:(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\.){3}(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)$",
+                arm._port)):
+            raise Exception('can not connect to port/ip {}'.format(arm._port))
+        arm._is_first_report = True
+        arm._first_report_over = False
+        arm._init()
+        stream = AsyncSocketPort(arm._port, XCONF.SocketConf.TCP_CONTROL_PORT,
+                                 heartbeat=arm._enable_heartbeat,
+                                 buffer_size=XCONF.SocketConf.TCP_CONTROL_BUF_SIZE,
+                                 forbid_uds=arm._forbid_uds, fb_callback=arm._feedback_callback)
+        if await stream.connect() != 0:
+            raise Exception('connect socket failed')
+        arm._stream = stream
+        arm._report_error_warn_changed_callback()
+        arm.arm_cmd = AsyncUxbusCmdTcp(stream, set_feedback_key_tranid=arm._set_feedback_key_tranid, rtt=arm._rtt,
+                                       stats=arm._comm_stats)
+        arm.arm_cmd.set_protocol_identifier(2)
+        arm._stream_type = 'socket'
+
+        arm._stream_report = None
+        if arm._enable_report:
+            if arm._report_type == 'real':
+                report_port = XCONF.SocketConf.TCP_REPORT_REAL_PORT
+            elif arm._report_type == 'normal':
+                report_port = XCONF.SocketConf.TCP_REPORT_NORM_PORT
+            else:
+                report_port = XCONF.SocketConf.TCP_REPORT_RICH_PORT
+            stream_report = AsyncSocketPort(arm._port, report_port, forbid_uds=arm._forbid_uds,
+                                            report_callback=arm._handle_report_data)
+            if await stream_report.connect() == 0:
+                arm._stream_report = stream_report
+
+        arm._version = None
+        fail_cnt = 0
+        while not arm._version and fail_cnt < 100:
+            code, _ = await self.get_version()
+            fail_cnt += 1 if code != 0 else 0
+            if code != 0 or not arm._version:
+                await asyncio.sleep(0.1)
+        if not arm._version or arm._check_version() < 0:
+            logger.error('failed to get version')
+            self.disconnect()
+            raise Exception('failed to check version, close')
+        arm._support_feedback = arm.version_is_ge(2, 0, 102)
+        arm.arm_cmd.set_debug(arm._debug)
+        arm._report_connect_changed_callback()
+
+    def disconnect(self):
+        """
+        Disconnect
+        """
+        arm = self._arm
+        for stream in [arm._stream, arm._stream_report]:
+            if stream:
+                stream.close()
+        arm._is_ready = False
+        arm._report_connect_changed_callback(False, False)
+
+    async def get_version(self):
+        """
+        Get the xArm firmware version
+
+        :return: tuple((code, version)), only when code is 0, the returned result is correct.
+        """
+        if not self.connected:
+            return APIState.NOT_CONNECTED, 'xArm is not connect'
+        ret = await self._arm.arm_cmd.get_version()
+        return self._arm._handle_get_version_result(ret)
+
+    async def get_state(self):
+        """
+        Get state
+
+        :return: tuple((code, state)), only when code is 0, the returned result is correct.
+        """
+        if not self.connected:
+            return APIState.NOT_CONNECTED, 'xArm is not connect'
+        ret = await self._arm.arm_cmd.get_state()
+        return self._arm._handle_get_state_result(ret)
+
+    async def set_state(self, state=0):
+        """
+        Set the xArm state
+
+        :param state: default is 0
+            0: sport state
+            3: pause state
+            4: stop state
+        :return: code
+        """
+        if not self.connected:
+            return APIState.NOT_CONNECTED
+        arm = self._arm
+        prev_state = arm._state
+        ret = await arm.arm_cmd.set_state(state)
+        arm._handle_set_state_code(ret, state)
+        await self.get_state()
+        return arm._handle_set_state_result(ret, state, prev_state)
+
+    async def set_mode(self, mode=0, detection_param=0):
+        """
+        Set the xArm mode, see XArmAPI.set_mode
+
+        :return: code
+        """
+        if not self.connected:
+            return APIState.NOT_CONNECTED
+        arm = self._arm
+        if arm.version_is_ge(1, 10, 0):
+            detection_param = detection_param if detection_param >= 0 else 0
+        else:
+            detection_param = -1
+        ret = await arm.arm_cmd.set_mode(mode, detection_param=detection_param)
+        ret[0] = arm._check_code(ret[0])
+        arm.log_api_info('API -> set_mode({}) -> code={}'.format(mode, ret[0]), code=ret[0])
+        return ret[0]
+
+    async def get_cmdnum(self):
+        """
+        Get the cmd count in cache
+
+        :return: tuple((code, cmd num)), only when code is 0, the returned result is correct.
+        """
+        if not self.connected:
+            return APIState.NOT_CONNECTED, 'xArm is not connect'
+        ret = await self._arm.arm_cmd.get_cmdnum()
+        return self._arm._handle_get_cmdnum_result(ret)
+
+    async def get_err_warn_code(self, show=False, lang='en'):
+        """
+        Get the controller error and warn code
+
+        :return: tuple((code, [error_code, warn_code])), only when code is 0, the returned result is correct.
+        """
+        if not self.connected:
+            return APIState.NOT_CONNECTED, 'xArm is not connect'
+        ret = await self._arm.arm_cmd.get_err_code()
+        return self._arm._handle_get_err_warn_code_result(ret, show=show, lang=lang)
+
+    async def clean_error(self):
+        """
+        Clean the error, need to be manually enabled motion(arm.motion_enable(True)) and set state(arm.set_state(state=0))after clean error
+
+        :return: code
+        """
+        if not self.connected:
+            return APIState.NOT_CONNECTED
+        arm = self._arm
+        ret = await arm.arm_cmd.clean_err()
+        await self.get_state()
+        arm._update_is_ready('clean_error')
+        arm.log_api_info('API -> clean_error -> code={}'.format(ret[0]), code=ret[0])
+        return ret[0]
+
+    async def clean_warn(self):
+        """
+        Clean the warn
+
+        :return: code
+        """
+        if not self.connected:
+            return APIState.NOT_CONNECTED
+        ret = await self._arm.arm_cmd.clean_war()
+        self._arm.log_api_info('API -> clean_warn -> code={}'.format(ret[0]), code=ret[0])
+        return ret[0]
+
+    async def motion_enable(self, enable=True, servo_id=None):
+        """
+        Motion enable
+
+        :param enable:True/False
+        :param servo_id: 1-(Number of axes), None(8)
+        :return: code
+        """
+        assert servo_id is None or (isinstance(servo_id, int) and 1 <= servo_id <= 8)
+        if not self.connected:
+            return APIState.NOT_CONNECTED
+        arm = self._arm
+        if arm.check_is_simulation_robot():
+            return 0
+        if servo_id is None or servo_id == 8:
+            ret = await arm.arm_cmd.motion_en(8, int(enable))
+        else:
+            ret = await arm.arm_cmd.motion_en(servo_id, int(enable))
+        ret[0] = arm._check_code(ret[0])
+        if ret[0] == 0:
+            arm._is_ready = bool(enable)
+        await self.get_state()
+        arm._update_is_ready('motion_enable')
+        arm.log_api_info('API -> motion_enable -> code={}'.format(ret[0]), code=ret[0])
+        return ret[0]
+
+    async def get_position(self, is_radian=None):
+        """
+        Get the cartesian position
+
+        :return: tuple((code, [x, y, z, roll, pitch, yaw])), only when code is 0, the returned result is correct.
+        """
+        if not self.connected:
+            return APIState.NOT_CONNECTED, 'xArm is not connect'
+        ret = await self._arm.arm_cmd.get_tcp_pose()
+        return self._arm._handle_get_position_result(ret, is_radian)
+
+    async def get_servo_angle(self, servo_id=None, is_radian=None, is_real=False):
+        """
+        Get the servo angle
+
+        :return: tuple((code, angle list if servo_id is None or 8 else angle)), only when code is 0, the returned result is correct.
+        """
+        if not self.connected:
+            return APIState.NOT_CONNECTED, 'xArm is not connect'
+        arm = self._arm
+        if is_real and arm.version_is_ge(1, 9, 110):
+            ret = await arm.arm_cmd.get_joint_states(num=1)
+        else:
+            ret = await arm.arm_cmd.get_joint_pos()
+        return arm._handle_get_servo_angle_result(ret, servo_id, is_radian)
+
+    async def is_tcp_limit(self, pose, is_radian=None):
+        """
+        Check the tcp pose is in limit, see XArmAPI.is_tcp_limit
+
+        :return: tuple((code, limit)), only when code is 0, the returned result is correct.
+        """
+        if not self.connected:
+            return APIState.NOT_CONNECTED, 'xArm is not connect'
+        arm = self._arm
+        ret = await arm.arm_cmd.is_tcp_limit(arm._get_limit_pose(pose, is_radian))
+        return arm._handle_is_limit_result('is_tcp_limit', ret)
+
+    async def is_joint_limit(self, joint, is_radian=None):
+        """
+        Check the joint angle is in limit, see XArmAPI.is_joint_limit
+
+        :return: tuple((code, limit)), only when code is 0, the returned result is correct.
+        """
+        if not self.connected:
+            return APIState.NOT_CONNECTED, 'xArm is not connect'
+        arm = self._arm
+        ret = await arm.arm_cmd.is_joint_limit(arm._get_limit_joints(joint, is_radian))
+        return arm._handle_is_limit_result('is_joint_limit', ret)
+
+    async def _sync(self):
+        arm = self._arm
+        if not arm._stream_report or not arm._stream_report.connected:
+            await self.get_position()
+            await self.get_servo_angle()
+        arm._sync()
+
+    async def _wait_ready_to_move(self, **kwargs):
+        # the decorators of the motion methods of XArm (xarm_wait_until_not_pause, xarm_wait_until_cmdnum_lt_max,
+        # xarm_is_ready), polled on the event loop
+        arm = self._arm
+        while arm._need_wait_pause():
+            await asyncio.sleep(0.05)
+        while arm._need_wait_cmdnum():
+            if arm._cmdnum_is_stale():
+                await self.get_cmdnum()
+            await asyncio.sleep(0.05)
+        if self.connected and kwargs.get('auto_enable', False) and not arm.ready:
+            await self.motion_enable(enable=True)
+            await self.set_mode(0)
+            await self.set_state(0)
+        if not self.connected:
+            logger.error('xArm is not connected')
+            return APIState.NOT_CONNECTED
+        if not arm.check_xarm_is_ready:
+            logger.error('xArm is not ready')
+            logger.info('Please check the arm for errors. If so, please clear the error first. '
+                        'Then enable the motor, set the mode and set the state')
+            return APIState.NOT_READY
+        return 0
+
+    async def _wait_sync(self):
+        arm = self._arm
+        while not arm._is_sync or arm._need_sync:
+            if not self.connected:
+                return APIState.NOT_CONNECTED
+            if arm.has_error:
+                _, err_warn = await self.get_err_warn_code()
+                if err_warn[0] != 0:
+                    return APIState.HAS_ERROR
+            if arm.is_stop:
+                _, state = await self.get_state()
+                if state >= 4:
+                    return APIState.NOT_READY
+            await asyncio.sleep(0.05)
+        return 0
+
+    async def _run_motion(self, motion):
+        # XArm._run_motion on the event loop
+        arm = self._arm
+        if motion.check:
+            if motion.is_joint:
+                _, limit = await self.is_joint_limit(motion.target, True)
+                if _ == 0 and limit is True:
+                    return APIState.JOINT_LIMIT
+            else:
+                _, limit = await self.is_tcp_limit(motion.target, True)
+                if _ == 0 and limit is True:
+                    return APIState.TCP_LIMIT
+        ret = await arm._start_motion(motion)
+        code = arm._handle_motion_result(motion, ret)
+        if motion.only_check_type > 0:
+            return code
+        if motion.wait and code == 0:
+            code = await self.wait_move(motion.timeout, trans_id=motion.trans_id)
+            arm._update_motion_params(motion)
+            await self._sync()
+            return code
+        if code >= 0 or (await self.get_state())[1] == 1:
+            arm._update_motion_params(motion, update_target=True)
+        return code
+
+    async def set_position(self, x=None, y=None, z=None, roll=None, pitch=None, yaw=None, radius=None,
+                           speed=None, mvacc=None, mvtime=None, relative=False, is_radian=None,
+                           wait=False, timeout=None, **kwargs):
+        """
+        Set the cartesian position, the API will modify self.last_used_position value, see XArmAPI.set_position
+
+        :return: code
+        """
+        code = await self._wait_ready_to_move(**kwargs)
+        if code != 0:
+            return code
+        arm = self._arm
+        only_check_type = kwargs.get('only_check_type', arm._only_check_type)
+        if only_check_type > 0 and wait:
+            code = await self.wait_move(timeout=timeout)
+            if code != 0:
+                return code
+        code = await self._wait_sync()
+        if code != 0:
+            return code
+        code, motion = arm._prepare_position(x=x, y=y, z=z, roll=roll, pitch=pitch, yaw=yaw, radius=radius,
+                                             speed=speed, mvacc=mvacc, mvtime=mvtime, relative=relative,
+                                             is_radian=is_radian, wait=wait, timeout=timeout, **kwargs)
+        if code != 0:
+            return code
+        return await self._run_motion(motion)
+
+    async def set_servo_angle(self, servo_id=None, angle=None, speed=None, mvacc=None, mvtime=None,
+                              relative=False, is_radian=None, wait=False, timeout=None, radius=None, **kwargs):
+        """
+        Set the servo angle, the API will modify self.last_used_angles value, see XArmAPI.set_servo_angle
+
+        :return: code
+        """
+        assert ((servo_id is None or servo_id == 8) and isinstance(angle, Iterable)) \
+            or (1 <= servo_id <= 7 and angle is not None and not isinstance(angle, Iterable)), \
+            'param servo_id or angle error'
+        code = await self._wait_ready_to_move(**kwargs)
+        if code != 0:
+            return code
+        arm = self._arm
+        if servo_id is not None and servo_id != 8:
+            if servo_id > arm.axis or servo_id <= 0:
+                return APIState.SERVO_NOT_EXIST
+            angles = [None] * 7
+            angles[servo_id - 1] = angle
+        else:
+            angles = angle
+        only_check_type = kwargs.get('only_check_type', arm._only_check_type)
+        if only_check_type > 0 and wait:
+            code = await self.wait_move(timeout=timeout)
+            if code != 0:
+                return code
+        code = await self._wait_sync()
+        if code != 0:
+            return code
+        code, motion = arm._prepare_servo_angle(angles, speed=speed, mvacc=mvacc, mvtime=mvtime, relative=relative,
+                                                is_radian=is_radian, wait=wait, timeout=timeout, radius=radius,
+                                                **kwargs)
+        if code != 0:
+            return code
+        return await self._run_motion(motion)
+
+    async def _set_state_priority(self, state):
+        # set_state on the priority lane of arm_cmd, see XArm._set_state_priority
+        if not self.connected:
+            return APIState.NOT_CONNECTED
+        arm = self._arm
+        prev_state = arm._state
+        ret = await arm.arm_cmd.set_state_priority(state)
+        arm._handle_set_state_code(ret, state)
+        arm._handle_get_state_result(await arm.arm_cmd.get_state_priority())
+        return arm._handle_set_state_result(ret, state, prev_state)
+
+    async def emergency_stop(self):
+        """
+        Emergency stop (set_state(4) -> motion_enable(True) -> set_state(0))
+        """
+        arm = self._arm
+        logger.info('emergency_stop--begin')
+        await self._set_state_priority(4)
+        expired = time.monotonic() + 3
+        while arm.state not in [4] and time.monotonic() < expired:
+            await self._set_state_priority(4)
+            await asyncio.sleep(0.1)
+        arm._sleep_finish_time = 0
+        await self._sync()
+        logger.info('emergency_stop--end')
+
+    async def wait_move(self, timeout=None, trans_id=-1):
+        """
+        Wait until the motion finish or the timeout
+
+        :param timeout: seconds, None means wait forever
+        :param trans_id: the transaction id of the motion command (only available if the firmware support feedback)
+        :return: code
+        """
+        arm = self._arm
+        waiter = MoveWaiter(arm, timeout, trans_id if arm._support_feedback else -1)
+        if not waiter.use_feedback:
+            waiter.start(*(await self.get_state()))
+        while waiter.alive:
+            code = waiter.check()
+            if code is None:
+                code = waiter.update(*(await self.get_state()))
+            if code is not None:
+                return code
+            await asyncio.sleep(0.05)
+        return APIState.WAIT_FINISH_TIMEOUT
@@ -12,7 +12,6 @@ import time
 import math
 import uuid
 import queue
-import struct
 import threading
 try:
     from multiprocessing.pool import ThreadPool
@@ -30,18 +29,24 @@ except:
 if not hasattr(math, 'inf'):
     setattr(math, 'inf', float('inf'))
 from .events import Events
+from .cache import GetterCache
+from .report_decoder import get_report_decoder, LazyReportView, LazyReportAttr, RICH_LAZY_GROUPS, RICH_EAGER_FIELDS
+from .report_history import ReportHistory
+from .telemetry import TelemetryRecorder
+from .report_share import ReportPublisher
+from .motion import MoveWaiter
 from ..core.config.x_config import XCONF
-from ..core.comm import SocketPort
+from ..core.comm import SocketPort, WireRecorder
 try:
     from ..core.comm import SerialPort
 except:
     SerialPort = None 
-from ..core.wrapper import UxbusCmdSer, UxbusCmdTcp
+from ..core.wrapper import UxbusCmdSer, UxbusCmdTcp, RttEstimator, BatchRecorded, CommStats
 from ..core.utils.log import logger, pretty_print
 from ..core.utils import convert
 from ..core.config.x_code import ControllerWarn, ControllerError, ControllerErrorCodeMap, ControllerWarnCodeMap
 from .utils import compare_time, compare_version, filter_invaild_number
-from .decorator import xarm_is_connected, xarm_is_ready, xarm_is_not_simulation_mode, xarm_wait_until_cmdnum_lt_max, xarm_wait_until_not_pause
+from .decorator import xarm_is_connected, xarm_is_ready, xarm_is_not_simulation_mode, xarm_wait_until_cmdnum_lt_max, xarm_wait_until_not_pause, xarm_cached
 from .code import APIState
 from ..tools.threads import ThreadManage
 from ..version import __version__
@@ -53,6 +58,35 @@ print('SDK_VERSION: {}'.format(__version__))
 
 
 class Base(BaseObject, Events):
+    # controller errors after which the cached versions of the end effector/servos are read again
+    END_EFFECTOR_RESET_ERRORS = (19, 28)
+    SERVO_RESET_ERRORS = (10, 11, 12, 13, 14, 15, 16, 17)
+
+    # set by the groups of the rich report decoded on first read (see _handle_report_rich)
+    _tcp_jerk = LazyReportAttr('motion', '_tcp_jerk')
+    _min_tcp_acc = LazyReportAttr('motion', '_min_tcp_acc')
+    _max_tcp_acc = LazyReportAttr('motion', '_max_tcp_acc')
+    _min_tcp_speed = LazyReportAttr('motion', '_min_tcp_speed')
+    _max_tcp_speed = LazyReportAttr('motion', '_max_tcp_speed')
+    _joint_jerk = LazyReportAttr('motion', '_joint_jerk')
+    _min_joint_acc = LazyReportAttr('motion', '_min_joint_acc')
+    _max_joint_acc = LazyReportAttr('motion', '_max_joint_acc')
+    _min_joint_speed = LazyReportAttr('motion', '_min_joint_speed')
+    _max_joint_speed = LazyReportAttr('motion', '_max_joint_speed')
+    _rot_jerk = LazyReportAttr('motion', '_rot_jerk')
+    _max_rot_acc = LazyReportAttr('motion', '_max_rot_acc')
+    _realtime_tcp_speed = LazyReportAttr('speeds', '_realtime_tcp_speed')
+    _realtime_joint_speeds = LazyReportAttr('speeds', '_realtime_joint_speeds')
+    _is_collision_detection = LazyReportAttr('collision', '_is_collision_detection')
+    _collision_tool_type = LazyReportAttr('collision', '_collision_tool_type')
+    _collision_tool_params = LazyReportAttr('collision', '_collision_tool_params')
+    _voltages = LazyReportAttr('power', '_voltages')
+    _currents = LazyReportAttr('power', '_currents')
+    _cgpio_states = LazyReportAttr('cgpio', '_cgpio_states')
+    _ft_ext_force = LazyReportAttr('ft', '_ft_ext_force')
+    _ft_raw_force = LazyReportAttr('ft', '_ft_raw_force')
+    _reduced_tcp_boundary = LazyReportAttr('boundary', '_reduced_tcp_boundary')
+
     def __init__(self, port=None, is_radian=False, do_not_open=False, **kwargs):
         if kwargs.get('init', False):
             super(Base, self).__init__()
@@ -65,6 +99,37 @@ class Base(BaseObject, Events):
             self._enable_report = kwargs.get('enable_report', True)
             self._report_type = kwargs.get('report_type', 'rich')
             self._forbid_uds = kwargs.get('forbid_uds', False)
+            self._enable_pipeline = kwargs.get('enable_pipeline', False)
+            self._reactor = kwargs.get('reactor', None)
+            self._auto_reconnect = kwargs.get('auto_reconnect', False)
+            self._reconnect_interval = kwargs.get('reconnect_interval', 0.1)
+            self._reconnect_max_interval = kwargs.get('reconnect_max_interval', 5)
+            self._reconnect_timeout = kwargs.get('reconnect_timeout', None)
+            self._capture = kwargs.get('capture', None)
+            self._recorder = None
+            self._adaptive_timeout = kwargs.get('adaptive_timeout', False)
+            self._adaptive_timeout_min = kwargs.get('adaptive_timeout_min', 0.05)
+            self._adaptive_timeout_max = kwargs.get('adaptive_timeout_max', None)
+            # kept across reconnections, the round trips of the new connection start from the measured ones
+            self._rtt = RttEstimator(self._adaptive_timeout_min, self._adaptive_timeout_max) if self._adaptive_timeout else None
+            self._getter_cache = GetterCache() if kwargs.get('getter_cache', False) else None
+            self._report_getters = kwargs.get('report_getters', False)
+            self._report_max_age = kwargs.get('report_max_age', 0.2)
+            # kept across reconnections like the round trips
+            self._comm_stats = CommStats() if kwargs.get('comm_stats', False) else None
+            self._lazy_report = kwargs.get('lazy_report', True)
+            self._report_history = None
+            if kwargs.get('report_history', 0):
+                try:
+                    self._report_history = ReportHistory(kwargs.get('report_history'))
+                except ImportError as e:
+                    logger.error('report_history is disabled, {}'.format(e))
+            self._telemetry = kwargs.get('telemetry', None)
+            self._telemetry_recorder = None
+            self._report_share = kwargs.get('report_share', None)
+            self._report_publisher = None
+            self._reconnect_stop = threading.Event()
+            self._reconnect_count = 0
 
             self._check_tcp_limit = kwargs.get('check_tcp_limit', False)
             self._check_joint_limit = kwargs.get('check_joint_limit', True)
@@ -189,6 +254,12 @@ class Base(BaseObject, Events):
             self._count = -1
             self._last_report_time = time.monotonic()
             self._max_report_interval = 0
+            self._report_update_time = 0
+            self._report_view = LazyReportView('rich', False, {
+                group: (names, getattr(self, '_handle_report_rich_{}'.format(group)))
+                for group, names in RICH_LAZY_GROUPS.items()
+            })
+            self._servo_codes_raw = b''
 
             self._cgpio_reset_enable = 0
             self._tgpio_reset_enable = 0
@@ -254,6 +325,8 @@ class Base(BaseObject, Events):
                 self.connect()
 
     def _init(self):
+        self._report_view.clear()
+        self._servo_codes_raw = b''
         self._last_position = [201.5, 0, 140.5, 3.1415926, 0, 0]  # [x(mm), y(mm), z(mm), roll(rad), pitch(rad), yaw(rad)]
         self._last_angles = [0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0]  # [servo_1(rad), servo_2(rad), servo_3(rad), servo_4(rad), servo_5(rad), servo_6(rad), servo_7(rad)]
         self._last_tcp_speed = 100  # mm/s, rad/s
@@ -316,6 +389,7 @@ class Base(BaseObject, Events):
         self._count = -1
         self._last_report_time = time.monotonic()
         self._max_report_interval = 0
+        self._report_update_time = 0
 
         self._cgpio_reset_enable = 0
         self._tgpio_reset_enable = 0
@@ -480,6 +554,12 @@ class Base(BaseObject, Events):
     def connected(self):
         return self._stream is not None and self._stream.connected
 
+    @property
+    def _can_reconnect(self):
+        # the control connection may come back by itself, keep the worker threads and the pending waits alive
+        return self._auto_reconnect and self._enable_report and self._stream_type == 'socket' \
+            and not self._reconnect_stop.is_set()
+
     @property
     def connected_503(self):
         return self._stream_503 is not None and self._stream_503.connected
@@ -775,6 +855,10 @@ class Base(BaseObject, Events):
     @property
     def ft_raw_force(self):
         return self._ft_raw_force
+
+    @property
+    def report_history(self):
+        return self._report_history
     
     @property
     def support_feedback(self):
@@ -788,8 +872,19 @@ class Base(BaseObject, Events):
             self._major_version_number == major and self._minor_version_number == minor and
             self._revision_version_number >= revision)
 
+    def _need_wait_pause(self):
+        # shared with AsyncXArmAPI
+        return self._check_is_pause and self.connected and self.state == 3 and self._enable_report
+
+    def _need_wait_cmdnum(self):
+        # shared with AsyncXArmAPI, get_cmdnum if _cmdnum_is_stale
+        return self._check_cmdnum_limit and self.connected and self.cmd_num >= self._max_cmd_num
+
+    def _cmdnum_is_stale(self):
+        return time.monotonic() - self._last_report_time > 0.4
+
     def wait_until_not_pause(self):
-        if self._check_is_pause and self.connected and self.state == 3 and self._enable_report:
+        if self._need_wait_pause():
             with self._pause_cond:
                 with self._pause_lock:
                     self._pause_cnts += 1
@@ -798,10 +893,8 @@ class Base(BaseObject, Events):
                     self._pause_cnts -= 1
     
     def wait_until_cmdnum_lt_max(self):
-        if not self._check_cmdnum_limit:
-            return
-        while self.connected and self.cmd_num >= self._max_cmd_num:
-            if time.monotonic() - self._last_report_time > 0.4:
+        while self._need_wait_cmdnum():
+            if self._cmdnum_is_stale():
                 self.get_cmdnum()
             time.sleep(0.05)
 
@@ -817,7 +910,7 @@ class Base(BaseObject, Events):
         self._timed_comm_t_alive = True
         cnt = 0
         last_send_time = 0
-        while self.connected and self._timed_comm_t_alive:
+        while (self.connected or self._can_reconnect) and self._timed_comm_t_alive:
             curr_time = time.monotonic()
             if not self._keep_heart:
                 time.sleep(1)
@@ -848,10 +941,12 @@ class Base(BaseObject, Events):
     
     def connect_503(self):
         self._stream_503 = SocketPort(self._port, XCONF.SocketConf.TCP_CONTROL_PORT + 1,
-            heartbeat=self._enable_heartbeat, buffer_size=XCONF.SocketConf.TCP_CONTROL_BUF_SIZE, forbid_uds=self._forbid_uds)
+            heartbeat=self._enable_heartbeat, buffer_size=XCONF.SocketConf.TCP_CONTROL_BUF_SIZE, forbid_uds=self._forbid_uds,
+            reactor=self._reactor, recorder=self._recorder)
         if not self.connected_503:
             return -1
-        self.arm_cmd_503 = UxbusCmdTcp(self._stream_503, set_feedback_key_tranid=self._set_feedback_key_tranid)
+        self.arm_cmd_503 = UxbusCmdTcp(self._stream_503, set_feedback_key_tranid=self._set_feedback_key_tranid,
+                                       stats=self._comm_stats)
         self.arm_cmd_503.set_debug(self._debug)
         return 0
 
@@ -868,6 +963,10 @@ class Base(BaseObject, Events):
         self._timeout = timeout if timeout is not None else self._timeout
         if not self._port:
             raise Exception('can not connect to port/ip {}'.format(self._port))
+        self._reconnect_stop.clear()
+        self._open_recorder()
+        if self._getter_cache is not None:
+            self._getter_cache.invalidate()
         if self._timed_comm_t is not None:
             try:
                 self._timed_comm_t_alive = False
@@ -882,9 +981,7 @@ class Base(BaseObject, Events):
             if self._port == 'localhost' or re.match(
                     r"^(?:(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\.){3}(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)$",
                     self._port):
-                self._stream = SocketPort(self._port, XCONF.SocketConf.TCP_CONTROL_PORT,
-                                          heartbeat=self._enable_heartbeat,
-                                          buffer_size=XCONF.SocketConf.TCP_CONTROL_BUF_SIZE, forbid_uds=self._forbid_uds, fb_que=self._feedback_que)
+                self._connect_main_socket()
                 if not self.connected:
                     raise Exception('connect socket failed')
 
@@ -892,8 +989,7 @@ class Base(BaseObject, Events):
                 self._feedback_thread = threading.Thread(target=self._feedback_thread_handle, daemon=True)
                 self._feedback_thread.start()
 
-                self.arm_cmd = UxbusCmdTcp(self._stream, set_feedback_key_tranid=self._set_feedback_key_tranid)
-                self.arm_cmd.set_protocol_identifier(2)
+                self._create_socket_cmd()
                 self._stream_type = 'socket'
 
                 try:
@@ -933,12 +1029,12 @@ class Base(BaseObject, Events):
             else:
                 if SerialPort is None:
                     raise Exception('serial module is not found, if you want to connect to xArm with serial, please `pip install pyserial==3.4`')
-                self._stream = SerialPort(self._port)
+                self._stream = SerialPort(self._port, recorder=self._recorder)
                 if not self.connected:
                     raise Exception('connect serail failed')
                 self._report_error_warn_changed_callback()
 
-                self.arm_cmd = UxbusCmdSer(self._stream)
+                self.arm_cmd = UxbusCmdSer(self._stream, stats=self._comm_stats)
                 self._stream_type = 'serial'
 
                 if self._max_callback_thread_count < 0 and asyncio is not None:
@@ -958,10 +1054,96 @@ class Base(BaseObject, Events):
                     self._report_connect_changed_callback(True, False)
                 self._check_version(is_first=True)
                 self.arm_cmd.set_debug(self._debug)
-            self.set_timeout(self._cmd_timeout)
-            if self._rewrite_modbus_baudrate_method:
-                setattr(self.arm_cmd, 'set_modbus_baudrate_old', self.arm_cmd.set_modbus_baudrate)
-                setattr(self.arm_cmd, 'set_modbus_baudrate', self._core_set_modbus_baudrate)
+            self._setup_arm_cmd()
+
+    def _connect_main_socket(self):
+        self._stream = SocketPort(self._port, XCONF.SocketConf.TCP_CONTROL_PORT,
+                                  heartbeat=self._enable_heartbeat,
+                                  buffer_size=XCONF.SocketConf.TCP_CONTROL_BUF_SIZE, forbid_uds=self._forbid_uds, fb_que=self._feedback_que,
+                                  reactor=self._reactor, recorder=self._recorder)
+        return self.connected
+
+    def _open_recorder(self):
+        # capture: the path of a capture file (opened on connect and closed on disconnect) or a WireRecorder
+        if isinstance(self._capture, str):
+            if self._recorder is None or self._recorder.closed:
+                self._recorder = WireRecorder(self._capture)
+        else:
+            self._recorder = self._capture
+        # telemetry: the directory of the telemetry files (recorder closed on disconnect) or a TelemetryRecorder
+        if isinstance(self._telemetry, str):
+            if self._telemetry_recorder is None or self._telemetry_recorder.closed:
+                self._telemetry_recorder = TelemetryRecorder(self._telemetry)
+        else:
+            self._telemetry_recorder = self._telemetry
+        # report_share: the name of the shared memory block (removed on disconnect) or a ReportPublisher
+        if isinstance(self._report_share, str):
+            if self._report_publisher is None or self._report_publisher.closed:
+                try:
+                    self._report_publisher = ReportPublisher(self._report_share)
+                except Exception as e:
+                    logger.error('report_share is disabled, {}'.format(e))
+        else:
+            self._report_publisher = self._report_share
+
+    def _create_socket_cmd(self):
+        self.arm_cmd = UxbusCmdTcp(self._stream, set_feedback_key_tranid=self._set_feedback_key_tranid,
+                                   pipeline=self._enable_pipeline, rtt=self._rtt, stats=self._comm_stats)
+        self.arm_cmd.set_protocol_identifier(2)
+
+    def _setup_arm_cmd(self):
+        self.set_timeout(self._cmd_timeout)
+        if self._rewrite_modbus_baudrate_method:
+            setattr(self.arm_cmd, 'set_modbus_baudrate_old', self.arm_cmd.set_modbus_baudrate)
+            setattr(self.arm_cmd, 'set_modbus_baudrate', self._core_set_modbus_baudrate)
+
+    def _reconnect(self):
+        """
+        Rebuild the control and report connections after the control connection dropped (auto_reconnect)
+        Retry with exponential backoff, only the transport is rebuilt: the robot information from the first connect,
+        the registered callbacks and the worker threads are kept.
+        """
+        start_time = time.monotonic()
+        for stream in [self._stream, self._stream_report, self._stream_503]:
+            if stream:
+                try:
+                    stream.close()
+                except:
+                    pass
+        self._stream_report = None
+        self._stream_503 = None
+        self.arm_cmd_503 = None
+        interval = self._reconnect_interval
+        while not self._reconnect_stop.is_set():
+            if self._reconnect_timeout is not None and time.monotonic() - start_time > self._reconnect_timeout:
+                break
+            if self._connect_main_socket():
+                break
+            logger.info('reconnect failed, retry after {}s'.format(interval))
+            self._reconnect_stop.wait(interval)
+            interval = min(interval * 2, self._reconnect_max_interval)
+        if not self.connected or self._reconnect_stop.is_set():
+            logger.error('reconnect failed, give up after {:.3f}s'.format(time.monotonic() - start_time))
+            return -1
+        self._create_socket_cmd()
+        self._support_feedback = self.version_is_ge(2, 0, 102)
+        self.arm_cmd.set_debug(self._debug)
+        self._setup_arm_cmd()
+        try:
+            self._connect_report()
+        except:
+            self._stream_report = None
+        # positions may have changed while disconnected
+        self._is_sync = False
+        if self._getter_cache is not None:
+            self._getter_cache.invalidate()
+        self.get_err_warn_code()
+        self.get_state()
+        self._reconnect_count += 1
+        reconnect_duration = time.monotonic() - start_time
+        logger.info('reconnect success, duration={:.3f}s'.format(reconnect_duration))
+        self._report_connect_changed_callback(reconnect_duration=reconnect_duration)
+        return 0
 
     if asyncio:
         def _run_asyncio_loop(self):
@@ -1016,6 +1198,7 @@ class Base(BaseObject, Events):
             return self.arm_cmd.set_modbus_baudrate_old(baudrate)
 
     def disconnect(self):
+        self._reconnect_stop.set()
         try:
             self._stream.close()
         except:
@@ -1044,6 +1227,96 @@ class Base(BaseObject, Events):
         with self._pause_cond:
             self._pause_cond.notifyAll()
         self._clean_thread()
+        if isinstance(self._capture, str) and self._recorder is not None:
+            self._recorder.close()
+        if isinstance(self._telemetry, str) and self._telemetry_recorder is not None:
+            self._telemetry_recorder.close()
+        if isinstance(self._report_share, str) and self._report_publisher is not None:
+            self._report_publisher.close()
+
+    def get_cache_stats(self):
+        if self._getter_cache is None:
+            return {'hits': 0, 'misses': 0, 'entries': 0}
+        return self._getter_cache.stats()
+
+    def clear_cache(self):
+        if self._getter_cache is not None:
+            self._getter_cache.invalidate()
+            self._getter_cache.reset_stats()
+        return 0
+
+    def get_comm_stats(self):
+        if self._comm_stats is None:
+            return {}
+        return self._comm_stats.snapshot()
+
+    def reset_comm_stats(self):
+        if self._comm_stats is not None:
+            self._comm_stats.reset()
+        return 0
+
+    # the state the requests of the motion commands are built from (the parameters left to the previous command)
+    _BATCH_STATE_ATTRS = ('_last_position', '_last_angles', '_last_tcp_speed', '_last_tcp_acc',
+                          '_last_joint_speed', '_last_joint_acc', '_mvtime')
+
+    def _get_batch_state(self):
+        return [list(value) if isinstance(value, list) else value
+                for value in (getattr(self, name) for name in self._BATCH_STATE_ATTRS)]
+
+    def _set_batch_state(self, state):
+        for name, value in zip(self._BATCH_STATE_ATTRS, state):
+            setattr(self, name, list(value) if isinstance(value, list) else value)
+
+    def run_batch(self, calls, getters=None):
+        """
+        Run the calls (callables without arguments) with their command requests sent in one write
+        1. record: each call runs until the request carrying its command, which is captured instead of sent,
+           the read-only requests before it (e.g. a version check) are sent as usual. The call goes on with a
+           success in place of the reply until its next request (BatchRecorded), so the state the next calls
+           start from (last position, speeds) is the one they would start from if run one after the other.
+        2. send: the captured requests go out together with consecutive transaction ids, all replies are collected
+        3. replay: each call runs again from the state it was recorded with, its command request gets the
+           collected reply and the rest of the call (checks, following requests, wait) goes as usual
+        A call which sends no command (a result of the reports, of the cache) keeps the result of the record pass.
+        Note: the requests are built assuming the earlier calls succeed, a move following a failed one of the batch
+            was sent from the target of the failed one
+        Falls back to running the calls one after the other without a TCP connection (serial/async).
+        :param getters: flags of the calls which are getters, their first request is batched even if read-only
+        :return: the results of the calls, in order
+        """
+        arm_cmd = self.arm_cmd
+        if not hasattr(arm_cmd, 'send_batch'):
+            return [call() for call in calls]
+        results = [None] * len(calls)
+        requests = [None] * len(calls)
+        recorded = [False] * len(calls)
+        states = [None] * len(calls)
+        start_state = self._get_batch_state()
+        for i, call in enumerate(calls):
+            states[i] = self._get_batch_state()
+            with arm_cmd.batch_record(bool(getters and getters[i])) as recorder:
+                try:
+                    results[i] = call()
+                except BatchRecorded:
+                    pass
+            recorded[i] = recorder.request is not None
+            if recorded[i] and recorder.request.num is not None:
+                requests[i] = recorder.request
+        batched = [request for request in requests if request is not None]
+        if arm_cmd.send_batch(batched) != 0:
+            logger.error('send batch failed, {} requests'.format(len(batched)))
+            # nothing was sent, the calls fail from the state before the batch
+            states = [start_state] * len(calls)
+        for i, call in enumerate(calls):
+            if requests[i] is not None:
+                self._set_batch_state(states[i])
+                with arm_cmd.batch_replay(requests[i]):
+                    results[i] = call()
+            elif recorded[i]:
+                # its command can not be batched or the call swallowed BatchRecorded, run it on its own
+                self._set_batch_state(states[i])
+                results[i] = call()
+        return results
 
     def set_timeout(self, timeout):
         self._cmd_timeout = timeout
@@ -1091,30 +1364,33 @@ class Base(BaseObject, Events):
                 self._stream_report = SocketPort(
                     self._port, XCONF.SocketConf.TCP_REPORT_REAL_PORT,
                     buffer_size=1024 if not self._is_old_protocol else 87,
-                    forbid_uds=self._forbid_uds)
+                    forbid_uds=self._forbid_uds, reactor=self._reactor, recorder=self._recorder)
             elif self._report_type == 'normal':
                 self._stream_report = SocketPort(
                     self._port, XCONF.SocketConf.TCP_REPORT_NORM_PORT,
                     buffer_size=XCONF.SocketConf.TCP_REPORT_NORMAL_BUF_SIZE if not self._is_old_protocol else 87,
-                    forbid_uds=self._forbid_uds)
+                    forbid_uds=self._forbid_uds, reactor=self._reactor, recorder=self._recorder)
             else:
                 self._stream_report = SocketPort(
                     self._port, XCONF.SocketConf.TCP_REPORT_RICH_PORT,
                     buffer_size=1024 if not self._is_old_protocol else 187,
-                    forbid_uds=self._forbid_uds)
+                    forbid_uds=self._forbid_uds, reactor=self._reactor, recorder=self._recorder)
 
     def __report_callback(self, report_id, item, name=''):
         if report_id in self._report_callbacks.keys():
             for callback in self._report_callbacks[report_id]:
                 self._run_callback(callback, item, name=name)
 
-    def _report_connect_changed_callback(self, main_connected=None, report_connected=None):
+    def _report_connect_changed_callback(self, main_connected=None, report_connected=None, reconnect_duration=None):
         if self.REPORT_CONNECT_CHANGED_ID in self._report_callbacks.keys():
+            msg = {
+                'connected': self._stream and self._stream.connected if main_connected is None else main_connected,
+                'reported': self._stream_report and self._stream_report.connected if report_connected is None else report_connected,
+            }
+            if reconnect_duration is not None:
+                msg['reconnect_duration'] = reconnect_duration
             for callback in self._report_callbacks[self.REPORT_CONNECT_CHANGED_ID]:
-                self._run_callback(callback, {
-                    'connected': self._stream and self._stream.connected if main_connected is None else main_connected,
-                    'reported': self._stream_report and self._stream_report.connected if report_connected is None else report_connected,
-                }, name='connect_changed')
+                self._run_callback(callback, msg.copy(), name='connect_changed')
 
     def _report_state_changed_callback(self):
         if self._ignore_state:
@@ -1131,6 +1407,11 @@ class Base(BaseObject, Events):
         }, name='(mtable/mtbrake)_changed')
 
     def _report_error_warn_changed_callback(self):
+        if self._getter_cache is not None:
+            if self._error_code in self.END_EFFECTOR_RESET_ERRORS:
+                self._getter_cache.invalidate('get_tgpio_version', 'get_gripper_version')
+            elif self._error_code in self.SERVO_RESET_ERRORS:
+                self._getter_cache.invalidate('get_servo_version', 'get_harmonic_type')
         if self._ignore_error:
             return
         self.__report_callback(self.REPORT_ERROR_WARN_CHANGED_ID, {
@@ -1191,6 +1472,19 @@ class Base(BaseObject, Events):
                 self._run_callback(callback, ret, name='report')
 
     def _report_thread_handle(self):
+        while True:
+            self._report_loop()
+            if not self._can_reconnect:
+                break
+            self._report_connect_changed_callback(False, False)
+            if self._reconnect() != 0:
+                break
+        if self._pause_cnts > 0:
+            with self._pause_cond:
+                self._pause_cond.notifyAll()
+        self.disconnect()
+
+    def _report_loop(self):
         main_socket_connected = self.connected
         report_socket_connected = self.reported
         protocol_identifier = 2
@@ -1255,575 +1549,574 @@ class Base(BaseObject, Events):
                     break
                 if not self._stream_report or not self._stream_report.connected:
                     self._connect_report()
-            time.sleep(0.001)
-        if self._pause_cnts > 0:
-            with self._pause_cond:
-                self._pause_cond.notifyAll()
-        self.disconnect()
+                time.sleep(0.001)
 
     def _handle_report_data(self, data):
-        def __handle_report_normal_old(rx_data):
-            report_time = time.monotonic()
-            interval = report_time - self._last_report_time
-            self._max_report_interval = max(self._max_report_interval, interval)
-            self._last_report_time = report_time
-            # print('length:', convert.bytes_to_u32(rx_data[0:4]))
-            state, mtbrake, mtable, error_code, warn_code = rx_data[4:9]
-            angles = convert.bytes_to_fp32s(rx_data[9:7 * 4 + 9], 7)
-            pose = convert.bytes_to_fp32s(rx_data[37:6 * 4 + 37], 6)
-            cmd_num = convert.bytes_to_u16(rx_data[61:63])
-            pose_offset = convert.bytes_to_fp32s(rx_data[63:6 * 4 + 63], 6)
-
-            if error_code != self._error_code or warn_code != self._warn_code:
-                if error_code != self._error_code:
-                    self._error_code = error_code
-                    if self._error_code != 0:
-                        pretty_print('Error, code: {}'.format(self._error_code), color='red')
-                    else:
-                        pretty_print('Error had clean', color='blue')
-                if warn_code != self._warn_code:
-                    self._warn_code = warn_code
-                    if self._warn_code != 0:
-                        pretty_print('Warn, code: {}'.format(self._warn_code), color='yellow')
-                    else:
-                        pretty_print('Warnning had clean', color='blue')
-                self._report_error_warn_changed_callback()
-                logger.info('OnReport -> err={}, warn={}, state={}, cmdnum={}, mtbrake={}, mtable={}'.format(
-                    error_code, warn_code, state, cmd_num, mtbrake, mtable
-                ))
-            elif not self._only_report_err_warn_changed:
-                self._report_error_warn_changed_callback()
-
-            if cmd_num != self._cmd_num:
-                self._cmd_num = cmd_num
-                self._report_cmdnum_changed_callback()
+        try:
+            report_type = self._report_type if self._report_type in ('real', 'rich') else 'normal'
+            # the lazy groups of the rich report are decoded when read (_handle_report_rich)
+            names = RICH_EAGER_FIELDS if report_type == 'rich' and not self._is_old_protocol else None
+            # built once per report variant and frame length, reads all the fields with one unpack
+            fields = get_report_decoder(report_type, self._is_old_protocol, len(data), names).decode(data)
+            if report_type == 'real':
+                self._handle_report_real(data, fields)
+            elif report_type == 'rich':
+                if self._is_old_protocol:
+                    self._handle_report_rich_old(data, fields)
+                else:
+                    self._handle_report_rich(data, fields)
+            else:
+                if self._is_old_protocol:
+                    self._handle_report_normal_old(data, fields)
+                else:
+                    self._handle_report_normal(data, fields)
+            if self._report_history is not None:
+                self._report_history.append_arm(self)
+            if self._telemetry_recorder is not None:
+                self._telemetry_recorder.record_arm(self)
+            if self._report_publisher is not None:
+                self._report_publisher.publish_arm(self)
+            self._report_update_time = time.monotonic()
+        except Exception as e:
+            logger.error(e)
 
-            if state != self._state:
-                self._state = state
-                self._report_state_changed_callback()
+    def _handle_report_normal_old(self, rx_data, fields):
+        report_time = time.monotonic()
+        interval = report_time - self._last_report_time
+        self._max_report_interval = max(self._max_report_interval, interval)
+        self._last_report_time = report_time
+        # print('length:', convert.bytes_to_u32(rx_data[0:4]))
+        state, mtbrake, mtable = fields['state'], fields['mtbrake'], fields['mtable']
+        error_code, warn_code = fields['error_code'], fields['warn_code']
+        angles = fields['angles']
+        pose = fields['pose']
+        cmd_num = fields['cmd_num']
+        pose_offset = fields['pose_offset']
+
+        if error_code != self._error_code or warn_code != self._warn_code:
+            if error_code != self._error_code:
+                self._error_code = error_code
+                if self._error_code != 0:
+                    pretty_print('Error, code: {}'.format(self._error_code), color='red')
+                else:
+                    pretty_print('Error had clean', color='blue')
+            if warn_code != self._warn_code:
+                self._warn_code = warn_code
+                if self._warn_code != 0:
+                    pretty_print('Warn, code: {}'.format(self._warn_code), color='yellow')
+                else:
+                    pretty_print('Warnning had clean', color='blue')
+            self._report_error_warn_changed_callback()
+            logger.info('OnReport -> err={}, warn={}, state={}, cmdnum={}, mtbrake={}, mtable={}'.format(
+                error_code, warn_code, state, cmd_num, mtbrake, mtable
+            ))
+        elif not self._only_report_err_warn_changed:
+            self._report_error_warn_changed_callback()
+
+        if cmd_num != self._cmd_num:
+            self._cmd_num = cmd_num
+            self._report_cmdnum_changed_callback()
 
-            mtbrake = [mtbrake & 0x01, mtbrake >> 1 & 0x01, mtbrake >> 2 & 0x01, mtbrake >> 3 & 0x01,
-                       mtbrake >> 4 & 0x01, mtbrake >> 5 & 0x01, mtbrake >> 6 & 0x01, mtbrake >> 7 & 0x01]
-            mtable = [mtable & 0x01, mtable >> 1 & 0x01, mtable >> 2 & 0x01, mtable >> 3 & 0x01,
-                      mtable >> 4 & 0x01, mtable >> 5 & 0x01, mtable >> 6 & 0x01, mtable >> 7 & 0x01]
+        if state != self._state:
+            self._state = state
+            self._report_state_changed_callback()
 
-            if mtbrake != self._arm_motor_brake_states or mtable != self._arm_motor_enable_states:
-                self._arm_motor_enable_states = mtable
-                self._arm_motor_brake_states = mtbrake
-                self._report_mtable_mtbrake_changed_callback()
+        mtbrake = [mtbrake & 0x01, mtbrake >> 1 & 0x01, mtbrake >> 2 & 0x01, mtbrake >> 3 & 0x01,
+                   mtbrake >> 4 & 0x01, mtbrake >> 5 & 0x01, mtbrake >> 6 & 0x01, mtbrake >> 7 & 0x01]
+        mtable = [mtable & 0x01, mtable >> 1 & 0x01, mtable >> 2 & 0x01, mtable >> 3 & 0x01,
+                  mtable >> 4 & 0x01, mtable >> 5 & 0x01, mtable >> 6 & 0x01, mtable >> 7 & 0x01]
 
-            if not self._is_first_report:
-                if state in [4, 5] or not all([bool(item[0] & item[1]) for item in zip(mtbrake, mtable)][:self.axis]):
-                    # if self._is_ready:
-                    #     pretty_print('[report], xArm is not ready to move', color='red')
-                    self._is_ready = False
-                else:
-                    # if not self._is_ready:
-                    #     pretty_print('[report], xArm is ready to move', color='green')
-                    self._is_ready = True
-            else:
-                self._is_ready = False
-            self._is_first_report = False
-            if not self._is_ready:
-                self._sleep_finish_time = 0
-
-            reset_tgpio_params = False
-            reset_linear_track_params = False
-            if 0 < error_code <= 17:
-                reset_tgpio_params = True
-                reset_linear_track_params = True
-            elif error_code in [19, 28]:
-                reset_tgpio_params = True
-            elif error_code == 111:
-                reset_linear_track_params = True
-            if reset_tgpio_params:
-                self.modbus_baud = -1
-                self.robotiq_is_activated = False
-                self.gripper_is_enabled = False
-                self.bio_gripper_is_enabled = False
-                self.bio_gripper_speed = 0
-                self.gripper_is_enabled = False
-                self.gripper_speed = 0
-                self.gripper_version_numbers = [-1, -1, -1]
-            if reset_linear_track_params:
-                self.linear_track_baud = -1
-                self.linear_track_is_enabled = False
-                self.linear_track_speed = 1
-
-            # if error_code in [1, 10, 11, 12, 13, 14, 15, 16, 17, 19, 28]:
-            #     self.modbus_baud = -1
-            #     self.robotiq_is_activated = False
-            #     self.gripper_is_enabled = False
-            #     self.bio_gripper_is_enabled = False
-            #     self.bio_gripper_speed = 0
-            #     self.gripper_is_enabled = False
-            #     self.gripper_speed = 0
-            #     self.gripper_version_numbers = [-1, -1, -1]
-            #     self.linear_track_is_enabled = False
-            #     self.linear_track_speed = 0
-
-            self._error_code = error_code
-            self._warn_code = warn_code
-            self.arm_cmd.has_err_warn = error_code != 0 or warn_code != 0
-            _state = self._state
-            self._state = state
-            if self.state != 3 and (_state == 3 or self._pause_cnts > 0):
-                with self._pause_cond:
-                    self._pause_cond.notifyAll()
-            self._cmd_num = cmd_num
-            self._arm_motor_brake_states = mtbrake
+        if mtbrake != self._arm_motor_brake_states or mtable != self._arm_motor_enable_states:
             self._arm_motor_enable_states = mtable
+            self._arm_motor_brake_states = mtbrake
+            self._report_mtable_mtbrake_changed_callback()
 
-            update_time = time.monotonic()
-            self._last_update_cmdnum_time = update_time
-            self._last_update_state_time = update_time
-            self._last_update_err_time = update_time
-
-            for i in range(len(pose)):
-                pose[i] = filter_invaild_number(pose[i], 3 if i < 3 else 6, default=self._position[i])
-            for i in range(len(angles)):
-                angles[i] = filter_invaild_number(angles[i], 6, default=self._angles[i])
-            for i in range(len(pose_offset)):
-                pose_offset[i] = filter_invaild_number(pose_offset[i], 3 if i < 3 else 6, default=self._position_offset[i])
-
-            if not (0 < self._error_code <= 17):
-                self._position = pose
-            if not (0 < self._error_code <= 17):
-                self._angles = angles
-            if not (0 < self._error_code <= 17):
-                self._position_offset = pose_offset
-
-            self._report_location_callback()
-
-            self._report_callback()
-            if not self._is_sync and self._error_code == 0 and self._state not in [4, 5, 6]:
-                self._sync()
-                self._is_sync = True
-
-        def __handle_report_rich_old(rx_data):
-            __handle_report_normal_old(rx_data)
-            (self._arm_type,
-             arm_axis,
-             self._arm_master_id,
-             self._arm_slave_id,
-             self._arm_motor_tid,
-             self._arm_motor_fid) = rx_data[87:93]
-
-            if 7 >= arm_axis >= 5:
-                self._arm_axis = arm_axis
-            if self._arm_type == 5:
-                self._arm_axis = 5
-            elif self._arm_type == 6:
-                self._arm_axis = 6
-            elif self._arm_type == 3:
-                self._arm_axis = 7
-
-            ver_msg = rx_data[93:122]
-            # self._version = str(ver_msg, 'utf-8')
-
-            trs_msg = convert.bytes_to_fp32s(rx_data[123:143], 5)
-            # trs_msg = [i[0] for i in trs_msg]
-            (self._tcp_jerk,
-             self._min_tcp_acc,
-             self._max_tcp_acc,
-             self._min_tcp_speed,
-             self._max_tcp_speed) = trs_msg
-            # print('tcp_jerk: {}, min_acc: {}, max_acc: {}, min_speed: {}, max_speed: {}'.format(
-            #     self._tcp_jerk, self._min_tcp_acc, self._max_tcp_acc, self._min_tcp_speed, self._max_tcp_speed
-            # ))
-
-            p2p_msg = convert.bytes_to_fp32s(rx_data[143:163], 5)
-            # p2p_msg = [i[0] for i in p2p_msg]
-            (self._joint_jerk,
-             self._min_joint_acc,
-             self._max_joint_acc,
-             self._min_joint_speed,
-             self._max_joint_speed) = p2p_msg
-            # print('joint_jerk: {}, min_acc: {}, max_acc: {}, min_speed: {}, max_speed: {}'.format(
-            #     self._joint_jerk, self._min_joint_acc, self._max_joint_acc,
-            #     self._min_joint_speed, self._max_joint_speed
-            # ))
-
-            rot_msg = convert.bytes_to_fp32s(rx_data[163:171], 2)
-            # rot_msg = [i[0] for i in rot_msg]
-            self._rot_jerk, self._max_rot_acc = rot_msg
-            # print('rot_jerk: {}, mac_acc: {}'.format(self._rot_jerk, self._max_rot_acc))
-
-            sv3_msg = convert.bytes_to_u16s(rx_data[171:187], 8)
-            self._first_report_over = True
-
-        def __handle_report_real(rx_data):
-            state, mode = rx_data[4] & 0x0F, rx_data[4] >> 4
-            cmd_num = convert.bytes_to_u16(rx_data[5:7])
-            angles = convert.bytes_to_fp32s(rx_data[7:7 * 4 + 7], 7)
-            pose = convert.bytes_to_fp32s(rx_data[35:6 * 4 + 35], 6)
-            torque = convert.bytes_to_fp32s(rx_data[59:7 * 4 + 59], 7)
-            if cmd_num != self._cmd_num:
-                self._cmd_num = cmd_num
-                self._report_cmdnum_changed_callback()
-            if state != self._state:
-                self._state = state
-                self._report_state_changed_callback()
-            if state in [4, 5]:
+        if not self._is_first_report:
+            if state in [4, 5] or not all([bool(item[0] & item[1]) for item in zip(mtbrake, mtable)][:self.axis]):
+                # if self._is_ready:
+                #     pretty_print('[report], xArm is not ready to move', color='red')
                 self._is_ready = False
             else:
+                # if not self._is_ready:
+                #     pretty_print('[report], xArm is ready to move', color='green')
                 self._is_ready = True
+        else:
+            self._is_ready = False
+        self._is_first_report = False
+        if not self._is_ready:
+            self._sleep_finish_time = 0
 
-            if mode != self._mode:
-                self._mode = mode
-                self._report_mode_changed_callback()
-            for i in range(len(pose)):
-                pose[i] = filter_invaild_number(pose[i], 3 if i < 3 else 6, default=self._position[i])
-            for i in range(len(angles)):
-                angles[i] = filter_invaild_number(angles[i], 6, default=self._angles[i])
-
-            if not (0 < self._error_code <= 17):
-                self._position = pose
-            if not (0 < self._error_code <= 17):
-                self._angles = angles
-            self._joints_torque = torque
-
-            self._report_location_callback()
-
-            self._report_callback()
-            if not self._is_sync and self._state not in [4, 5]:
-                self._sync()
-                self._is_sync = True
-            length = len(rx_data)
-            if length >= 135:
-                # FT_SENSOR
-                self._ft_ext_force = convert.bytes_to_fp32s(rx_data[87:111], 6)
-                self._ft_raw_force = convert.bytes_to_fp32s(rx_data[111:135], 6)
-
-        def __handle_report_normal(rx_data):
-            report_time = time.monotonic()
-            interval = report_time - self._last_report_time
-            self._max_report_interval = max(self._max_report_interval, interval)
-            self._last_report_time = report_time
-            # print('length:', convert.bytes_to_u32(rx_data[0:4]), len(rx_data))
-            state, mode = rx_data[4] & 0x0F, rx_data[4] >> 4
-            # if state != self._state or mode != self._mode:
-            #     print('mode: {}, state={}, time={}'.format(mode, state, time.monotonic()))
-            cmd_num = convert.bytes_to_u16(rx_data[5:7])
-            angles = convert.bytes_to_fp32s(rx_data[7:7 * 4 + 7], 7)
-            pose = convert.bytes_to_fp32s(rx_data[35:6 * 4 + 35], 6)
-            torque = convert.bytes_to_fp32s(rx_data[59:7 * 4 + 59], 7)
-            mtbrake, mtable, error_code, warn_code = rx_data[87:91]
-            pose_offset = convert.bytes_to_fp32s(rx_data[91:6 * 4 + 91], 6)
-            tcp_load = convert.bytes_to_fp32s(rx_data[115:4 * 4 + 115], 4)
-            collis_sens, teach_sens = rx_data[131:133]
-            # if (collis_sens not in list(range(6)) or teach_sens not in list(range(6))) \
-            #         and ((error_code != 0 and error_code not in controller_error_keys) or (warn_code != 0 and warn_code not in controller_warn_keys)):
-            #     self._stream_report.close()
-            #     logger.warn('ReportDataException: data={}'.format(rx_data))
-            #     return
-            length = convert.bytes_to_u32(rx_data[0:4])
-            data_len = len(rx_data)
-            if (length != data_len and (length != 233 or data_len != 245)) or collis_sens not in list(range(6)) or teach_sens not in list(range(6)) \
-                or mode not in list(range(12)) or state not in list(range(10)):
-                self._stream_report.close()
-                logger.warn('ReportDataException: length={}, data_len={}, '
-                            'state={}, mode={}, collis_sens={}, teach_sens={}, '
-                            'error_code={}, warn_code={}'.format(
-                    length, data_len,
-                    state, mode, collis_sens, teach_sens, error_code, warn_code
-                ))
-                return
-            self._gravity_direction = convert.bytes_to_fp32s(rx_data[133:3*4 + 133], 3)
-
-            reset_tgpio_params = False
-            reset_linear_track_params = False
-            if 0 < error_code <= 17:
-                reset_tgpio_params = True
-                reset_linear_track_params = True
-            elif error_code in [19, 28]:
-                reset_tgpio_params = True
-            elif error_code == 111:
-                reset_linear_track_params = True
-            if reset_tgpio_params:
-                self.modbus_baud = -1
-                self.robotiq_is_activated = False
-                self.gripper_is_enabled = False
-                self.bio_gripper_is_enabled = False
-                self.bio_gripper_speed = 0
-                self.gripper_is_enabled = False
-                self.gripper_speed = 0
-                self.gripper_version_numbers = [-1, -1, -1]
-            if reset_linear_track_params:
-                self.linear_track_baud = -1
-                self.linear_track_is_enabled = False
-                self.linear_track_speed = 0
-
-            # if error_code in [1, 10, 11, 12, 13, 14, 15, 16, 17, 19, 28]:
-            #     self.modbus_baud = -1
-            #     self.robotiq_is_activated = False
-            #     self.gripper_is_enabled = False
-            #     self.bio_gripper_is_enabled = False
-            #     self.bio_gripper_speed = -1
-            #     self.gripper_speed = -1
-            #     self.gripper_version_numbers = [-1, -1, -1]
-            #     self.linear_track_is_enabled = False
-            #     self.linear_track_speed = -1
-
-            # print('torque: {}'.format(torque))
-            # print('tcp_load: {}'.format(tcp_load))
-            # print('collis_sens: {}, teach_sens: {}'.format(collis_sens, teach_sens))
-
-            if error_code != self._error_code or warn_code != self._warn_code:
-                if error_code != self._error_code:
-                    self._error_code = error_code
-                    if self._error_code != 0:
-                        pretty_print('ControllerError, code: {}'.format(self._error_code), color='red')
-                    else:
-                        pretty_print('ControllerError had clean', color='blue')
-                if warn_code != self._warn_code:
-                    self._warn_code = warn_code
-                    if self._warn_code != 0:
-                        pretty_print('ControllerWarning, code: {}'.format(self._warn_code), color='yellow')
-                    else:
-                        pretty_print('ControllerWarning had clean', color='blue')
-                self._report_error_warn_changed_callback()
-                logger.info('OnReport -> err={}, warn={}, state={}, cmdnum={}, mtbrake={}, mtable={}, mode={}'.format(
-                    error_code, warn_code, state, cmd_num, mtbrake, mtable, mode
-                ))
-            elif not self._only_report_err_warn_changed:
-                self._report_error_warn_changed_callback()
+        reset_tgpio_params = False
+        reset_linear_track_params = False
+        if 0 < error_code <= 17:
+            reset_tgpio_params = True
+            reset_linear_track_params = True
+        elif error_code in [19, 28]:
+            reset_tgpio_params = True
+        elif error_code == 111:
+            reset_linear_track_params = True
+        if reset_tgpio_params:
+            self.modbus_baud = -1
+            self.robotiq_is_activated = False
+            self.gripper_is_enabled = False
+            self.bio_gripper_is_enabled = False
+            self.bio_gripper_speed = 0
+            self.gripper_is_enabled = False
+            self.gripper_speed = 0
+            self.gripper_version_numbers = [-1, -1, -1]
+        if reset_linear_track_params:
+            self.linear_track_baud = -1
+            self.linear_track_is_enabled = False
+            self.linear_track_speed = 1
 
-            if cmd_num != self._cmd_num:
-                self._cmd_num = cmd_num
-                self._report_cmdnum_changed_callback()
+        # if error_code in [1, 10, 11, 12, 13, 14, 15, 16, 17, 19, 28]:
+        #     self.modbus_baud = -1
+        #     self.robotiq_is_activated = False
+        #     self.gripper_is_enabled = False
+        #     self.bio_gripper_is_enabled = False
+        #     self.bio_gripper_speed = 0
+        #     self.gripper_is_enabled = False
+        #     self.gripper_speed = 0
+        #     self.gripper_version_numbers = [-1, -1, -1]
+        #     self.linear_track_is_enabled = False
+        #     self.linear_track_speed = 0
+
+        self._error_code = error_code
+        self._warn_code = warn_code
+        self.arm_cmd.has_err_warn = error_code != 0 or warn_code != 0
+        _state = self._state
+        self._state = state
+        if self.state != 3 and (_state == 3 or self._pause_cnts > 0):
+            with self._pause_cond:
+                self._pause_cond.notifyAll()
+        self._cmd_num = cmd_num
+        self._arm_motor_brake_states = mtbrake
+        self._arm_motor_enable_states = mtable
+
+        update_time = time.monotonic()
+        self._last_update_cmdnum_time = update_time
+        self._last_update_state_time = update_time
+        self._last_update_err_time = update_time
+
+        for i in range(len(pose)):
+            pose[i] = filter_invaild_number(pose[i], 3 if i < 3 else 6, default=self._position[i])
+        for i in range(len(angles)):
+            angles[i] = filter_invaild_number(angles[i], 6, default=self._angles[i])
+        for i in range(len(pose_offset)):
+            pose_offset[i] = filter_invaild_number(pose_offset[i], 3 if i < 3 else 6, default=self._position_offset[i])
+
+        if not (0 < self._error_code <= 17):
+            self._position = pose
+        if not (0 < self._error_code <= 17):
+            self._angles = angles
+        if not (0 < self._error_code <= 17):
+            self._position_offset = pose_offset
+
+        self._report_location_callback()
+
+        self._report_callback()
+        if not self._is_sync and self._error_code == 0 and self._state not in [4, 5, 6]:
+            self._sync()
+            self._is_sync = True
+
+    def _handle_report_rich_old(self, rx_data, fields):
+        self._handle_report_normal_old(rx_data, fields)
+        self._arm_type = fields['arm_type']
+        arm_axis = fields['arm_axis']
+        self._arm_master_id = fields['arm_master_id']
+        self._arm_slave_id = fields['arm_slave_id']
+        self._arm_motor_tid = fields['arm_motor_tid']
+        self._arm_motor_fid = fields['arm_motor_fid']
+
+        if 7 >= arm_axis >= 5:
+            self._arm_axis = arm_axis
+        if self._arm_type == 5:
+            self._arm_axis = 5
+        elif self._arm_type == 6:
+            self._arm_axis = 6
+        elif self._arm_type == 3:
+            self._arm_axis = 7
+
+        # self._version = str(fields['version'], 'utf-8')
+
+        trs_msg = fields['trs_msg']
+        # trs_msg = [i[0] for i in trs_msg]
+        (self._tcp_jerk,
+         self._min_tcp_acc,
+         self._max_tcp_acc,
+         self._min_tcp_speed,
+         self._max_tcp_speed) = trs_msg
+        # print('tcp_jerk: {}, min_acc: {}, max_acc: {}, min_speed: {}, max_speed: {}'.format(
+        #     self._tcp_jerk, self._min_tcp_acc, self._max_tcp_acc, self._min_tcp_speed, self._max_tcp_speed
+        # ))
+
+        p2p_msg = fields['p2p_msg']
+        # p2p_msg = [i[0] for i in p2p_msg]
+        (self._joint_jerk,
+         self._min_joint_acc,
+         self._max_joint_acc,
+         self._min_joint_speed,
+         self._max_joint_speed) = p2p_msg
+        # print('joint_jerk: {}, min_acc: {}, max_acc: {}, min_speed: {}, max_speed: {}'.format(
+        #     self._joint_jerk, self._min_joint_acc, self._max_joint_acc,
+        #     self._min_joint_speed, self._max_joint_speed
+        # ))
+
+        rot_msg = fields['rot_msg']
+        # rot_msg = [i[0] for i in rot_msg]
+        self._rot_jerk, self._max_rot_acc = rot_msg
+        # print('rot_jerk: {}, mac_acc: {}'.format(self._rot_jerk, self._max_rot_acc))
+
+        self._first_report_over = True
+
+    def _handle_report_real(self, rx_data, fields):
+        state, mode = fields['state_mode'] & 0x0F, fields['state_mode'] >> 4
+        cmd_num = fields['cmd_num']
+        angles = fields['angles']
+        pose = fields['pose']
+        torque = fields['torque']
+        if cmd_num != self._cmd_num:
+            self._cmd_num = cmd_num
+            self._report_cmdnum_changed_callback()
+        if state != self._state:
+            self._state = state
+            self._report_state_changed_callback()
+        if state in [4, 5]:
+            self._is_ready = False
+        else:
+            self._is_ready = True
 
-            if state != self._state:
-                if not self._has_motion_cmd and self._state in [0, 1] and state not in [0, 1]:
-                    self._need_sync = True
-                if self._state in [0, 1] and state not in [0, 1]:
-                    self._has_motion_cmd = False
-                # print('old_state: {}, new_state: {}, has_motion_cmd={}, need_sync: {}'.format(self._state, state, self._has_motion_cmd, self._need_sync))
-                self._state = state
-                self._report_state_changed_callback()
-            if mode != self._mode:
-                self._mode = mode
-                self._report_mode_changed_callback()
-
-            mtbrake = [mtbrake & 0x01, mtbrake >> 1 & 0x01, mtbrake >> 2 & 0x01, mtbrake >> 3 & 0x01,
-                       mtbrake >> 4 & 0x01, mtbrake >> 5 & 0x01, mtbrake >> 6 & 0x01, mtbrake >> 7 & 0x01]
-            mtable = [mtable & 0x01, mtable >> 1 & 0x01, mtable >> 2 & 0x01, mtable >> 3 & 0x01,
-                      mtable >> 4 & 0x01, mtable >> 5 & 0x01, mtable >> 6 & 0x01, mtable >> 7 & 0x01]
-
-            if mtbrake != self._arm_motor_brake_states or mtable != self._arm_motor_enable_states:
-                self._arm_motor_enable_states = mtable
-                self._arm_motor_brake_states = mtbrake
-                self._report_mtable_mtbrake_changed_callback()
-
-            if not self._is_first_report:
-                if state in [4, 5] or not all([bool(item[0] & item[1]) for item in zip(mtbrake, mtable)][:self.axis]):
-                    # if self._is_ready:
-                    #     pretty_print('[report], xArm is not ready to move', color='red')
-                    self._is_ready = False
+        if mode != self._mode:
+            self._mode = mode
+            self._report_mode_changed_callback()
+        for i in range(len(pose)):
+            pose[i] = filter_invaild_number(pose[i], 3 if i < 3 else 6, default=self._position[i])
+        for i in range(len(angles)):
+            angles[i] = filter_invaild_number(angles[i], 6, default=self._angles[i])
+
+        if not (0 < self._error_code <= 17):
+            self._position = pose
+        if not (0 < self._error_code <= 17):
+            self._angles = angles
+        self._joints_torque = torque
+
+        self._report_location_callback()
+
+        self._report_callback()
+        if not self._is_sync and self._state not in [4, 5]:
+            self._sync()
+            self._is_sync = True
+        length = len(rx_data)
+        if length >= 135:
+            # FT_SENSOR
+            self._ft_ext_force = fields['ft_ext_force']
+            self._ft_raw_force = fields['ft_raw_force']
+
+    def _handle_report_normal(self, rx_data, fields):
+        report_time = time.monotonic()
+        interval = report_time - self._last_report_time
+        self._max_report_interval = max(self._max_report_interval, interval)
+        self._last_report_time = report_time
+        # print('length:', convert.bytes_to_u32(rx_data[0:4]), len(rx_data))
+        state, mode = fields['state_mode'] & 0x0F, fields['state_mode'] >> 4
+        # if state != self._state or mode != self._mode:
+        #     print('mode: {}, state={}, time={}'.format(mode, state, time.monotonic()))
+        cmd_num = fields['cmd_num']
+        angles = fields['angles']
+        pose = fields['pose']
+        torque = fields['torque']
+        mtbrake, mtable = fields['mtbrake'], fields['mtable']
+        error_code, warn_code = fields['error_code'], fields['warn_code']
+        pose_offset = fields['pose_offset']
+        tcp_load = fields['tcp_load']
+        collis_sens, teach_sens = fields['collis_sens'], fields['teach_sens']
+        # if (collis_sens not in list(range(6)) or teach_sens not in list(range(6))) \
+        #         and ((error_code != 0 and error_code not in controller_error_keys) or (warn_code != 0 and warn_code not in controller_warn_keys)):
+        #     self._stream_report.close()
+        #     logger.warn('ReportDataException: data={}'.format(rx_data))
+        #     return
+        length = fields['length']
+        data_len = len(rx_data)
+        if (length != data_len and (length != 233 or data_len != 245)) or collis_sens not in list(range(6)) or teach_sens not in list(range(6)) \
+            or mode not in list(range(12)) or state not in list(range(10)):
+            self._stream_report.close()
+            logger.warn('ReportDataException: length={}, data_len={}, '
+                        'state={}, mode={}, collis_sens={}, teach_sens={}, '
+                        'error_code={}, warn_code={}'.format(
+                length, data_len,
+                state, mode, collis_sens, teach_sens, error_code, warn_code
+            ))
+            return
+        self._gravity_direction = fields['gravity_direction']
+
+        reset_tgpio_params = False
+        reset_linear_track_params = False
+        if 0 < error_code <= 17:
+            reset_tgpio_params = True
+            reset_linear_track_params = True
+        elif error_code in [19, 28]:
+            reset_tgpio_params = True
+        elif error_code == 111:
+            reset_linear_track_params = True
+        if reset_tgpio_params:
+            self.modbus_baud = -1
+            self.robotiq_is_activated = False
+            self.gripper_is_enabled = False
+            self.bio_gripper_is_enabled = False
+            self.bio_gripper_speed = 0
+            self.gripper_is_enabled = False
+            self.gripper_speed = 0
+            self.gripper_version_numbers = [-1, -1, -1]
+        if reset_linear_track_params:
+            self.linear_track_baud = -1
+            self.linear_track_is_enabled = False
+            self.linear_track_speed = 0
+
+        # if error_code in [1, 10, 11, 12, 13, 14, 15, 16, 17, 19, 28]:
+        #     self.modbus_baud = -1
+        #     self.robotiq_is_activated = False
+        #     self.gripper_is_enabled = False
+        #     self.bio_gripper_is_enabled = False
+        #     self.bio_gripper_speed = -1
+        #     self.gripper_speed = -1
+        #     self.gripper_version_numbers = [-1, -1, -1]
+        #     self.linear_track_is_enabled = False
+        #     self.linear_track_speed = -1
+
+        # print('torque: {}'.format(torque))
+        # print('tcp_load: {}'.format(tcp_load))
+        # print('collis_sens: {}, teach_sens: {}'.format(collis_sens, teach_sens))
+
+        if error_code != self._error_code or warn_code != self._warn_code:
+            if error_code != self._error_code:
+                self._error_code = error_code
+                if self._error_code != 0:
+                    pretty_print('ControllerError, code: {}'.format(self._error_code), color='red')
                 else:
-                    # if not self._is_ready:
-                    #     pretty_print('[report], xArm is ready to move', color='green')
-                    self._is_ready = True
-            else:
-                self._is_ready = False
-            self._is_first_report = False
-            if not self._is_ready:
-                self._sleep_finish_time = 0
-
-            self._error_code = error_code
-            self._warn_code = warn_code
-            self.arm_cmd.has_err_warn = error_code != 0 or warn_code != 0
-            _state = self._state
+                    pretty_print('ControllerError had clean', color='blue')
+            if warn_code != self._warn_code:
+                self._warn_code = warn_code
+                if self._warn_code != 0:
+                    pretty_print('ControllerWarning, code: {}'.format(self._warn_code), color='yellow')
+                else:
+                    pretty_print('ControllerWarning had clean', color='blue')
+            self._report_error_warn_changed_callback()
+            logger.info('OnReport -> err={}, warn={}, state={}, cmdnum={}, mtbrake={}, mtable={}, mode={}'.format(
+                error_code, warn_code, state, cmd_num, mtbrake, mtable, mode
+            ))
+        elif not self._only_report_err_warn_changed:
+            self._report_error_warn_changed_callback()
+
+        if cmd_num != self._cmd_num:
+            self._cmd_num = cmd_num
+            self._report_cmdnum_changed_callback()
+
+        if state != self._state:
+            if not self._has_motion_cmd and self._state in [0, 1] and state not in [0, 1]:
+                self._need_sync = True
+            if self._state in [0, 1] and state not in [0, 1]:
+                self._has_motion_cmd = False
+            # print('old_state: {}, new_state: {}, has_motion_cmd={}, need_sync: {}'.format(self._state, state, self._has_motion_cmd, self._need_sync))
             self._state = state
-            if self.state != 3 and (_state == 3 or self._pause_cnts > 0):
-                with self._pause_cond:
-                    self._pause_cond.notifyAll()
+            self._report_state_changed_callback()
+        if mode != self._mode:
             self._mode = mode
-            self._cmd_num = cmd_num
+            self._report_mode_changed_callback()
 
-            update_time = time.monotonic()
-            self._last_update_cmdnum_time = update_time
-            self._last_update_state_time = update_time
-            self._last_update_err_time = update_time
+        mtbrake = [mtbrake & 0x01, mtbrake >> 1 & 0x01, mtbrake >> 2 & 0x01, mtbrake >> 3 & 0x01,
+                   mtbrake >> 4 & 0x01, mtbrake >> 5 & 0x01, mtbrake >> 6 & 0x01, mtbrake >> 7 & 0x01]
+        mtable = [mtable & 0x01, mtable >> 1 & 0x01, mtable >> 2 & 0x01, mtable >> 3 & 0x01,
+                  mtable >> 4 & 0x01, mtable >> 5 & 0x01, mtable >> 6 & 0x01, mtable >> 7 & 0x01]
 
-            self._arm_motor_brake_states = mtbrake
+        if mtbrake != self._arm_motor_brake_states or mtable != self._arm_motor_enable_states:
             self._arm_motor_enable_states = mtable
-            self._joints_torque = torque
-            if compare_version(self.version_number, (0, 2, 0)):
-                self._tcp_load = [float('{:.3f}'.format(tcp_load[0])), [float('{:.3f}'.format(i)) for i in tcp_load[1:]]]
+            self._arm_motor_brake_states = mtbrake
+            self._report_mtable_mtbrake_changed_callback()
+
+        if not self._is_first_report:
+            if state in [4, 5] or not all([bool(item[0] & item[1]) for item in zip(mtbrake, mtable)][:self.axis]):
+                # if self._is_ready:
+                #     pretty_print('[report], xArm is not ready to move', color='red')
+                self._is_ready = False
             else:
-                self._tcp_load = [float('{:.3f}'.format(tcp_load[0])), [float('{:.3f}'.format(i * 1000)) for i in tcp_load[1:]]]
-            self._collision_sensitivity = collis_sens
-            self._teach_sensitivity = teach_sens
-
-            for i in range(len(pose)):
-                pose[i] = filter_invaild_number(pose[i], 3 if i < 3 else 6, default=self._position[i])
-            for i in range(len(angles)):
-                angles[i] = filter_invaild_number(angles[i], 6, default=self._angles[i])
-            for i in range(len(pose_offset)):
-                pose_offset[i] = filter_invaild_number(pose_offset[i], 3 if i < 3 else 6, default=self._position_offset[i])
-
-            if not (0 < self._error_code <= 17):
-                self._position = pose
-            if not (0 < self._error_code <= 17):
-                self._angles = angles
-            if not (0 < self._error_code <= 17):
-                self._position_offset = pose_offset
-
-            self._report_location_callback()
-
-            self._report_callback()
-            if not self._is_sync and self._error_code == 0 and self._state not in [4, 5]:
-                self._sync()
-                self._is_sync = True
-            elif self._need_sync:
-                self._need_sync = False
-                self._sync()
-
-        def __handle_report_rich(rx_data):
-            # print('interval={}, max_interval={}'.format(interval, self._max_report_interval))
-            __handle_report_normal(rx_data)
-            (self._arm_type,
-             arm_axis,
-             self._arm_master_id,
-             self._arm_slave_id,
-             self._arm_motor_tid,
-             self._arm_motor_fid) = rx_data[145:151]
-
-            if 7 >= arm_axis >= 5:
-                self._arm_axis = arm_axis
-
-            # self._version = str(rx_data[151:180], 'utf-8')
-
-            trs_msg = convert.bytes_to_fp32s(rx_data[181:201], 5)
-            # trs_msg = [i[0] for i in trs_msg]
-            (self._tcp_jerk,
-             self._min_tcp_acc,
-             self._max_tcp_acc,
-             self._min_tcp_speed,
-             self._max_tcp_speed) = trs_msg
-            # print('tcp_jerk: {}, min_acc: {}, max_acc: {}, min_speed: {}, max_speed: {}'.format(
-            #     self._tcp_jerk, self._min_tcp_acc, self._max_tcp_acc, self._min_tcp_speed, self._max_tcp_speed
-            # ))
-
-            p2p_msg = convert.bytes_to_fp32s(rx_data[201:221], 5)
-            # p2p_msg = [i[0] for i in p2p_msg]
-            (self._joint_jerk,
-             self._min_joint_acc,
-             self._max_joint_acc,
-             self._min_joint_speed,
-             self._max_joint_speed) = p2p_msg
-            # print('joint_jerk: {}, min_acc: {}, max_acc: {}, min_speed: {}, max_speed: {}'.format(
-            #     self._joint_jerk, self._min_joint_acc, self._max_joint_acc,
-            #     self._min_joint_speed, self._max_joint_speed
-            # ))
-
-            rot_msg = convert.bytes_to_fp32s(rx_data[221:229], 2)
-            # rot_msg = [i[0] for i in rot_msg]
-            self._rot_jerk, self._max_rot_acc = rot_msg
-            # print('rot_jerk: {}, mac_acc: {}'.format(self._rot_jerk, self._max_rot_acc))
-
-            servo_codes = [val for val in rx_data[229:245]]
+                # if not self._is_ready:
+                #     pretty_print('[report], xArm is ready to move', color='green')
+                self._is_ready = True
+        else:
+            self._is_ready = False
+        self._is_first_report = False
+        if not self._is_ready:
+            self._sleep_finish_time = 0
+
+        self._error_code = error_code
+        self._warn_code = warn_code
+        self.arm_cmd.has_err_warn = error_code != 0 or warn_code != 0
+        _state = self._state
+        self._state = state
+        if self.state != 3 and (_state == 3 or self._pause_cnts > 0):
+            with self._pause_cond:
+                self._pause_cond.notifyAll()
+        self._mode = mode
+        self._cmd_num = cmd_num
+
+        update_time = time.monotonic()
+        self._last_update_cmdnum_time = update_time
+        self._last_update_state_time = update_time
+        self._last_update_err_time = update_time
+
+        self._arm_motor_brake_states = mtbrake
+        self._arm_motor_enable_states = mtable
+        self._joints_torque = torque
+        if compare_version(self.version_number, (0, 2, 0)):
+            self._tcp_load = [round(tcp_load[0], 3), [round(i, 3) for i in tcp_load[1:]]]
+        else:
+            self._tcp_load = [round(tcp_load[0], 3), [round(i * 1000, 3) for i in tcp_load[1:]]]
+        self._collision_sensitivity = collis_sens
+        self._teach_sensitivity = teach_sens
+
+        for i in range(len(pose)):
+            pose[i] = filter_invaild_number(pose[i], 3 if i < 3 else 6, default=self._position[i])
+        for i in range(len(angles)):
+            angles[i] = filter_invaild_number(angles[i], 6, default=self._angles[i])
+        for i in range(len(pose_offset)):
+            pose_offset[i] = filter_invaild_number(pose_offset[i], 3 if i < 3 else 6, default=self._position_offset[i])
+
+        if not (0 < self._error_code <= 17):
+            self._position = pose
+        if not (0 < self._error_code <= 17):
+            self._angles = angles
+        if not (0 < self._error_code <= 17):
+            self._position_offset = pose_offset
+
+        self._report_location_callback()
+
+        self._report_callback()
+        if not self._is_sync and self._error_code == 0 and self._state not in [4, 5]:
+            self._sync()
+            self._is_sync = True
+        elif self._need_sync:
+            self._need_sync = False
+            self._sync()
+
+    def _handle_report_rich(self, rx_data, fields):
+        # print('interval={}, max_interval={}'.format(interval, self._max_report_interval))
+        # the groups of RICH_LAZY_GROUPS (motion limits, speeds, collision, voltages/currents, cgpio, ft sensor,
+        # reduced boundary) are decoded from the frame when first read, see _handle_report_rich_*; updated first,
+        # so the callbacks fired by the handlers below read the groups of this frame
+        self._report_view.update(rx_data)
+        self._handle_report_normal(rx_data, fields)
+        self._arm_type = fields['arm_type']
+        arm_axis = fields['arm_axis']
+        self._arm_master_id = fields['arm_master_id']
+        self._arm_slave_id = fields['arm_slave_id']
+        self._arm_motor_tid = fields['arm_motor_tid']
+        self._arm_motor_fid = fields['arm_motor_fid']
+
+        if 7 >= arm_axis >= 5:
+            if arm_axis != self._arm_axis:
+                self._servo_codes_raw = b''
+            self._arm_axis = arm_axis
+
+        # self._version = str(fields['version'], 'utf-8')
+
+        servo_codes = bytes(rx_data[229:245])
+        if servo_codes != self._servo_codes_raw:
+            self._servo_codes_raw = servo_codes
             for i in range(self.axis):
                 if self._servo_codes[i][0] != servo_codes[i * 2] or self._servo_codes[i][1] != servo_codes[i * 2 + 1]:
                     print('servo_error_code, servo_id={}, status={}, code={}'.format(i + 1, servo_codes[i * 2], servo_codes[i * 2 + 1]))
                 self._servo_codes[i][0] = servo_codes[i * 2]
                 self._servo_codes[i][1] = servo_codes[i * 2 + 1]
 
-            self._first_report_over = True
-
-            # length = convert.bytes_to_u32(rx_data[0:4])
-            length = len(rx_data)
-            if length >= 252:
-                temperatures = list(struct.unpack('>7b', struct.pack('>7B', *rx_data[245:252])))
-                # temperatures = list(map(int, rx_data[245:252]))
-                if temperatures != self.temperatures:
-                    self._temperatures = temperatures
-                    self._report_temperature_changed_callback()
-            if length >= 284:
-                speeds = convert.bytes_to_fp32s(rx_data[252:8 * 4 + 252], 8)
-                self._realtime_tcp_speed = speeds[0]
-                self._realtime_joint_speeds = speeds[1:]
-                # print(speeds[0], speeds[1:])
-            if length >= 288:
-                count = convert.bytes_to_u32(rx_data[284:288])
-                # print(count, rx_data[284:288])
-                if self._count != -1 and count != self._count:
-                    self._count = count
-                    self._report_count_changed_callback()
+        self._first_report_over = True
+
+        # length = convert.bytes_to_u32(rx_data[0:4])
+        length = len(rx_data)
+        if length >= 252:
+            temperatures = fields['temperatures']
+            if temperatures != self.temperatures:
+                self._temperatures = temperatures
+                self._report_temperature_changed_callback()
+        if length >= 288:
+            count = fields['count']
+            if self._count != -1 and count != self._count:
                 self._count = count
-            if length >= 312:
-                world_offset = convert.bytes_to_fp32s(rx_data[288:6 * 4 + 288], 6)
-                for i in range(len(world_offset)):
-                    if i < 3:
-                        world_offset[i] = float('{:.3f}'.format(world_offset[i]))
-                    else:
-                        world_offset[i] = float('{:.6f}'.format(world_offset[i]))
-                if math.inf not in world_offset and -math.inf not in world_offset and not (10 <= self._error_code <= 17):
-                    self._world_offset = world_offset
-            if length >= 314:
-                self._cgpio_reset_enable, self._tgpio_reset_enable = rx_data[312:314]
-            if length >= 417:
-                self._is_simulation_robot = bool(rx_data[314])
-                self._is_collision_detection, self._collision_tool_type = rx_data[315:317]
-                self._collision_tool_params = convert.bytes_to_fp32s(rx_data[317:341], 6)
-
-                voltages = convert.bytes_to_u16s(rx_data[341:355], 7)
-                voltages = list(map(lambda x: x / 100, voltages))
-                self._voltages = voltages
-
-                currents = convert.bytes_to_fp32s(rx_data[355:383], 7)
-                self._currents = currents
-
-                cgpio_states = []
-                cgpio_states.extend(rx_data[383:385])
-                cgpio_states.extend(convert.bytes_to_u16s(rx_data[385:401], 8))
-                cgpio_states[6:10] = list(map(lambda x: x / 4095.0 * 10.0, cgpio_states[6:10]))
-                cgpio_states.append(list(map(int, rx_data[401:409])))
-                cgpio_states.append(list(map(int, rx_data[409:417])))
-                if self._control_box_type_is_1300 and length >= 433:
-                    cgpio_states[-2].extend(list(map(int, rx_data[417:425])))
-                    cgpio_states[-1].extend(list(map(int, rx_data[425:433])))
-                self._cgpio_states = cgpio_states
-            if length >= 481:
-                # FT_SENSOR
-                self._ft_ext_force = convert.bytes_to_fp32s(rx_data[433:457], 6)
-                self._ft_raw_force = convert.bytes_to_fp32s(rx_data[457:481], 6)
-            if length >= 482:
-                iden_progress = rx_data[481]
-                if iden_progress != self._iden_progress:
-                    self._iden_progress = iden_progress
-                    self._report_iden_progress_changed_callback()
-            if length >= 494:
-                pose_aa = convert.bytes_to_fp32s(rx_data[482:494], 3)
-                for i in range(len(pose_aa)):
-                    pose_aa[i] = filter_invaild_number(pose_aa[i], 6, default=self._pose_aa[i])
-                self._pose_aa = self._position[:3] + pose_aa
-            if length >= 495:
-                self._is_reduced_mode = rx_data[494] & 0x01
-                self._is_fence_mode = (rx_data[494] >> 1) & 0x01
-                self._is_report_current = (rx_data[494] >> 2) & 0x01  # 针对get_report_tau_or_i的结果
-                self._is_approx_motion = (rx_data[494] >> 3) & 0x01
-                self._is_cart_continuous = (rx_data[494] >> 4) & 0x01
-            if length >= 496:
-                self._reduced_mode_is_on = rx_data[495]
-                self._reduced_tcp_boundary = convert.bytes_to_16s(rx_data[496:508], 6)
-
-        try:
-            if self._report_type == 'real':
-                __handle_report_real(data)
-            elif self._report_type == 'rich':
-                if self._is_old_protocol:
-                    __handle_report_rich_old(data)
-                else:
-                    __handle_report_rich(data)
-            else:
-                if self._is_old_protocol:
-                    __handle_report_normal_old(data)
-                else:
-                    __handle_report_normal(data)
-        except Exception as e:
-            logger.error(e)
+                self._report_count_changed_callback()
+            self._count = count
+        if length >= 312:
+            world_offset = [round(v, 3 if i < 3 else 6) for i, v in enumerate(fields['world_offset'])]
+            if math.inf not in world_offset and -math.inf not in world_offset and not (10 <= self._error_code <= 17):
+                self._world_offset = world_offset
+        if length >= 314:
+            self._cgpio_reset_enable, self._tgpio_reset_enable = fields['cgpio_reset_enable'], fields['tgpio_reset_enable']
+        if length >= 417:
+            self._is_simulation_robot = bool(fields['is_simulation_robot'])
+        if length >= 482:
+            iden_progress = fields['iden_progress']
+            if iden_progress != self._iden_progress:
+                self._iden_progress = iden_progress
+                self._report_iden_progress_changed_callback()
+        if length >= 494:
+            pose_aa = fields['pose_aa']
+            for i in range(len(pose_aa)):
+                pose_aa[i] = filter_invaild_number(pose_aa[i], 6, default=self._pose_aa[i])
+            self._pose_aa = self._position[:3] + pose_aa
+        if length >= 495:
+            mode_flags = fields['mode_flags']
+            self._is_reduced_mode = mode_flags & 0x01
+            self._is_fence_mode = (mode_flags >> 1) & 0x01
+            self._is_report_current = (mode_flags >> 2) & 0x01  # 针对get_report_tau_or_i的结果
+            self._is_approx_motion = (mode_flags >> 3) & 0x01
+            self._is_cart_continuous = (mode_flags >> 4) & 0x01
+        if length >= 496:
+            self._reduced_mode_is_on = fields['reduced_mode_is_on']
+        if not self._lazy_report:
+            self._report_view.resolve_all()
+
+    def _handle_report_rich_motion(self, fields):
+        (self._tcp_jerk,
+         self._min_tcp_acc,
+         self._max_tcp_acc,
+         self._min_tcp_speed,
+         self._max_tcp_speed) = fields['trs_msg']
+        (self._joint_jerk,
+         self._min_joint_acc,
+         self._max_joint_acc,
+         self._min_joint_speed,
+         self._max_joint_speed) = fields['p2p_msg']
+        self._rot_jerk, self._max_rot_acc = fields['rot_msg']
+
+    def _handle_report_rich_speeds(self, fields):
+        speeds = fields['speeds']
+        self._realtime_tcp_speed = speeds[0]
+        self._realtime_joint_speeds = speeds[1:]
+
+    def _handle_report_rich_collision(self, fields):
+        self._is_collision_detection = fields['is_collision_detection']
+        self._collision_tool_type = fields['collision_tool_type']
+        self._collision_tool_params = fields['collision_tool_params']
+
+    def _handle_report_rich_power(self, fields):
+        self._voltages = [x / 100 for x in fields['voltages']]
+        self._currents = fields['currents']
+
+    def _handle_report_rich_cgpio(self, fields):
+        cgpio_states = fields['cgpio_digitals'] + fields['cgpio_analogs']
+        cgpio_states[6:10] = [x / 4095.0 * 10.0 for x in cgpio_states[6:10]]
+        cgpio_states.append(fields['cgpio_input_conf'])
+        cgpio_states.append(fields['cgpio_output_conf'])
+        if self._control_box_type_is_1300 and 'cgpio_input_conf2' in fields:
+            cgpio_states[-2].extend(fields['cgpio_input_conf2'])
+            cgpio_states[-1].extend(fields['cgpio_output_conf2'])
+        self._cgpio_states = cgpio_states
+
+    def _handle_report_rich_ft(self, fields):
+        # FT_SENSOR
+        self._ft_ext_force = fields['ft_ext_force']
+        self._ft_raw_force = fields['ft_raw_force']
+
+    def _handle_report_rich_boundary(self, fields):
+        self._reduced_tcp_boundary = fields['reduced_tcp_boundary']
 
     def _auto_get_report_thread(self):
         logger.debug('get report thread start')
@@ -2029,8 +2322,12 @@ class Base(BaseObject, Events):
         return True
 
     @xarm_is_connected(_type='get')
+    @xarm_cached()
     def get_version(self):
         ret = self.arm_cmd.get_version()
+        return self._handle_get_version_result(ret)
+
+    def _handle_get_version_result(self, ret):
         ret[0] = self._check_code(ret[0])
         if ret[0] == 0:
             version = ''.join(list(map(chr, ret[1:])))
@@ -2038,6 +2335,7 @@ class Base(BaseObject, Events):
         return ret[0], self._version
 
     @xarm_is_connected(_type='get')
+    @xarm_cached()
     def get_robot_sn(self):
         ret = self.arm_cmd.get_robot_sn()
         ret[0] = self._check_code(ret[0])
@@ -2057,10 +2355,30 @@ class Base(BaseObject, Events):
         ret[0] = self._check_code(ret[0])
         return ret[0], ret[1]
 
+    def _report_is_fresh(self, error_code=False, location=False):
+        """
+        The values of the last report can stand for a request (report_getters): the report is younger than
+        report_max_age and was received after the last reply of the control connection, so the effect of the
+        previous command (set_state, clean_error, a move, ...) is in it
+        :param error_code: the error/warn code is needed, only carried by the normal/rich report
+        :param location: the position/angles are needed, not updated by the report while a servo has an error
+        """
+        if not self._report_getters or (error_code and self._report_type == 'real') \
+                or (location and 0 < self._error_code <= 17):
+            return False
+        update_time = self._report_update_time
+        return self.reported and update_time > self.arm_cmd.last_comm_time \
+            and time.monotonic() - update_time <= self._report_max_age
+
     @xarm_is_connected(_type='get')
     def get_position(self, is_radian=None):
-        is_radian = self._default_is_radian if is_radian is None else is_radian
+        if self._report_is_fresh(location=True):
+            return self._handle_get_position_result([0] + self._position, is_radian)
         ret = self.arm_cmd.get_tcp_pose()
+        return self._handle_get_position_result(ret, is_radian)
+
+    def _handle_get_position_result(self, ret, is_radian=None):
+        is_radian = self._default_is_radian if is_radian is None else is_radian
         ret[0] = self._check_code(ret[0])
         if ret[0] == 0 and len(ret) > 6:
             self._position = [filter_invaild_number(ret[i], 6, default=self._position[i-1]) for i in range(1, 7)]
@@ -2073,8 +2391,14 @@ class Base(BaseObject, Events):
         is_radian = self._default_is_radian if is_radian is None else is_radian
         if is_real and self.version_is_ge(1, 9, 110):
             ret = self.arm_cmd.get_joint_states(num=1)
+        elif self._report_is_fresh(location=True):
+            ret = [0] + self._angles
         else:
             ret = self.arm_cmd.get_joint_pos()
+        return self._handle_get_servo_angle_result(ret, servo_id, is_radian)
+
+    def _handle_get_servo_angle_result(self, ret, servo_id=None, is_radian=None):
+        is_radian = self._default_is_radian if is_radian is None else is_radian
         ret[0] = self._check_code(ret[0])
         if ret[0] == 0 and len(ret) > 7:
             self._angles = [filter_invaild_number(ret[i], 6, default=self._angles[i-1]) for i in range(1, 8)]
@@ -2136,7 +2460,12 @@ class Base(BaseObject, Events):
 
     @xarm_is_connected(_type='get')
     def get_state(self):
+        if self._report_is_fresh():
+            return self._handle_get_state_result([0, self._state])
         ret = self.arm_cmd.get_state()
+        return self._handle_get_state_result(ret)
+
+    def _handle_get_state_result(self, ret):
         ret[0] = self._check_code(ret[0])
         if ret[0] == 0:
             # if ret[1] != self._state:
@@ -2150,29 +2479,49 @@ class Base(BaseObject, Events):
     def set_state(self, state=0):
         _state = self._state
         ret = self.arm_cmd.set_state(state)
+        self._handle_set_state_code(ret, state)
+        self.get_state()
+        return self._handle_set_state_result(ret, state, _state)
+
+    @xarm_is_connected(_type='set')
+    def _set_state_priority(self, state):
+        # set_state on the priority lane of arm_cmd, it does not wait behind a blocking command of another thread
+        prev_state = self._state
+        ret = self.arm_cmd.set_state_priority(state)
+        self._handle_set_state_code(ret, state)
+        self._handle_get_state_result(self.arm_cmd.get_state_priority())
+        return self._handle_set_state_result(ret, state, prev_state)
+
+    def _handle_set_state_code(self, ret, state):
+        # called before the state is refreshed
         ret[0] = self._check_code(ret[0])
         if state == 4 and ret[0] == 0:
             # self._last_position[:6] = self.position
             # self._last_angles = self.angles
             self._sleep_finish_time = 0
             # self._is_sync = False
-        self.get_state()
-        if _state != self._state:
+
+    def _handle_set_state_result(self, ret, state, prev_state):
+        # called after the state was refreshed
+        if prev_state != self._state:
             self._report_state_changed_callback()
-        if self.state != 3 and (_state == 3 or self._pause_cnts > 0):
+        if self.state != 3 and (prev_state == 3 or self._pause_cnts > 0):
             with self._pause_cond:
                 self._pause_cond.notifyAll()
+        self._update_is_ready('set_state')
+        self.log_api_info('API -> set_state({}) -> code={}, state={}'.format(state, ret[0], self._state), code=ret[0])
+        return ret[0]
+
+    def _update_is_ready(self, api_name):
         if self._state in [4, 5]:
             self._sleep_finish_time = 0
             if self._is_ready:
-                pretty_print('[set_state], xArm is not ready to move', color='red')
+                pretty_print('[{}], xArm is not ready to move'.format(api_name), color='red')
             self._is_ready = False
         else:
             if not self._is_ready:
-                pretty_print('[set_state], xArm is ready to move', color='green')
+                pretty_print('[{}], xArm is ready to move'.format(api_name), color='green')
             self._is_ready = True
-        self.log_api_info('API -> set_state({}) -> code={}, state={}'.format(state, ret[0], self._state), code=ret[0])
-        return ret[0]
 
     @xarm_is_connected(_type='set')
     def set_mode(self, mode=0, detection_param=0):
@@ -2187,7 +2536,12 @@ class Base(BaseObject, Events):
 
     @xarm_is_connected(_type='get')
     def get_cmdnum(self):
+        if self._report_is_fresh():
+            return self._handle_get_cmdnum_result([0, self._cmd_num])
         ret = self.arm_cmd.get_cmdnum()
+        return self._handle_get_cmdnum_result(ret)
+
+    def _handle_get_cmdnum_result(self, ret):
         ret[0] = self._check_code(ret[0])
         if ret[0] == 0:
             if ret[1] != self._cmd_num:
@@ -2198,7 +2552,12 @@ class Base(BaseObject, Events):
 
     @xarm_is_connected(_type='get')
     def get_err_warn_code(self, show=False, lang='en'):
+        if self._report_is_fresh(error_code=True):
+            return self._handle_get_err_warn_code_result([0, self._error_code, self._warn_code], show=show, lang=lang)
         ret = self.arm_cmd.get_err_code()
+        return self._handle_get_err_warn_code_result(ret, show=show, lang=lang)
+
+    def _handle_get_err_warn_code_result(self, ret, show=False, lang='en'):
         lang = lang if lang == 'cn' else 'en'
         ret[0] = self._check_code(ret[0])
         if ret[0] == 0:
@@ -2234,15 +2593,7 @@ class Base(BaseObject, Events):
     def clean_error(self):
         ret = self.arm_cmd.clean_err()
         self.get_state()
-        if self._state in [4, 5]:
-            self._sleep_finish_time = 0
-            if self._is_ready:
-                pretty_print('[clean_error], xArm is not ready to move', color='red')
-            self._is_ready = False
-        else:
-            if not self._is_ready:
-                pretty_print('[clean_error], xArm is ready to move', color='green')
-            self._is_ready = True
+        self._update_is_ready('clean_error')
         self.log_api_info('API -> clean_error -> code={}'.format(ret[0]), code=ret[0])
         return ret[0]
 
@@ -2264,15 +2615,7 @@ class Base(BaseObject, Events):
         if ret[0] == 0:
             self._is_ready = bool(enable)
         self.get_state()
-        if self._state in [4, 5]:
-            self._sleep_finish_time = 0
-            if self._is_ready:
-                pretty_print('[motion_enable], xArm is not ready to move', color='red')
-            self._is_ready = False
-        else:
-            if not self._is_ready:
-                pretty_print('[motion_enable], xArm is ready to move', color='green')
-            self._is_ready = True
+        self._update_is_ready('motion_enable')
         self.log_api_info('API -> motion_enable -> code={}'.format(ret[0]), code=ret[0])
         return ret[0]
     
@@ -2293,88 +2636,38 @@ class Base(BaseObject, Events):
         self._fb_transid_result_map.pop(trans_id, -1)
     
     def _wait_feedback(self, timeout=None, trans_id=-1, ignore_log=False):
-        if timeout is not None:
-            expired = time.monotonic() + timeout + (self._sleep_finish_time if self._sleep_finish_time > time.monotonic() else 0)
-        else:
-            expired = 0
-        state5_cnt = 0
-        while timeout is None or time.monotonic() < expired:
-            if not self.connected:
-                self._fb_transid_result_map.clear()
-                if not ignore_log:
-                    self.log_api_info('wait_feedback, xarm is disconnect', code=APIState.NOT_CONNECTED)
-                return APIState.NOT_CONNECTED, -1
-            if self.error_code != 0:
-                self._fb_transid_result_map.clear()
-                if not ignore_log:
-                    self.log_api_info('wait_feedback, xarm has error, error={}'.format(self.error_code), code=APIState.HAS_ERROR)
-                return APIState.HAS_ERROR, -1
-            code, state = self.get_state()
-            if code != 0:
-                return code, -1
-            if state >= 4:
-                self._sleep_finish_time = 0
-                if state == 5:
-                    state5_cnt += 1
-                if state != 5 or state5_cnt >= 20:
-                    self._fb_transid_result_map.clear()
-                    if not ignore_log:
-                        self.log_api_info('wait_feedback, xarm is stop, state={}'.format(state), code=APIState.EMERGENCY_STOP)
-                    return APIState.EMERGENCY_STOP, -1
-            else:
-                state5_cnt = 0
-            if trans_id in self._fb_transid_result_map:
-                return 0, self._fb_transid_result_map.pop(trans_id, -1)
+        waiter = MoveWaiter(self, timeout, trans_id, ignore_log=ignore_log)
+        reconnect_count = self._reconnect_count
+        while waiter.alive:
+            if reconnect_count != self._reconnect_count:
+                # the feedback of the old connection is lost, wait for the state instead
+                return self.wait_move(waiter.remaining()), -1
+            if not self.connected and self._can_reconnect:
+                time.sleep(0.05)
+                continue
+            code = waiter.check()
+            if code is None:
+                code = waiter.update(*self.get_state())
+            if code is not None:
+                return code, waiter.result
             time.sleep(0.05)
         return APIState.WAIT_FINISH_TIMEOUT, -1
     
     def wait_move(self, timeout=None, trans_id=-1):
         if self._support_feedback and trans_id > 0:
             return self._wait_feedback(timeout, trans_id)[0]
-        if timeout is not None:
-            expired = time.monotonic() + timeout + (self._sleep_finish_time if self._sleep_finish_time > time.monotonic() else 0)
-        else:
-            expired = 0
-        _, state = self.get_state()
-        cnt = 0
-        state5_cnt = 0
-        max_cnt = 2 if _ == 0 and state == 1 else 10
-        while timeout is None or time.monotonic() < expired:
-            if not self.connected:
-                self.log_api_info('wait_move, xarm is disconnect', code=APIState.NOT_CONNECTED)
-                return APIState.NOT_CONNECTED
-            if self.error_code != 0:
-                self.log_api_info('wait_move, xarm has error, error={}'.format(self.error_code), code=APIState.HAS_ERROR)
-                return APIState.HAS_ERROR
-            if self.mode != 0 and self.mode != 11:
-                return 0
-            code, state = self.get_state()
-            if code != 0:
-                return code
-            if state >= 4:
-                self._sleep_finish_time = 0
-                if state == 5:
-                    state5_cnt += 1
-                if state != 5 or state5_cnt >= 20:
-                    self.log_api_info('wait_move, xarm is stop, state={}'.format(state), code=APIState.EMERGENCY_STOP)
-                    return APIState.EMERGENCY_STOP
-            else:
-                state5_cnt = 0
-            if time.monotonic() < self._sleep_finish_time or state == 3:
-                cnt = 0
-                max_cnt = 2 if state == 3 else max_cnt
-                time.sleep(0.05)
-                continue
-            if state == 0 or state == 1:
-                cnt = 0
-                max_cnt = 2
+        waiter = MoveWaiter(self, timeout)
+        waiter.start(*self.get_state())
+        while waiter.alive:
+            if not self.connected and self._can_reconnect:
                 time.sleep(0.05)
                 continue
-            else:
-                cnt += 1
-                if cnt >= max_cnt:
-                    return 0
-                time.sleep(0.05)
+            code = waiter.check()
+            if code is None:
+                code = waiter.update(*self.get_state())
+            if code is not None:
+                return code
+            time.sleep(0.05)
         return APIState.WAIT_FINISH_TIMEOUT
 
     @xarm_is_connected(_type='set')
@@ -2547,6 +2840,7 @@ class Base(BaseObject, Events):
     def set_only_check_type(self, only_check_type):
         self._only_check_type = only_check_type if only_check_type in [0, 1, 2, 3] else 0
 
+    @xarm_cached(ttl=60)
     def get_dh_params(self):
         ret = self.arm_cmd.get_dh_params()
         ret[0] = self._check_code(ret[0])
@@ -2557,10 +2851,12 @@ class Base(BaseObject, Events):
             dh_params.extend([0] * (28 - len(dh_params)))
         ret = self.arm_cmd.set_dh_params(dh_params, flag)
         ret[0] = self._check_code(ret[0])
+        if self._getter_cache is not None:
+            self._getter_cache.invalidate('get_dh_params')
         return ret[0]
     
     def _feedback_thread_handle(self):
-        while self.connected:
+        while self.connected or self._can_reconnect:
             try:
                 data = self._feedback_que.get(timeout=1)
             except:
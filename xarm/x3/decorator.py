@@ -94,6 +94,34 @@ def xarm_is_not_simulation_mode(ret=0):
     return _xarm_is_not_simulation_mode
 
 
+def xarm_cached(ttl=None, error_ttl=0):
+    """
+    Cache the (code, value) result of a getter in self._getter_cache, keyed by the getter name and its arguments
+    :param ttl: seconds a successful result is kept, None: until invalidated (reconnect, setter, ...)
+    :param error_ttl: seconds a failed result is kept, 0: not cached
+    """
+    def _xarm_cached(func):
+        name = func.__name__
+
+        @functools.wraps(func)
+        def decorator(self, *args, **kwargs):
+            cache = self._getter_cache
+            if cache is None:
+                return func(self, *args, **kwargs)
+            key = (name,) + args + tuple(sorted(kwargs.items())) if kwargs else (name,) + args
+            hit, ret = cache.get(key)
+            if not hit:
+                ret = func(self, *args, **kwargs)
+                if ret[0] == 0:
+                    cache.put(key, ret, ttl)
+                elif error_ttl > 0:
+                    cache.put(key, ret, error_ttl)
+            # the caller may modify the returned lists
+            return tuple(list(item) if isinstance(item, list) else item for item in ret)
+        return decorator
+    return _xarm_cached
+
+
 def api_log(func):
     @functools.wraps(func)
     def decorator(self, *args, **kwargs):
@@ -11,7 +11,7 @@ from ..core.utils.log import logger
 from ..core.config.x_config import XCONF
 from .code import APIState
 from .base import Base
-from .decorator import xarm_is_connected, xarm_is_ready, xarm_wait_until_not_pause, xarm_is_not_simulation_mode, xarm_wait_until_cmdnum_lt_max
+from .decorator import xarm_is_connected, xarm_is_ready, xarm_wait_until_not_pause, xarm_is_not_simulation_mode, xarm_wait_until_cmdnum_lt_max, xarm_cached
 
 
 class GPIO(Base):
@@ -47,6 +47,7 @@ class GPIO(Base):
     #     return ret[0], ret[1]
 
     @xarm_is_connected(_type='get')
+    @xarm_cached(ttl=10, error_ttl=1)
     def get_tgpio_version(self):
         versions = ['*', '*', '*']
         ret1 = self.arm_cmd.tgpio_addr_r16(0x0801)
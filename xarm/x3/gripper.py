@@ -13,7 +13,7 @@ from ..core.utils.log import logger
 from ..core.utils import convert
 from .code import APIState
 from .gpio import GPIO
-from .decorator import xarm_is_connected, xarm_wait_until_not_pause, xarm_is_not_simulation_mode
+from .decorator import xarm_is_connected, xarm_wait_until_not_pause, xarm_is_not_simulation_mode, xarm_cached
 
 
 class Gripper(GPIO):
@@ -51,6 +51,7 @@ class Gripper(GPIO):
 
     @xarm_is_connected(_type='get')
     @xarm_is_not_simulation_mode(ret=(0, '*.*.*'))
+    @xarm_cached(ttl=10, error_ttl=1)
     def get_gripper_version(self):
         code = self.checkset_modbus_baud(self._default_gripper_baud)
         if code != 0:
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2023, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+import time
+import threading
+from ..core.config.x_config import XCONF
+from ..core.utils.log import logger
+
+# largest quantity of one read request of the standard Modbus TCP (coils/discrete inputs, registers)
+MAX_READ_BITS = 2000
+MAX_READ_REGISTERS = 125
+
+
+class ModbusGroup(object):
+    __slots__ = ('name', 'func_code', 'addr', 'quantity', 'interval', 'is_signed', 'callback',
+                 'next_time', 'values', 'update_time', 'code')
+
+    def __init__(self, name, func_code, addr, quantity, interval, is_signed=False, callback=None):
+        self.name = name
+        self.func_code = func_code
+        self.addr = addr
+        self.quantity = quantity
+        self.interval = interval
+        self.is_signed = is_signed
+        self.callback = callback
+        self.next_time = 0
+        self.values = None
+        self.update_time = 0
+        self.code = 0
+
+    @property
+    def end(self):
+        return self.addr + self.quantity
+
+
+class ModbusPoller(object):
+    """
+    Poll groups of coils/discrete inputs/registers of the standard Modbus TCP at their own rates
+    The groups due at the same time are read together: per function code, the adjacent or overlapping ranges
+    (or separated by at most max_gap addresses) are merged into the fewest requests, the replies are decoded
+    into a shared snapshot {name: values} and the callbacks are called when the values of a group changed.
+
+    :param arm: the XArm (or any object with read_coil_bits/read_input_bits/read_holding_registers/
+        read_input_registers)
+    :param max_gap: the largest number of unused addresses read to merge two ranges, default is 8
+    """
+    FUNC_CODES = (0x01, 0x02, 0x03, 0x04)
+
+    def __init__(self, arm, max_gap=8):
+        self._arm = arm
+        self._max_gap = max_gap
+        self._groups = {}
+        self._lock = threading.Lock()
+        self._callbacks = []
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.requests = 0
+
+    def add_group(self, name, func_code, addr, quantity, interval, is_signed=False, callback=None):
+        """
+        :param name: key of the group in the snapshot
+        :param func_code: 0x01 (coils), 0x02 (discrete inputs), 0x03 (holding registers), 0x04 (input registers)
+        :param addr: the starting address
+        :param quantity: number of coils/registers
+        :param interval: polling period (seconds)
+        :param is_signed: convert the registers into a signed form
+        :param callback: called with (name, values) when the values of the group changed
+        :return: True/False
+        """
+        limit = MAX_READ_BITS if func_code <= 0x02 else MAX_READ_REGISTERS
+        if func_code not in self.FUNC_CODES or quantity <= 0 or quantity > limit or interval <= 0:
+            logger.error('invalid modbus group, name={}, func_code={}, quantity={}, interval={}'.format(
+                name, func_code, quantity, interval))
+            return False
+        with self._lock:
+            self._groups[name] = ModbusGroup(name, func_code, addr, quantity, interval, is_signed, callback)
+        return True
+
+    def remove_group(self, name):
+        with self._lock:
+            return self._groups.pop(name, None) is not None
+
+    def register_change_callback(self, callback):
+        """callback: called with (name, values) when the values of any group changed"""
+        if callable(callback) and callback not in self._callbacks:
+            self._callbacks.append(callback)
+            return True
+        return False
+
+    def release_change_callback(self, callback=None):
+        if callback is None:
+            self._callbacks.clear()
+        elif callback in self._callbacks:
+            self._callbacks.remove(callback)
+        return True
+
+    def snapshot(self):
+        """:return: {name: values (tuple, None before the first successful read)}"""
+        with self._lock:
+            return {name: group.values for name, group in self._groups.items()}
+
+    def get(self, name):
+        """:return: (code, values, update time (time.monotonic)) of the group"""
+        with self._lock:
+            group = self._groups.get(name)
+            if group is None:
+                return -1, None, 0
+            return group.code, group.values, group.update_time
+
+    def merge(self, groups):
+        """
+        Merge the ranges of the groups into read requests
+        :return: [(func_code, addr, quantity, [groups]), ...]
+        """
+        spans = []
+        for func_code in self.FUNC_CODES:
+            limit = MAX_READ_BITS if func_code <= 0x02 else MAX_READ_REGISTERS
+            span = None
+            for group in sorted((g for g in groups if g.func_code == func_code), key=lambda g: g.addr):
+                if span is not None and group.addr <= span[1] + self._max_gap \
+                        and max(span[1], group.end) - span[0] <= limit:
+                    span[1] = max(span[1], group.end)
+                    span[2].append(group)
+                    continue
+                span = [group.addr, group.end, [group]]
+                spans.append((func_code, span))
+        return [(func_code, span[0], span[1] - span[0], span[2]) for func_code, span in spans]
+
+    def _read(self, func_code, addr, quantity):
+        if func_code == 0x01:
+            return self._arm.read_coil_bits(addr, quantity)
+        elif func_code == 0x02:
+            return self._arm.read_input_bits(addr, quantity)
+        elif func_code == 0x03:
+            return self._arm.read_holding_registers(addr, quantity)
+        else:
+            return self._arm.read_input_registers(addr, quantity)
+
+    def poll(self, names=None):
+        """
+        Read the groups (all the groups if names is None) now, with the fewest requests
+        :return: number of requests
+        """
+        with self._lock:
+            groups = [group for name, group in self._groups.items() if names is None or name in names]
+        requests = self.merge(groups)
+        changed = []
+        for func_code, addr, quantity, span_groups in requests:
+            code, data = self._read(func_code, addr, quantity)
+            if code == 0 and len(data) != quantity:
+                # the raw reply is returned when its length does not match
+                code = XCONF.UxbusState.ERR_LENG
+            now = time.monotonic()
+            with self._lock:
+                for group in span_groups:
+                    if code != 0:
+                        if group.code != code:
+                            logger.warning('modbus poll failed, name={}, code={}'.format(group.name, code))
+                        group.code = code
+                        continue
+                    values = data[group.addr - addr:group.end - addr]
+                    if group.is_signed:
+                        values = [v - 0x10000 if v & 0x8000 else v for v in values]
+                    values = tuple(values)
+                    group.code = 0
+                    group.update_time = now
+                    if values != group.values:
+                        group.values = values
+                        changed.append(group)
+        self.requests += len(requests)
+        for group in changed:
+            for callback in ([group.callback] if group.callback else []) + self._callbacks:
+                try:
+                    callback(group.name, group.values)
+                except Exception as e:
+                    logger.error('modbus poller callback exception: {}'.format(e))
+        return len(requests)
+
+    def _poll_thread(self):
+        while not self._stop_event.is_set():
+            now = time.monotonic()
+            due = []
+            with self._lock:
+                for group in self._groups.values():
+                    if group.next_time <= now:
+                        due.append(group.name)
+                        group.next_time += group.interval
+                        if group.next_time <= now:
+                            # behind schedule (slow poll), no catch-up burst
+                            group.next_time = now + group.interval
+            if due and getattr(self._arm, 'connected', True):
+                self.poll(due)
+            with self._lock:
+                next_time = min([group.next_time for group in self._groups.values()], default=now + 0.1)
+            self._stop_event.wait(max(next_time - time.monotonic(), 0.001))
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._poll_thread, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(1)
+        self._thread = None
@@ -7,6 +7,7 @@
 # Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
 from .base import Base
 from .decorator import xarm_is_connected
+from .modbus_poller import ModbusPoller
 
 
 class ModbusTcp(Base):
@@ -82,3 +83,6 @@ class ModbusTcp(Base):
         func_code: 0x17
         """
         return self.arm_cmd.write_and_read_holding_registers(r_addr, r_quantity, w_addr, w_regs, is_signed)
+
+    def create_modbus_poller(self, max_gap=8):
+        return ModbusPoller(self, max_gap=max_gap)
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2023, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+import time
+from .code import APIState
+
+
+class MotionRequest(object):
+    """
+    A move of set_position/set_servo_angle, built by XArm._prepare_position/_prepare_servo_angle (the part before
+    the request) and completed by XArm._handle_motion_result/_update_motion_params (the part after the reply)
+    Shared by XArm and AsyncXArmAPI, they only differ by the I/O in between: the limit check (check=True), the
+    command (XArm._start_motion, a coroutine on AsyncUxbusCmdTcp) and the wait.
+    """
+    __slots__ = ('name', 'target', 'is_joint', 'relative', 'check', 'speed', 'acc', 'mvtime', 'info',
+                 'only_check_type', 'wait', 'timeout', 'is_pop', 'kwargs', 'cmd', 'cmd_args', 'cmd_kwargs',
+                 'feedback_key', 'studio_wait', 'trans_id')
+
+    def __init__(self, name, target, is_joint, relative, speed, acc, mvtime, info, wait, timeout, kwargs,
+                 only_check_type=0, check=False, is_pop=True):
+        self.name = name
+        # the pose (or joints) sent, the last used one once the arm accepted an absolute move
+        self.target = target
+        self.is_joint = is_joint
+        # the relative command of the firmware is used (the target is an offset)
+        self.relative = relative
+        self.check = check
+        self.speed = speed
+        self.acc = acc
+        self.mvtime = mvtime
+        self.info = info
+        self.only_check_type = only_check_type
+        self.wait = wait
+        self.timeout = timeout
+        self.is_pop = is_pop
+        self.kwargs = kwargs
+        # the command of arm_cmd, feedback_key is filled by XArm._start_motion if the command has one
+        self.cmd = None
+        self.cmd_args = ()
+        self.cmd_kwargs = {}
+        self.feedback_key = ''
+        self.studio_wait = False
+        self.trans_id = -1
+
+    def set_command(self, cmd, *args, **kwargs):
+        self.cmd = cmd
+        self.cmd_args = args
+        self.cmd_kwargs = kwargs
+
+
+class MoveWaiter(object):
+    """
+    The checks of wait_move between two reads of the state, shared by XArm and AsyncXArmAPI which only differ by
+    how they read the state and sleep
+    check() is called before the read and update(code, state) after it, both return the code of the wait or None
+    to go on (sleep and read again) while alive.
+    :param trans_id: > 0: wait for the feedback of this transaction, else until the state says the motion is done
+    :param ignore_log: do not log the failures
+    """
+    def __init__(self, arm, timeout=None, trans_id=-1, ignore_log=False):
+        now = time.monotonic()
+        self.arm = arm
+        self.timeout = timeout
+        self.expired = 0 if timeout is None else \
+            now + timeout + (arm._sleep_finish_time if arm._sleep_finish_time > now else 0)
+        self.trans_id = trans_id
+        self.use_feedback = trans_id > 0
+        self.ignore_log = ignore_log
+        # the feedback result of trans_id once it arrived
+        self.result = -1
+        self._name = 'wait_feedback' if self.use_feedback else 'wait_move'
+        self._cnt = 0
+        self._state5_cnt = 0
+        self._max_cnt = 10
+
+    @property
+    def alive(self):
+        return self.timeout is None or time.monotonic() < self.expired
+
+    def remaining(self):
+        return None if self.timeout is None else max(self.expired - time.monotonic(), 0)
+
+    def start(self, code, state):
+        # the state read before the wait (not for the feedback)
+        self._max_cnt = 2 if code == 0 and state == 1 else 10
+
+    def check(self):
+        arm = self.arm
+        if not arm.connected:
+            return self._fail(APIState.NOT_CONNECTED, 'xarm is disconnect')
+        if arm.error_code != 0:
+            return self._fail(APIState.HAS_ERROR, 'xarm has error, error={}'.format(arm.error_code))
+        if not self.use_feedback and arm.mode != 0 and arm.mode != 11:
+            return 0
+        return None
+
+    def update(self, code, state):
+        if code != 0:
+            return code
+        arm = self.arm
+        if state >= 4:
+            arm._sleep_finish_time = 0
+            if state == 5:
+                self._state5_cnt += 1
+            if state != 5 or self._state5_cnt >= 20:
+                return self._fail(APIState.EMERGENCY_STOP, 'xarm is stop, state={}'.format(state))
+        else:
+            self._state5_cnt = 0
+        if self.use_feedback:
+            if self.trans_id in arm._fb_transid_result_map:
+                self.result = arm._fb_transid_result_map.pop(self.trans_id, -1)
+                return 0
+        elif time.monotonic() < arm._sleep_finish_time or state == 3:
+            self._cnt = 0
+            self._max_cnt = 2 if state == 3 else self._max_cnt
+        elif state == 0 or state == 1:
+            self._cnt = 0
+            self._max_cnt = 2
+        else:
+            self._cnt += 1
+            if self._cnt >= self._max_cnt:
+                return 0
+        return None
+
+    def _fail(self, code, msg):
+        if self.use_feedback:
+            self.arm._fb_transid_result_map.clear()
+        if not self.ignore_log:
+            self.arm.log_api_info('{}, {}'.format(self._name, msg), code=code)
+        return code
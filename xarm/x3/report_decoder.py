@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2023, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+import re
+import struct
+import threading
+
+# Layouts of the report frames, a field is (name, code, count)
+#   f: fp32 (little-endian), B: u8, b: i8, s: bytes (count is the size), x: padding (count bytes)
+#   H/h/I: u16/i16/u32, big-endian like the rest of the integers of the protocol
+# A segment is (the frame length it needs, fields), a decoder holds the segments fitting in the frame length.
+
+REPORT_NORMAL = (
+    (145, (
+        ('length', 'I', 1), ('state_mode', 'B', 1), ('cmd_num', 'H', 1),
+        ('angles', 'f', 7), ('pose', 'f', 6), ('torque', 'f', 7),
+        ('mtbrake', 'B', 1), ('mtable', 'B', 1), ('error_code', 'B', 1), ('warn_code', 'B', 1),
+        ('pose_offset', 'f', 6), ('tcp_load', 'f', 4), ('collis_sens', 'B', 1), ('teach_sens', 'B', 1),
+        ('gravity_direction', 'f', 3),
+    )),
+)
+
+REPORT_RICH = REPORT_NORMAL + (
+    (245, (
+        ('arm_type', 'B', 1), ('arm_axis', 'B', 1), ('arm_master_id', 'B', 1), ('arm_slave_id', 'B', 1),
+        ('arm_motor_tid', 'B', 1), ('arm_motor_fid', 'B', 1), ('version', 's', 29), ('', 'x', 1),
+        ('trs_msg', 'f', 5), ('p2p_msg', 'f', 5), ('rot_msg', 'f', 2), ('servo_codes', 'B', 16),
+    )),
+    (252, (('temperatures', 'b', 7),)),
+    (284, (('speeds', 'f', 8),)),
+    (288, (('count', 'I', 1),)),
+    (312, (('world_offset', 'f', 6),)),
+    (314, (('cgpio_reset_enable', 'B', 1), ('tgpio_reset_enable', 'B', 1))),
+    (417, (
+        ('is_simulation_robot', 'B', 1), ('is_collision_detection', 'B', 1), ('collision_tool_type', 'B', 1),
+        ('collision_tool_params', 'f', 6), ('voltages', 'H', 7), ('currents', 'f', 7),
+        ('cgpio_digitals', 'B', 2), ('cgpio_analogs', 'H', 8), ('cgpio_input_conf', 'B', 8),
+        ('cgpio_output_conf', 'B', 8),
+    )),
+    (433, (('cgpio_input_conf2', 'B', 8), ('cgpio_output_conf2', 'B', 8))),
+    (481, (('ft_ext_force', 'f', 6), ('ft_raw_force', 'f', 6))),
+    (482, (('iden_progress', 'B', 1),)),
+    (494, (('pose_aa', 'f', 3),)),
+    (495, (('mode_flags', 'B', 1),)),
+    (496, (('reduced_mode_is_on', 'B', 1),)),
+    (508, (('reduced_tcp_boundary', 'h', 6),)),
+)
+
+REPORT_REAL = (
+    (87, (
+        ('length', 'I', 1), ('state_mode', 'B', 1), ('cmd_num', 'H', 1),
+        ('angles', 'f', 7), ('pose', 'f', 6), ('torque', 'f', 7),
+    )),
+    (135, (('ft_ext_force', 'f', 6), ('ft_raw_force', 'f', 6))),
+)
+
+REPORT_NORMAL_OLD = (
+    (87, (
+        ('length', 'I', 1), ('state', 'B', 1), ('mtbrake', 'B', 1), ('mtable', 'B', 1),
+        ('error_code', 'B', 1), ('warn_code', 'B', 1),
+        ('angles', 'f', 7), ('pose', 'f', 6), ('cmd_num', 'H', 1), ('pose_offset', 'f', 6),
+    )),
+)
+
+REPORT_RICH_OLD = REPORT_NORMAL_OLD + (
+    (187, (
+        ('arm_type', 'B', 1), ('arm_axis', 'B', 1), ('arm_master_id', 'B', 1), ('arm_slave_id', 'B', 1),
+        ('arm_motor_tid', 'B', 1), ('arm_motor_fid', 'B', 1), ('version', 's', 29), ('', 'x', 1),
+        ('trs_msg', 'f', 5), ('p2p_msg', 'f', 5), ('rot_msg', 'f', 2), ('sv3_msg', 'H', 8),
+    )),
+)
+
+LAYOUTS = {
+    ('normal', False): REPORT_NORMAL,
+    ('rich', False): REPORT_RICH,
+    ('real', False): REPORT_REAL,
+    ('real', True): REPORT_REAL,
+    ('normal', True): REPORT_NORMAL_OLD,
+    ('rich', True): REPORT_RICH_OLD,
+}
+
+# the big-endian integers are unpacked little-endian (one format for the whole frame) and swapped back,
+# expressions of the value v
+_SWAPS = {
+    'H': '(({v} >> 8) | ({v} & 0xFF) << 8)',
+    'h': '((({v} >> 8 | ({v} & 0xFF) << 8) ^ 0x8000) - 0x8000)',
+    'I': '(({v} >> 24) | ({v} >> 8 & 0xFF00) | ({v} & 0xFF00) << 8 | ({v} & 0xFF) << 24)',
+}
+
+
+class ReportDecoder(object):
+    """
+    Decoder of the report frames of one layout and frame length (only the fields of names if not None)
+    All the fields are read with one precompiled struct.unpack_from, the values are then put in a dict
+    {name: value (list for the arrays)} by a function generated for the layout (a single dict display).
+    """
+    def __init__(self, layout, length, names=None):
+        fmt = '<'
+        items = []
+        index = 0
+        self.size = 0
+        self.names = []
+        for min_length, fields in layout:
+            if length < min_length:
+                break
+            self.size = min_length
+            for name, code, count in fields:
+                if code == 'x' or (names is not None and name not in names):
+                    # skipped, the trailing padding is dropped below
+                    fmt += '{}x'.format(struct.calcsize('<{}{}'.format(count, code)))
+                    continue
+                if code == 's':
+                    fmt += '{}s'.format(count)
+                    items.append('{!r}: v[{}]'.format(name, index))
+                    self.names.append(name)
+                    index += 1
+                    continue
+                fmt += '{}{}'.format(count, code.upper() if code in _SWAPS else code)
+                swap = _SWAPS.get(code, '{v}')
+                values = [swap.format(v='v[{}]'.format(i)) for i in range(index, index + count)]
+                # list displays, cheaper than list(v[start:stop]) or a comprehension
+                items.append('{!r}: {}'.format(name, values[0] if count == 1 else '[{}]'.format(', '.join(values))))
+                self.names.append(name)
+                index += count
+        self._struct = struct.Struct(re.sub(r'(\d+x)+$', '', fmt))
+        namespace = {}
+        exec('def _fields(v):\n    return {{{}}}\n'.format(', '.join(items)), namespace)
+        self._fields = namespace['_fields']
+
+    def decode(self, rx_data):
+        return self._fields(self._struct.unpack_from(rx_data))
+
+
+_decoders = {}
+
+
+def get_report_decoder(report_type, is_old_protocol, length, names=None):
+    """
+    the decoder of the layout (report type, protocol variant) for frames of length bytes, built once
+    :param names: frozenset of the fields to decode (its hash is cached), None for all of them
+    """
+    key = (report_type, bool(is_old_protocol), length, names)
+    decoder = _decoders.get(key)
+    if decoder is None:
+        decoder = _decoders[key] = ReportDecoder(LAYOUTS[(report_type, bool(is_old_protocol))], length, names)
+    return decoder
+
+
+# Fields of the rich report decoded on first read only, per group (see LazyReportView)
+RICH_LAZY_GROUPS = {
+    'motion': ('trs_msg', 'p2p_msg', 'rot_msg'),
+    'speeds': ('speeds',),
+    'collision': ('is_collision_detection', 'collision_tool_type', 'collision_tool_params'),
+    'power': ('voltages', 'currents'),
+    'cgpio': ('cgpio_digitals', 'cgpio_analogs', 'cgpio_input_conf', 'cgpio_output_conf',
+              'cgpio_input_conf2', 'cgpio_output_conf2'),
+    'ft': ('ft_ext_force', 'ft_raw_force'),
+    'boundary': ('reduced_tcp_boundary',),
+}
+# the servo codes are compared raw, only decoded when they changed
+RICH_EAGER_FIELDS = frozenset(name for _, fields in REPORT_RICH for name, code, _ in fields if code != 'x') \
+    - frozenset(name for names in RICH_LAZY_GROUPS.values() for name in names) - {'servo_codes'}
+
+
+class LazyReportView(object):
+    """
+    The raw frame of the last report, its field groups are decoded when first read for that frame
+    A newer frame drops the groups not read yet, the handler of a group is called with the fields of the group.
+
+    :param report_type: the report type of the frames
+    :param is_old_protocol: the protocol variant of the frames
+    :param groups: {group: (names, handler)}
+    """
+    def __init__(self, report_type, is_old_protocol, groups):
+        self._report_type = report_type
+        self._is_old_protocol = is_old_protocol
+        self._groups = {group: (frozenset(names), handler) for group, (names, handler) in groups.items()}
+        # the handler writes through LazyReportAttr, reentrant
+        self._lock = threading.RLock()
+        self._frame = None
+        self._decoders = {}
+        # groups carried by the frames of a length
+        self._group_sets = {}
+        self.pending = set()
+
+    def _decoder(self, group, length):
+        decoder = self._decoders.get((group, length))
+        if decoder is None:
+            names = self._groups[group][0]
+            decoder = get_report_decoder(self._report_type, self._is_old_protocol, length, names)
+            # None when no field of the group is in the frames of that length
+            decoder = self._decoders[(group, length)] = decoder if decoder.names else None
+        return decoder
+
+    def update(self, rx_data):
+        length = len(rx_data)
+        groups = self._group_sets.get(length)
+        if groups is None:
+            groups = self._group_sets[length] = frozenset(
+                group for group in self._groups if self._decoder(group, length) is not None)
+        # the report frame is a buffer of the port, reused once the next frame is read
+        frame = bytes(rx_data)
+        with self._lock:
+            self._frame = frame
+            self.pending = set(groups)
+
+    def resolve(self, group):
+        with self._lock:
+            if group not in self.pending:
+                return
+            self.pending.discard(group)
+            rx_data = self._frame
+            self._groups[group][1](self._decoder(group, len(rx_data)).decode(rx_data))
+
+    def resolve_all(self):
+        for group in list(self.pending):
+            self.resolve(group)
+
+    def clear(self):
+        with self._lock:
+            self._frame = None
+            self.pending = set()
+
+
+class LazyReportAttr(object):
+    """
+    Attribute set by a lazily decoded group of the report: reading or writing it decodes the pending group of
+    the last frame first (obj._report_view), the value is kept in the instance dict
+    """
+    __slots__ = ('group', 'name')
+
+    def __init__(self, group, name):
+        self.group = group
+        self.name = name
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        view = obj.__dict__.get('_report_view')
+        if view is not None and self.group in view.pending:
+            view.resolve(self.group)
+        return obj.__dict__[self.name]
+
+    def __set__(self, obj, value):
+        view = obj.__dict__.get('_report_view')
+        if view is not None and self.group in view.pending:
+            view.resolve(self.group)
+        obj.__dict__[self.name] = value
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2023, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+import time
+import threading
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# columns of a history row, (name, width), the values are those of the arm after the report (radians, mm)
+HISTORY_FIELDS = (
+    ('time', 1), ('angles', 7), ('position', 6), ('joints_torque', 7),
+    ('realtime_joint_speeds', 7), ('realtime_tcp_speed', 1), ('currents', 7), ('temperatures', 7),
+    ('ft_ext_force', 6), ('ft_raw_force', 6),
+)
+
+
+class ReportHistory(object):
+    """
+    Telemetry of the last reports in preallocated ring buffers (float64, fixed memory: 2 * (capacity + 1) rows)
+    The ring has one slot more than the rows kept, every row is written twice (at its slot and capacity + 1 rows
+    later), so the last n rows are always contiguous and a window is a view of the buffer, without copying.
+    The next row is written to the slot outside of all the windows before it is published.
+    Note: a view of n rows stays valid while at most capacity + 1 - n newer reports arrive (a single one for a
+        window of all the rows), copy it to keep it
+
+    :param capacity: number of reports kept
+    """
+    def __init__(self, capacity):
+        if np is None:
+            raise ImportError('the report history needs numpy')
+        self.capacity = int(capacity)
+        self._size = self.capacity + 1
+        self._columns = {}
+        width = 0
+        for name, size in HISTORY_FIELDS:
+            self._columns[name] = (width, size)
+            width += size
+        self._buffer = np.zeros((2 * self._size, width), dtype=np.float64)
+        self._lock = threading.Lock()
+        # slot of the next row, number of rows, number of rows written (a window checks it was not overwritten)
+        self._head = 0
+        self._count = 0
+        self._written = 0
+
+    @property
+    def nbytes(self):
+        return self._buffer.nbytes
+
+    def __len__(self):
+        return self._count
+
+    def append(self, row):
+        """row: the values of all the columns of HISTORY_FIELDS, in order"""
+        head = self._head
+        values = self._buffer[head]
+        values[:] = row
+        self._buffer[head + self._size] = values
+        with self._lock:
+            self._head = (head + 1) % self._size
+            self._count = min(self._count + 1, self.capacity)
+            self._written += 1
+
+    def append_arm(self, arm):
+        """append the state of the arm (Base) after a report"""
+        try:
+            self.append([time.monotonic()] + arm._angles + arm._position + arm._joints_torque
+                        + arm._realtime_joint_speeds + [arm._realtime_tcp_speed] + arm._currents + arm._temperatures
+                        + arm._ft_ext_force + arm._ft_raw_force)
+        except ValueError:
+            # a value of an unexpected size, the previous row is written again with the new time
+            self.append([time.monotonic()] + self._buffer[(self._head - 1) % self._size, 1:].tolist())
+
+    def clear(self):
+        with self._lock:
+            self._head = 0
+            self._count = 0
+            # the slots are reused from the start, the windows being searched are all stale
+            self._written += self._size
+
+    def _range(self, last, count):
+        # [start, stop) of the rows in the buffer, the newest row is at stop - 1
+        while True:
+            with self._lock:
+                stop = self._head + self._size
+                n = self._count
+                written = self._written
+            if count is not None:
+                n = min(n, max(int(count), 0))
+            start = stop - n
+            if last is None or n == 0:
+                return start, stop
+            # times are increasing, the first row not older than last seconds
+            start += int(np.searchsorted(self._buffer[start:stop, 0], time.monotonic() - last))
+            with self._lock:
+                # the oldest row of the window is overwritten by the (size - n + 1)-th row written since
+                if self._written - written <= self._size - n:
+                    return start, stop
+
+    def _view(self, name, start, stop):
+        if name not in self._columns:
+            raise KeyError('unknown history field: {}, available: {}'.format(name, list(self._columns.keys())))
+        offset, size = self._columns[name]
+        if size == 1:
+            return self._buffer[start:stop, offset]
+        return self._buffer[start:stop, offset:offset + size]
+
+    def window(self, name, last=None, count=None):
+        """
+        :param name: one of HISTORY_FIELDS
+        :param last: only the rows of the last seconds (time.monotonic), None for all
+        :param count: at most the newest count rows, None for all
+        :return: view of the rows, oldest first, shape (rows,) for time/realtime_tcp_speed else (rows, width),
+            valid while at most capacity + 1 - rows newer reports arrive
+        """
+        start, stop = self._range(last, count)
+        return self._view(name, start, stop)
+
+    def windows(self, names=None, last=None, count=None):
+        """
+        window of several fields over the same rows
+        :return: {name: view}
+        """
+        start, stop = self._range(last, count)
+        return {name: self._view(name, start, stop) for name in (names or self._columns.keys())}
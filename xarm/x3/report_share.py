@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2023, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+import time
+import struct
+from ..core.utils.log import logger
+from .report_history import HISTORY_FIELDS
+try:
+    from multiprocessing import shared_memory, resource_tracker
+except ImportError:
+    shared_memory = None
+    resource_tracker = None
+
+# Shared memory block of the reports (little endian, f64 values):
+#     header: magic(4, b'XSHM') + version(u16) + flags(u16, bit0: closed by the publisher)
+#             + capacity(u32) + values per row(u32) + size of the fields(u32)
+#             + fields ('name:width,...' utf-8, zero padded to a multiple of 8 bytes)
+#     count:  u64, number of rows published
+#     slots:  capacity * (seq(u64) + row), row k is in slot k % capacity
+# Seqlock of a slot: seq is 2k+1 while row k is written and 2k+2 once written, a reader copies the row and
+# checks seq did not change (retries otherwise), the publisher never waits for the readers.
+
+SHARE_MAGIC = b'XSHM'
+SHARE_VERSION = 1
+SHARE_FIELDS = (
+    ('time', 1), ('state', 1), ('mode', 1), ('cmd_num', 1), ('error_code', 1), ('warn_code', 1),
+) + tuple(field for field in HISTORY_FIELDS if field[0] != 'time')
+
+_HEADER = struct.Struct('<4sHHIII')
+_U64 = struct.Struct('<Q')
+_FLAG_CLOSED = 0x01
+# names (as registered to the resource tracker) of the blocks created by the publishers of this process
+_created = set()
+
+
+def _layout(fields):
+    names = ','.join('{}:{}'.format(name, width) for name, width in fields).encode('utf-8')
+    names = names.ljust((len(names) + 7) // 8 * 8, b'\0')
+    return names, _HEADER.size + len(names)
+
+
+class ReportPublisher(object):
+    """
+    Publish the state of the arm after every report to a shared memory block, read by ReportSubscriber
+    (other processes of the host) without any lock.
+    Usage:
+        arm = XArmAPI('192.168.1.185', report_share='xarm_185')
+        or
+        publisher = ReportPublisher('xarm_185', capacity=256)
+        arm = XArmAPI('192.168.1.185', report_share=publisher)
+
+    :param name: name of the shared memory block, a stale block of that name is replaced
+    :param capacity: number of rows kept for ReportSubscriber.history, default is 64
+    """
+    def __init__(self, name, capacity=64):
+        if shared_memory is None:
+            raise ImportError('the report share needs multiprocessing.shared_memory (python 3.8+)')
+        names, header_size = _layout(SHARE_FIELDS)
+        self.name = name
+        self.capacity = capacity
+        self._width = sum(width for _, width in SHARE_FIELDS)
+        self._row = struct.Struct('<{}d'.format(self._width))
+        self._slot_size = _U64.size + self._row.size
+        self._count_offset = header_size
+        self._slots_offset = header_size + _U64.size
+        size = self._slots_offset + capacity * self._slot_size
+        try:
+            self._shm = shared_memory.SharedMemory(name, create=True, size=size)
+        except FileExistsError:
+            logger.warning('shared memory {} exists, replaced'.format(name))
+            stale = shared_memory.SharedMemory(name)
+            stale.close()
+            stale.unlink()
+            self._shm = shared_memory.SharedMemory(name, create=True, size=size)
+        _created.add(self._shm._name)
+        self._buf = self._shm.buf
+        _HEADER.pack_into(self._buf, 0, SHARE_MAGIC, SHARE_VERSION, 0, capacity, self._width, len(names))
+        self._buf[_HEADER.size:header_size] = names
+        _U64.pack_into(self._buf, self._count_offset, 0)
+        self._count = 0
+        self._closed = False
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def publish(self, values):
+        """values: the values of SHARE_FIELDS in order, the arrays flattened (one writer, the report thread)"""
+        if self._closed:
+            return
+        k = self._count
+        offset = self._slots_offset + (k % self.capacity) * self._slot_size
+        buf = self._buf
+        _U64.pack_into(buf, offset, 2 * k + 1)
+        self._row.pack_into(buf, offset + _U64.size, *values)
+        _U64.pack_into(buf, offset, 2 * k + 2)
+        self._count = k + 1
+        _U64.pack_into(buf, self._count_offset, k + 1)
+
+    def publish_arm(self, arm):
+        """publish the state of the arm (Base) after a report"""
+        try:
+            self.publish([time.time(), arm._state, arm._mode, arm._cmd_num, arm._error_code, arm._warn_code]
+                         + arm._angles + arm._position + arm._joints_torque + arm._realtime_joint_speeds
+                         + [arm._realtime_tcp_speed] + arm._currents + arm._temperatures
+                         + arm._ft_ext_force + arm._ft_raw_force)
+        except struct.error as e:
+            logger.error('report share publish failed: {}'.format(e))
+
+    def close(self):
+        """mark the block closed for the readers and remove it (mapped readers keep their view)"""
+        if self._closed:
+            return
+        self._closed = True
+        flags = _HEADER.unpack_from(self._buf, 0)[2]
+        struct.pack_into('<H', self._buf, 6, flags | _FLAG_CLOSED)
+        self._buf = None
+        self._shm.close()
+        try:
+            self._shm.unlink()
+        except FileNotFoundError:
+            pass
+        _created.discard(self._shm._name)
+
+
+class ReportSubscriber(object):
+    """
+    Reader of the block of a ReportPublisher, from any process of the host
+    Usage:
+        sub = ReportSubscriber('xarm_185')
+        state = sub.latest()  # {'time': .., 'state': .., 'angles': [..], ...}, None before the first report
+        rows = sub.history(50)  # the last 50 reports, oldest first
+
+    :param name: name of the shared memory block
+    :param retries: reads of a row while the publisher writes it, default is 100
+    """
+    def __init__(self, name, retries=100):
+        if shared_memory is None:
+            raise ImportError('the report share needs multiprocessing.shared_memory (python 3.8+)')
+        self.name = name
+        self.retries = retries
+        self._shm = shared_memory.SharedMemory(name)
+        # attaching registers the block to the resource tracker of this process, which would remove it at exit,
+        # unless the block is one of a publisher of this process (its registration, removed by its unlink)
+        if self._shm._name not in _created:
+            try:
+                resource_tracker.unregister(self._shm._name, 'shared_memory')
+            except Exception:
+                pass
+        self._buf = self._shm.buf
+        magic, version, _, self.capacity, self._width, names_size = _HEADER.unpack_from(self._buf, 0)
+        if magic != SHARE_MAGIC:
+            self.close()
+            raise ValueError('{} is not a report share block'.format(name))
+        names = bytes(self._buf[_HEADER.size:_HEADER.size + names_size]).rstrip(b'\0').decode('utf-8')
+        self.fields = []
+        for item in names.split(','):
+            field, width = item.split(':')
+            self.fields.append((field, int(width)))
+        self._row = struct.Struct('<{}d'.format(self._width))
+        self._slot_size = _U64.size + self._row.size
+        self._count_offset = _HEADER.size + names_size
+        self._slots_offset = self._count_offset + _U64.size
+
+    @property
+    def alive(self):
+        """False once the publisher closed the block"""
+        return self._buf is not None and not _HEADER.unpack_from(self._buf, 0)[2] & _FLAG_CLOSED
+
+    @property
+    def count(self):
+        """number of reports published"""
+        return _U64.unpack_from(self._buf, self._count_offset)[0]
+
+    def _read(self, k):
+        # the row k, None if it was overwritten, retried while it is being written
+        offset = self._slots_offset + (k % self.capacity) * self._slot_size
+        buf = self._buf
+        for _ in range(self.retries):
+            seq = _U64.unpack_from(buf, offset)[0]
+            if seq == 2 * k + 1:
+                continue
+            if seq != 2 * k + 2:
+                return None
+            values = self._row.unpack_from(buf, offset + _U64.size)
+            if _U64.unpack_from(buf, offset)[0] == seq:
+                return values
+        return None
+
+    def to_dict(self, values):
+        """{name: value (list for the arrays)} of a row"""
+        ret = {}
+        index = 0
+        for name, width in self.fields:
+            ret[name] = values[index] if width == 1 else list(values[index:index + width])
+            index += width
+        return ret
+
+    def latest(self, raw=False):
+        """
+        :param raw: return the row (tuple of the values of fields, arrays flattened) instead of a dict
+        :return: the state of the last report, None if there is none
+        """
+        for _ in range(self.retries):
+            count = self.count
+            if count == 0:
+                return None
+            values = self._read(count - 1)
+            if values is not None:
+                return values if raw else self.to_dict(values)
+        return None
+
+    def history(self, count=None, raw=False):
+        """
+        :param count: number of reports, at most capacity - 1 (the oldest slot may be written), None for all
+        :return: [state, ...] of the last reports, oldest first
+        """
+        last = self.count
+        count = self.capacity - 1 if count is None else min(count, self.capacity - 1)
+        rows = []
+        for k in range(max(last - count, 0), last):
+            values = self._read(k)
+            if values is not None:
+                rows.append(values if raw else self.to_dict(values))
+        return rows
+
+    def close(self):
+        if self._shm is not None:
+            self._buf = None
+            self._shm.close()
+            self._shm = None
@@ -10,7 +10,7 @@ from ..core.config.x_config import XCONF
 from ..core.config.x_code import ServoError
 from ..core.utils.log import logger, pretty_print
 from .base import Base
-from .decorator import xarm_is_connected
+from .decorator import xarm_is_connected, xarm_cached
 
 
 class Servo(Base):
@@ -337,6 +337,7 @@ class Servo(Base):
     #     return ret
 
     @xarm_is_connected(_type='get')
+    @xarm_cached()
     def get_servo_version(self, servo_id=1):
         """
         获取关节版本
@@ -383,6 +384,7 @@ class Servo(Base):
             return _get_servo_version(servo_id)
 
     @xarm_is_connected(_type='get')
+    @xarm_cached()
     def get_harmonic_type(self, servo_id=1):
         """
         获取关节版本
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2023, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+import os
+import time
+import bisect
+import struct
+import threading
+from collections import deque
+from ..core.utils.log import logger
+from .report_history import HISTORY_FIELDS
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Telemetry files (little endian), in the directory of the recorder:
+#     data (.xtl):  header: magic(4, b'XTLM') + version(u16) + header size(u16) + index interval(u32)
+#                           + fields ('name:width,...' utf-8, zero padded to a multiple of 8 bytes)
+#                   record: time(f64, time.time()) + the values of the fields (f32)
+#     index (.xti): header: magic(4, b'XTLI') + version(u16)
+#                   entry:  time(f64) + record number(u64) of every index interval-th record
+# The records have a fixed size, so the data file is read as a numpy.memmap of a structured dtype, the index
+# bounds the time search to one interval of records. A file is rotated once it reaches max_bytes or max_seconds.
+
+TELEMETRY_MAGIC = b'XTLM'
+TELEMETRY_INDEX_MAGIC = b'XTLI'
+TELEMETRY_VERSION = 1
+TELEMETRY_SUFFIX = '.xtl'
+TELEMETRY_INDEX_SUFFIX = '.xti'
+
+_FILE_HEADER = struct.Struct('<4sHHI')
+_INDEX_HEADER = struct.Struct('<4sH')
+_INDEX_ENTRY = struct.Struct('<dQ')
+
+# attribute of the arm per field, the time is taken by the recorder
+_FIELD_ATTRS = {name: '_' + name for name, _ in HISTORY_FIELDS if name != 'time'}
+_FIELD_WIDTHS = dict(HISTORY_FIELDS)
+
+
+class TelemetryRecorder(object):
+    """
+    Record the values of the reports to append-only telemetry files, written by a background thread
+    Usage:
+        arm = XArmAPI('192.168.1.185', telemetry='/data/xarm')
+        or
+        recorder = TelemetryRecorder('/data/xarm', fields=('angles', 'joints_torque'), max_bytes=256 << 20)
+        arm = XArmAPI('192.168.1.185', telemetry=recorder)
+    Read the files back with TelemetryReader.
+
+    :param directory: directory of the files, created if missing
+    :param fields: names of report_history.HISTORY_FIELDS (but time, always recorded)
+    :param max_bytes: rotate the data file at this size, default is 64MB
+    :param max_seconds: rotate the data file at this age, default is 3600
+    :param index_interval: records per index entry, default is 1024
+    :param flush_interval: seconds between the writes of the background thread, default is 0.5
+    :param max_pending: records kept while the writes are late, the older ones are dropped (see dropped)
+    """
+    def __init__(self, directory, fields=('angles', 'position', 'joints_torque'), max_bytes=64 << 20,
+                 max_seconds=3600, index_interval=1024, flush_interval=0.5, max_pending=100000, prefix='telemetry'):
+        for name in fields:
+            if name not in _FIELD_ATTRS:
+                raise ValueError('unknown telemetry field: {}'.format(name))
+        self.directory = directory
+        self.fields = tuple(fields)
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.index_interval = index_interval
+        self.flush_interval = flush_interval
+        self.prefix = prefix
+        self._attrs = [(_FIELD_ATTRS[name], _FIELD_WIDTHS[name]) for name in self.fields]
+        self._record = struct.Struct('<d{}f'.format(sum(_FIELD_WIDTHS[name] for name in self.fields)))
+        self._pending = deque(maxlen=max_pending)
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._file = None
+        self._index_file = None
+        self._header_size = 0
+        self._file_records = 0
+        self._file_time = 0
+        self._thread = None
+        self._closed = False
+        self.path = None
+        self.records = 0
+        self.dropped = 0
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def record(self, values):
+        """values: (time.time(), value of the first field, ...), the arrays flattened"""
+        if self._closed:
+            return
+        if len(self._pending) == self._pending.maxlen:
+            self.dropped += 1
+        self._pending.append(values)
+        if self._thread is None:
+            self._start()
+
+    def record_arm(self, arm):
+        """record the values of the arm (Base) after a report, the report thread only copies them"""
+        values = [time.time()]
+        for attr, width in self._attrs:
+            if width == 1:
+                values.append(getattr(arm, attr))
+            else:
+                values.extend(getattr(arm, attr)[:width])
+        self.record(values)
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None and not self._closed:
+                self._thread = threading.Thread(target=self._write_thread, daemon=True)
+                self._thread.start()
+
+    def _open(self, now):
+        names = ','.join('{}:{}'.format(name, _FIELD_WIDTHS[name]) for name in self.fields).encode('utf-8')
+        header_size = (_FILE_HEADER.size + len(names) + 7) // 8 * 8
+        base = os.path.join(self.directory, '{}-{}'.format(self.prefix, time.strftime('%Y%m%d-%H%M%S', time.localtime(now))))
+        path, seq = base, 0
+        while os.path.exists(path + TELEMETRY_SUFFIX):
+            seq += 1
+            path = '{}-{}'.format(base, seq)
+        self._file = open(path + TELEMETRY_SUFFIX, 'wb')
+        self._file.write(_FILE_HEADER.pack(TELEMETRY_MAGIC, TELEMETRY_VERSION, header_size, self.index_interval))
+        self._file.write(names.ljust(header_size - _FILE_HEADER.size, b'\0'))
+        self._index_file = open(path + TELEMETRY_INDEX_SUFFIX, 'wb')
+        self._index_file.write(_INDEX_HEADER.pack(TELEMETRY_INDEX_MAGIC, TELEMETRY_VERSION))
+        self._header_size = header_size
+        self._file_records = 0
+        self._file_time = now
+        self.path = path + TELEMETRY_SUFFIX
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._index_file.close()
+            self._file = None
+            self._index_file = None
+
+    def _write(self):
+        pending = self._pending
+        if not pending:
+            return
+        data = bytearray()
+        index = bytearray()
+        pack = self._record.pack
+        while pending:
+            values = pending.popleft()
+            if self._file is not None and (self._header_size + self._file_records * self._record.size >= self.max_bytes
+                                           or values[0] - self._file_time >= self.max_seconds):
+                self._file.write(data)
+                self._index_file.write(index)
+                data, index = bytearray(), bytearray()
+                self._close_file()
+            if self._file is None:
+                self._open(values[0])
+            try:
+                record = pack(*values)
+            except struct.error as e:
+                logger.error('telemetry record dropped: {}'.format(e))
+                continue
+            if self._file_records % self.index_interval == 0:
+                index += _INDEX_ENTRY.pack(values[0], self._file_records)
+            data += record
+            self._file_records += 1
+            self.records += 1
+        self._file.write(data)
+        self._index_file.write(index)
+        self._file.flush()
+        self._index_file.flush()
+
+    def _write_thread(self):
+        while not self._closed:
+            self._event.wait(self.flush_interval)
+            try:
+                with self._lock:
+                    self._write()
+            except Exception as e:
+                logger.error('telemetry write failed: {}'.format(e))
+
+    def flush(self):
+        """write the pending records now (from the calling thread)"""
+        with self._lock:
+            self._write()
+
+    def close(self):
+        self._closed = True
+        self._event.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(5)
+        with self._lock:
+            try:
+                self._write()
+            finally:
+                self._close_file()
+
+
+class TelemetryFile(object):
+    """
+    One data file of the telemetry, its records as a numpy.memmap (time and the fields, oldest first)
+    Note: the times are those of the host clock (time.time()), expected non-decreasing within a file
+    """
+    def __init__(self, path):
+        if np is None:
+            raise ImportError('the telemetry reader needs numpy')
+        self.path = path
+        with open(path, 'rb') as f:
+            header = f.read(_FILE_HEADER.size)
+            if len(header) != _FILE_HEADER.size or _FILE_HEADER.unpack(header)[0] != TELEMETRY_MAGIC:
+                raise ValueError('{} is not a telemetry file'.format(path))
+            _, _, header_size, self.index_interval = _FILE_HEADER.unpack(header)
+            names = f.read(header_size - _FILE_HEADER.size).rstrip(b'\0').decode('utf-8')
+        self.fields = []
+        dtype = [('time', '<f8')]
+        for item in names.split(','):
+            name, width = item.split(':')
+            self.fields.append(name)
+            dtype.append((name, '<f4') if int(width) == 1 else (name, '<f4', (int(width),)))
+        self.dtype = np.dtype(dtype)
+        # a record being written (or cut by a crash) at the end is left out
+        self.count = (os.path.getsize(path) - header_size) // self.dtype.itemsize
+        self.records = np.memmap(path, dtype=self.dtype, mode='r', offset=header_size, shape=(self.count,)) \
+            if self.count > 0 else np.zeros(0, dtype=self.dtype)
+        self._index_times = []
+        self._index_numbers = []
+        index_path = path[:-len(TELEMETRY_SUFFIX)] + TELEMETRY_INDEX_SUFFIX
+        if os.path.exists(index_path):
+            with open(index_path, 'rb') as f:
+                data = f.read()
+            if data[:4] == TELEMETRY_INDEX_MAGIC:
+                for offset in range(_INDEX_HEADER.size, len(data) - _INDEX_ENTRY.size + 1, _INDEX_ENTRY.size):
+                    t, number = _INDEX_ENTRY.unpack_from(data, offset)
+                    if number < self.count:
+                        self._index_times.append(t)
+                        self._index_numbers.append(number)
+
+    @property
+    def start_time(self):
+        return float(self.records['time'][0]) if self.count else None
+
+    @property
+    def end_time(self):
+        return float(self.records['time'][-1]) if self.count else None
+
+    def _search(self, t):
+        # first record not older than t: the index gives the interval, searched in the memmap
+        i = bisect.bisect_left(self._index_times, t)
+        lo = self._index_numbers[i - 1] if i > 0 else 0
+        hi = self._index_numbers[i] if i < len(self._index_numbers) else self.count
+        return lo + int(np.searchsorted(self.records['time'][lo:hi], t))
+
+    def search(self, start=None, stop=None):
+        """:return: (first, last + 1) of the records with start <= time < stop"""
+        first = 0 if start is None else self._search(start)
+        last = self.count if stop is None else self._search(stop)
+        return first, max(first, last)
+
+    def range(self, start=None, stop=None):
+        """:return: the records with start <= time < stop, a view of the memmap"""
+        first, last = self.search(start, stop)
+        return self.records[first:last]
+
+
+class TelemetryReader(object):
+    """
+    Reader of the telemetry files of a directory (or of the given data files)
+    Usage:
+        reader = TelemetryReader('/data/xarm')
+        records = reader.read(time.time() - 3600, time.time())
+        records['time'], records['angles']  # (n,), (n, 7)
+    """
+    def __init__(self, path, prefix='telemetry'):
+        if isinstance(path, (list, tuple)):
+            paths = list(path)
+        elif os.path.isdir(path):
+            paths = [os.path.join(path, name) for name in os.listdir(path)
+                     if name.startswith(prefix) and name.endswith(TELEMETRY_SUFFIX)]
+        else:
+            paths = [path]
+        self.files = [TelemetryFile(p) for p in paths]
+        self.files = sorted([f for f in self.files if f.count], key=lambda f: f.start_time)
+
+    def ranges(self, start=None, stop=None):
+        """:return: [records of one file (memmap view), ...] with start <= time < stop"""
+        ranges = []
+        for f in self.files:
+            if (stop is not None and f.start_time >= stop) or (start is not None and f.end_time < start):
+                continue
+            records = f.range(start, stop)
+            if len(records):
+                ranges.append(records)
+        return ranges
+
+    def read(self, start=None, stop=None, fields=None):
+        """
+        :param fields: the fields to read (time is always read), None for all
+        :return: the records with start <= time < stop (copied, numpy structured array)
+        """
+        ranges = self.ranges(start, stop)
+        if fields is not None:
+            ranges = [records[['time'] + [name for name in fields if name != 'time']] for records in ranges]
+        if not ranges:
+            return np.zeros(0, dtype=self.files[0].dtype if self.files else [('time', '<f8')])
+        # the files of a recorder share the dtype, rows of other fields can not be concatenated
+        return np.concatenate([np.array(records) for records in ranges])
@@ -25,7 +25,8 @@ from .ft_sensor import FtSensor
 from .modbus_tcp import ModbusTcp
 from .parse import GcodeParser
 from .code import APIState
-from .decorator import xarm_is_connected, xarm_is_ready, xarm_wait_until_not_pause, xarm_wait_until_cmdnum_lt_max
+from .decorator import xarm_is_connected, xarm_is_ready, xarm_wait_until_not_pause, xarm_wait_until_cmdnum_lt_max, xarm_cached
+from .motion import MotionRequest
 from .utils import to_radian
 try:
     # from ..tools.blockly_tool import BlocklyTool
@@ -127,104 +128,97 @@ class XArm(Gripper, Servo, Record, RobotIQ, BaseBoard, Track, FtSensor, ModbusTc
         mvt = self._mvtime if mvtime is None else mvtime
         return spd, acc, mvt
 
-    def _set_position_absolute(self, x=None, y=None, z=None, roll=None, pitch=None, yaw=None, radius=None,
-                               speed=None, mvacc=None, mvtime=None, is_radian=None, wait=False, timeout=None, **kwargs):
+    def _prepare_position(self, x=None, y=None, z=None, roll=None, pitch=None, yaw=None, radius=None,
+                          speed=None, mvacc=None, mvtime=None, relative=False, is_radian=None, wait=False,
+                          timeout=None, **kwargs):
+        # the part of set_position before the request (shared with AsyncXArmAPI), return (code, MotionRequest)
         is_radian = self._default_is_radian if is_radian is None else is_radian
         only_check_type = kwargs.get('only_check_type', self._only_check_type)
-        tcp_pos = [
-            self._last_position[0] if x is None else float(x),
-            self._last_position[1] if y is None else float(y),
-            self._last_position[2] if z is None else float(z),
-            self._last_position[3] if roll is None else to_radian(roll, is_radian),
-            self._last_position[4] if pitch is None else to_radian(pitch, is_radian),
-            self._last_position[5] if yaw is None else to_radian(yaw, is_radian),
-        ]
         motion_type = kwargs.get('motion_type', False)
-        for i in range(3):
-            if self._is_out_of_tcp_range(tcp_pos[i+3], i + 3):
-                return APIState.OUT_OF_RANGE
-        if kwargs.get('check', False):
-            _, limit = self.is_tcp_limit(tcp_pos, True)
-            if _ == 0 and limit is True:
-                return APIState.TCP_LIMIT
-        self._has_motion_cmd = True
+        values = [x, y, z, roll, pitch, yaw]
+        if relative and self.version_is_ge(1, 8, 100):
+            # use relative api
+            tcp_pos = [0 if values[i] is None else (float(values[i]) if i < 3 else to_radian(values[i], is_radian))
+                       for i in range(6)]
+        else:
+            # use absolute api
+            tcp_pos = [self._last_position[i] if values[i] is None else
+                       (self._last_position[i] if relative else 0) +
+                       (float(values[i]) if i < 3 else to_radian(values[i], is_radian))
+                       for i in range(6)]
+            for i in range(3):
+                if self._is_out_of_tcp_range(tcp_pos[i+3], i + 3):
+                    return APIState.OUT_OF_RANGE, None
+            relative = False
         spd, acc, mvt = self.__get_tcp_motion_params(speed, mvacc, mvtime, **kwargs)
         radius = radius if radius is not None else -1
-        feedback_key, studio_wait = self._gen_feedback_key(wait, **kwargs)
-        if self.version_is_ge(1, 11, 100) or kwargs.get('debug', False):
-            ret = self.arm_cmd.move_line_common(tcp_pos, spd, acc, mvt, radius, coord=0, is_axis_angle=False, only_check_type=only_check_type, motion_type=motion_type, feedback_key=feedback_key)
+        motion = MotionRequest('set_relative_position' if relative else 'set_position', tcp_pos, False, relative,
+                               spd, acc, mvt, 'pos={}, radius={}, velo={}, acc={}'.format(tcp_pos, radius, spd, acc),
+                               wait, timeout, kwargs, only_check_type=only_check_type,
+                               check=not relative and kwargs.get('check', False),
+                               is_pop=kwargs.get('is_pop', True))
+        if relative:
+            motion.set_command('move_relative', tcp_pos, spd, acc, mvt, radius, False, False, only_check_type,
+                               motion_type=motion_type, feedback_key='')
+        elif self.version_is_ge(1, 11, 100) or kwargs.get('debug', False):
+            motion.set_command('move_line_common', tcp_pos, spd, acc, mvt, radius, coord=0, is_axis_angle=False,
+                               only_check_type=only_check_type, motion_type=motion_type, feedback_key='')
+        elif radius >= 0:
+            motion.set_command('move_lineb', tcp_pos, spd, acc, mvt, radius, only_check_type, motion_type=motion_type)
         else:
-            if radius >= 0:
-                ret = self.arm_cmd.move_lineb(tcp_pos, spd, acc, mvt, radius, only_check_type, motion_type=motion_type)
-            else:
-                ret = self.arm_cmd.move_line(tcp_pos, spd, acc, mvt, only_check_type, motion_type=motion_type)
-        trans_id = self._get_feedback_transid(feedback_key, studio_wait, kwargs.get('is_pop', True))
+            motion.set_command('move_line', tcp_pos, spd, acc, mvt, only_check_type, motion_type=motion_type)
+        return 0, motion
+
+    def _start_motion(self, motion):
+        # the request of a MotionRequest, the reply (or a coroutine of it on AsyncUxbusCmdTcp) is for _handle_motion_result
+        self._has_motion_cmd = True
+        motion.feedback_key, motion.studio_wait = self._gen_feedback_key(motion.wait, **motion.kwargs)
+        if 'feedback_key' in motion.cmd_kwargs:
+            motion.cmd_kwargs['feedback_key'] = motion.feedback_key
+        return getattr(self.arm_cmd, motion.cmd)(*motion.cmd_args, **motion.cmd_kwargs)
+
+    def _handle_motion_result(self, motion, ret):
+        # the part of a move after the reply (shared with AsyncXArmAPI), it is done if only_check_type > 0,
+        # else the caller waits (motion.wait and code == 0) or calls _update_motion_params
+        motion.trans_id = self._get_feedback_transid(motion.feedback_key, motion.studio_wait, motion.is_pop)
         ret[0] = self._check_code(ret[0], is_move_cmd=True)
-        self.log_api_info('API -> set_position -> code={}, pos={}, radius={}, velo={}, acc={}'.format(
-            ret[0], tcp_pos, radius, spd, acc), code=ret[0])
+        self.log_api_info('API -> {} -> code={}, {}'.format(motion.name, ret[0], motion.info), code=ret[0])
         self._is_set_move = True
         self._only_check_result = 0
-        if only_check_type > 0 and ret[0] == 0:
+        if motion.only_check_type > 0 and ret[0] == 0:
             self._only_check_result = ret[3]
             return APIState.HAS_ERROR if ret[3] != 0 else ret[0]
-        if only_check_type <= 0 and wait and ret[0] == 0:
-            code = self.wait_move(timeout, trans_id=trans_id)
-            self.__update_tcp_motion_params(spd, acc, mvt)
-            self._sync()
-            return code
-        if only_check_type <= 0 and (ret[0] >= 0 or self.get_is_moving()):
-            self.__update_tcp_motion_params(spd, acc, mvt, tcp_pos)
         return ret[0]
 
-    def _set_position_relative(self, x=None, y=None, z=None, roll=None, pitch=None, yaw=None, radius=None,
-                               speed=None, mvacc=None, mvtime=None, is_radian=None, wait=False, timeout=None, **kwargs):
-        is_radian = self._default_is_radian if is_radian is None else is_radian
-        only_check_type = kwargs.get('only_check_type', self._only_check_type)
-        motion_type = kwargs.get('motion_type', False)
-        if self.version_is_ge(1, 8, 100):
-            # use relative api
-            tcp_pos = [
-                0 if x is None else float(x),
-                0 if y is None else float(y),
-                0 if z is None else float(z),
-                0 if roll is None else to_radian(roll, is_radian),
-                0 if pitch is None else to_radian(pitch, is_radian),
-                0 if yaw is None else to_radian(yaw, is_radian),
-            ]
-            self._has_motion_cmd = True
-            spd, acc, mvt = self.__get_tcp_motion_params(speed, mvacc, mvtime, **kwargs)
-            radius = radius if radius is not None else -1
-            feedback_key, studio_wait = self._gen_feedback_key(wait, **kwargs)
-            ret = self.arm_cmd.move_relative(tcp_pos, spd, acc, mvt, radius, False, False, only_check_type, motion_type=motion_type, feedback_key=feedback_key)
-            trans_id = self._get_feedback_transid(feedback_key, studio_wait, kwargs.get('is_pop', True))
-            ret[0] = self._check_code(ret[0], is_move_cmd=True)
-            self.log_api_info('API -> set_relative_position -> code={}, pos={}, radius={}, velo={}, acc={}'.format(
-                ret[0], tcp_pos, radius, spd, acc), code=ret[0])
-            self._is_set_move = True
-            self._only_check_result = 0
-            if only_check_type > 0 and ret[0] == 0:
-                self._only_check_result = ret[3]
-                return APIState.HAS_ERROR if ret[3] != 0 else ret[0]
-            if only_check_type <= 0 and wait and ret[0] == 0:
-                code = self.wait_move(timeout, trans_id=trans_id)
-                self.__update_tcp_motion_params(spd, acc, mvt)
-                self._sync()
-                return code
-            if only_check_type <= 0 and (ret[0] >= 0 or self.get_is_moving()):
-                self.__update_tcp_motion_params(spd, acc, mvt)
-            return ret[0]
+    def _update_motion_params(self, motion, update_target=False):
+        target = motion.target if update_target and not motion.relative else None
+        if motion.is_joint:
+            self.__update_joint_motion_params(motion.speed, motion.acc, motion.mvtime, target)
         else:
-            # use absolute api
-            tcp_pos = [
-                self._last_position[0] if x is None else (self._last_position[0] + float(x)),
-                self._last_position[1] if y is None else (self._last_position[1] + float(y)),
-                self._last_position[2] if z is None else (self._last_position[2] + float(z)),
-                self._last_position[3] if roll is None else (self._last_position[3] + to_radian(roll, is_radian)),
-                self._last_position[4] if pitch is None else (self._last_position[4] + to_radian(pitch, is_radian)),
-                self._last_position[5] if yaw is None else (self._last_position[5] + to_radian(yaw, is_radian)),
-            ]
-            return self._set_position_absolute(*tcp_pos, radius=radius, speed=speed, mvacc=mvacc, mvtime=mvtime,
-                                               is_radian=True, wait=wait, timeout=timeout, **kwargs)
+            self.__update_tcp_motion_params(motion.speed, motion.acc, motion.mvtime, target)
+
+    def _run_motion(self, motion):
+        if motion.check:
+            if motion.is_joint:
+                _, limit = self.is_joint_limit(motion.target, True)
+                if _ == 0 and limit is True:
+                    return APIState.JOINT_LIMIT
+            else:
+                _, limit = self.is_tcp_limit(motion.target, True)
+                if _ == 0 and limit is True:
+                    return APIState.TCP_LIMIT
+        ret = self._start_motion(motion)
+        code = self._handle_motion_result(motion, ret)
+        if motion.only_check_type > 0:
+            return code
+        if motion.wait and code == 0:
+            code = self.wait_move(motion.timeout, trans_id=motion.trans_id)
+            self._update_motion_params(motion)
+            self._sync()
+            return code
+        if code >= 0 or self.get_is_moving():
+            self._update_motion_params(motion, update_target=True)
+        return code
 
     @xarm_wait_until_not_pause
     @xarm_wait_until_cmdnum_lt_max
@@ -240,14 +234,12 @@ class XArm(Gripper, Servo, Record, RobotIQ, BaseBoard, Track, FtSensor, ModbusTc
         code = self.__wait_sync()
         if code != 0:
             return code
-        if relative:
-            return self._set_position_relative(x=x, y=y, z=z, roll=roll, pitch=pitch, yaw=yaw, radius=radius,
-                                               speed=speed, mvacc=mvacc, mvtime=mvtime, is_radian=is_radian,
-                                               wait=wait, timeout=timeout, **kwargs)
-        else:
-            return self._set_position_absolute(x=x, y=y, z=z, roll=roll, pitch=pitch, yaw=yaw, radius=radius,
-                                               speed=speed, mvacc=mvacc, mvtime=mvtime, is_radian=is_radian,
-                                               wait=wait, timeout=timeout, **kwargs)
+        code, motion = self._prepare_position(x=x, y=y, z=z, roll=roll, pitch=pitch, yaw=yaw, radius=radius,
+                                              speed=speed, mvacc=mvacc, mvtime=mvtime, relative=relative,
+                                              is_radian=is_radian, wait=wait, timeout=timeout, **kwargs)
+        if code != 0:
+            return code
+        return self._run_motion(motion)
 
     @xarm_wait_until_not_pause
     @xarm_wait_until_cmdnum_lt_max
@@ -358,85 +350,19 @@ class XArm(Gripper, Servo, Record, RobotIQ, BaseBoard, Track, FtSensor, ModbusTc
         self._is_set_move = True
         return ret[0]
 
-    def _set_servo_angle_absolute(self, angles, speed=None, mvacc=None, mvtime=None,
-                                  is_radian=None, wait=False, timeout=None, radius=None, **kwargs):
+    def _prepare_servo_angle(self, angles, speed=None, mvacc=None, mvtime=None, relative=False,
+                             is_radian=None, wait=False, timeout=None, radius=None, **kwargs):
+        # the part of set_servo_angle before the request (shared with AsyncXArmAPI), return (code, MotionRequest)
         is_radian = self._default_is_radian if is_radian is None else is_radian
         only_check_type = kwargs.get('only_check_type', self._only_check_type)
-        joints = self._last_angles.copy()
-        for i in range(min(len(self._last_angles), len(angles))):
-            if i >= self.axis or angles[i] is None:
-                continue
-            joints[i] = to_radian(angles[i], is_radian)
-            if self._is_out_of_joint_range(joints[i], i):
-                return APIState.OUT_OF_RANGE
-        if kwargs.get('check', False):
-            _, limit = self.is_joint_limit(joints, True)
-            if _ == 0 and limit is True:
-                return APIState.JOINT_LIMIT
-        joints[5] = 0 if self.axis <= 5 else joints[5]
-        joints[6] = 0 if self.axis <= 6 else joints[6]
-        spd, acc, mvt = self.__get_joint_motion_params(speed, mvacc, mvtime, is_radian=is_radian, **kwargs)
-        self._has_motion_cmd = True
-        feedback_key, studio_wait = self._gen_feedback_key(wait, **kwargs)
-        if self.version_is_ge(1, 5, 20) and radius is not None and radius >= 0:
-            ret = self.arm_cmd.move_jointb(joints, spd, acc, radius, only_check_type, feedback_key=feedback_key)
-        else:
-            ret = self.arm_cmd.move_joint(joints, spd, acc, mvt, only_check_type, feedback_key=feedback_key)
-        trans_id = self._get_feedback_transid(feedback_key, studio_wait, kwargs.get('is_pop', True))
-        ret[0] = self._check_code(ret[0], is_move_cmd=True)
-        self.log_api_info('API -> set_servo_angle -> code={}, angles={}, velo={}, acc={}, radius={}'.format(
-            ret[0], joints, spd, acc, radius
-        ), code=ret[0])
-        self._is_set_move = True
-        self._only_check_result = 0
-        if only_check_type > 0 and ret[0] == 0:
-            self._only_check_result = ret[3]
-            return APIState.HAS_ERROR if ret[3] != 0 else ret[0]
-        if only_check_type <= 0 and wait and ret[0] == 0:
-            code = self.wait_move(timeout, trans_id=trans_id)
-            self.__update_joint_motion_params(spd, acc, mvt)
-            self._sync()
-            return code
-        if only_check_type <= 0 and (ret[0] >= 0 or self.get_is_moving()):
-            self.__update_joint_motion_params(spd, acc, mvt, joints)
-        return ret[0]
-
-    def _set_servo_angle_relative(self, angles, speed=None, mvacc=None, mvtime=None,
-                                  is_radian=None, wait=False, timeout=None, radius=None, **kwargs):
-        is_radian = self._default_is_radian if is_radian is None else is_radian
-        only_check_type = kwargs.get('only_check_type', self._only_check_type)
-        if self.version_is_ge(1, 8, 100):
+        if relative and self.version_is_ge(1, 8, 100):
             # use relative api
             joints = [0] * 7
             for i in range(min(7, len(angles))):
                 if i >= self.axis or angles[i] is None:
                     continue
                 joints[i] = to_radian(angles[i], is_radian)
-            self._has_motion_cmd = True
-            spd, acc, mvt = self.__get_joint_motion_params(speed, mvacc, mvtime, is_radian=is_radian, **kwargs)
             radius = radius if radius is not None else -1
-            feedback_key, studio_wait = self._gen_feedback_key(wait, **kwargs)
-            joints[5] = 0 if self.axis <= 5 else joints[5]
-            joints[6] = 0 if self.axis <= 6 else joints[6]
-            ret = self.arm_cmd.move_relative(joints, spd, acc, mvt, radius, True, False, only_check_type, feedback_key=feedback_key)
-            trans_id = self._get_feedback_transid(feedback_key, studio_wait)
-            ret[0] = self._check_code(ret[0], is_move_cmd=True)
-            self.log_api_info('API -> set_relative_servo_angle -> code={}, angles={}, velo={}, acc={}, radius={}'.format(
-                ret[0], joints, spd, acc, radius
-            ), code=ret[0])
-            self._is_set_move = True
-            self._only_check_result = 0
-            if only_check_type > 0 and ret[0] == 0:
-                self._only_check_result = ret[3]
-                return APIState.HAS_ERROR if ret[3] != 0 else ret[0]
-            if only_check_type <= 0 and wait and ret[0] == 0:
-                code = self.wait_move(timeout, trans_id=trans_id)
-                self.__update_joint_motion_params(spd, acc, mvt)
-                self._sync()
-                return code
-            if only_check_type <= 0 and (ret[0] >= 0 or self.get_is_moving()):
-                self.__update_joint_motion_params(spd, acc, mvt)
-            return ret[0]
         else:
             # use absolute api
             joints = self._last_angles.copy()
@@ -445,9 +371,24 @@ class XArm(Gripper, Servo, Record, RobotIQ, BaseBoard, Track, FtSensor, ModbusTc
                     continue
                 joints[i] = to_radian(angles[i], is_radian)
                 if self._is_out_of_joint_range(joints[i], i):
-                    return APIState.OUT_OF_RANGE
-            return self._set_servo_angle_absolute(joints, speed=speed, mvacc=mvacc, mvtime=mvtime, is_radian=True,
-                                                  wait=wait, timeout=timeout, radius=radius, **kwargs)
+                    return APIState.OUT_OF_RANGE, None
+            relative = False
+        joints[5] = 0 if self.axis <= 5 else joints[5]
+        joints[6] = 0 if self.axis <= 6 else joints[6]
+        spd, acc, mvt = self.__get_joint_motion_params(speed, mvacc, mvtime, is_radian=is_radian, **kwargs)
+        motion = MotionRequest('set_relative_servo_angle' if relative else 'set_servo_angle', joints, True, relative,
+                               spd, acc, mvt, 'angles={}, velo={}, acc={}, radius={}'.format(joints, spd, acc, radius),
+                               wait, timeout, kwargs, only_check_type=only_check_type,
+                               check=not relative and kwargs.get('check', False),
+                               is_pop=relative or kwargs.get('is_pop', True))
+        if relative:
+            motion.set_command('move_relative', joints, spd, acc, mvt, radius, True, False, only_check_type,
+                               feedback_key='')
+        elif self.version_is_ge(1, 5, 20) and radius is not None and radius >= 0:
+            motion.set_command('move_jointb', joints, spd, acc, radius, only_check_type, feedback_key='')
+        else:
+            motion.set_command('move_joint', joints, spd, acc, mvt, only_check_type, feedback_key='')
+        return 0, motion
 
     @xarm_wait_until_not_pause
     @xarm_wait_until_cmdnum_lt_max
@@ -472,12 +413,12 @@ class XArm(Gripper, Servo, Record, RobotIQ, BaseBoard, Track, FtSensor, ModbusTc
         code = self.__wait_sync()
         if code != 0:
             return code
-        if relative:
-            return self._set_servo_angle_relative(angles, speed=speed, mvacc=mvacc, mvtime=mvtime, is_radian=is_radian,
-                                                  wait=wait, timeout=timeout, radius=radius, **kwargs)
-        else:
-            return self._set_servo_angle_absolute(angles, speed=speed, mvacc=mvacc, mvtime=mvtime, is_radian=is_radian,
-                                                  wait=wait, timeout=timeout, radius=radius, **kwargs)
+        code, motion = self._prepare_servo_angle(angles, speed=speed, mvacc=mvacc, mvtime=mvtime, relative=relative,
+                                                 is_radian=is_radian, wait=wait, timeout=timeout, radius=radius,
+                                                 **kwargs)
+        if code != 0:
+            return code
+        return self._run_motion(motion)
 
     @xarm_is_ready(_type='set')
     def set_servo_angle_j(self, angles, speed=None, mvacc=None, mvtime=None, is_radian=None, **kwargs):
@@ -1060,27 +1001,29 @@ class XArm(Gripper, Servo, Record, RobotIQ, BaseBoard, Track, FtSensor, ModbusTc
 
     @xarm_is_connected(_type='get')
     def is_tcp_limit(self, pose, is_radian=None):
+        ret = self.arm_cmd.is_tcp_limit(self._get_limit_pose(pose, is_radian))
+        return self._handle_is_limit_result('is_tcp_limit', ret)
+
+    def _get_limit_pose(self, pose, is_radian=None):
         is_radian = self._default_is_radian if is_radian is None else is_radian
         assert len(pose) >= 6
-        tcp_pose = [to_radian(pose[i], is_radian or i <= 2, self._last_position[i]) for i in range(6)]
-        ret = self.arm_cmd.is_tcp_limit(tcp_pose)
-        self.log_api_info('API -> is_tcp_limit -> code={}, limit={}'.format(ret[0], ret[1]), code=ret[0])
-        ret[0] = self._check_code(ret[0])
-        if ret[0] == 0:
-            return ret[0], bool(ret[1])
-        else:
-            return ret[0], None
+        return [to_radian(pose[i], is_radian or i <= 2, self._last_position[i]) for i in range(6)]
 
     @xarm_is_connected(_type='get')
     def is_joint_limit(self, joint, is_radian=None):
+        ret = self.arm_cmd.is_joint_limit(self._get_limit_joints(joint, is_radian))
+        return self._handle_is_limit_result('is_joint_limit', ret)
+
+    def _get_limit_joints(self, joint, is_radian=None):
         is_radian = self._default_is_radian if is_radian is None else is_radian
         # assert len(joint) >= 7
         joints = [0] * 7
         for i in range(min(len(joint), 7)):
             joints[i] = to_radian(joint[i], is_radian, self._last_angles[i])
+        return joints
 
-        ret = self.arm_cmd.is_joint_limit(joints)
-        self.log_api_info('API -> is_joint_limit -> code={}, limit={}'.format(ret[0], ret[1]), code=ret[0])
+    def _handle_is_limit_result(self, name, ret):
+        self.log_api_info('API -> {} -> code={}, limit={}'.format(name, ret[0], ret[1]), code=ret[0])
         ret[0] = self._check_code(ret[0])
         if ret[0] == 0:
             return ret[0], bool(ret[1])
@@ -1089,10 +1032,10 @@ class XArm(Gripper, Servo, Record, RobotIQ, BaseBoard, Track, FtSensor, ModbusTc
 
     def emergency_stop(self):
         logger.info('emergency_stop--begin')
-        self.set_state(4)
+        self._set_state_priority(4)
         expired = time.monotonic() + 3
         while self.state not in [4] and time.monotonic() < expired:
-            self.set_state(4)
+            self._set_state_priority(4)
             time.sleep(0.1)
         self._sleep_finish_time = 0
         self._sync()
@@ -1489,6 +1432,7 @@ class XArm(Gripper, Servo, Record, RobotIQ, BaseBoard, Track, FtSensor, ModbusTc
             return APIState.API_EXCEPTION
 
     @xarm_is_connected(_type='get')
+    @xarm_cached()
     def get_hd_types(self):
         ret = self.arm_cmd.get_hd_types()
         return ret[0], ret[1:]